@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import pathlib
+import time
+
+# ---------------------------
+# Reloadable content assets
+# ---------------------------
+# Each asset is a file plus a parser that turns its text into an immutable
+# structure, and an apply callback that swaps that structure in. Parsing and
+# validation happen in worker threads; all swaps of one reload are applied
+# together on the event loop, so commands never see a half-updated set.
+
+class Asset:
+    def __init__(self, name, path, parse, apply):
+        self.name = name
+        self.path = pathlib.Path(path)
+        self.parse = parse          # text (or None if missing) -> value, raises on bad content
+        self.apply = apply          # value -> None, swaps the new value in
+        self.fingerprint = None     # (mtime_ns, size) of the last seen file
+        self.digest = None          # sha1 of the last applied content
+        self.loaded = False
+
+    def _stat(self):
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def check(self, force: bool):
+        """Runs in a worker thread. Returns (fingerprint, digest, value) or None if unchanged."""
+        fingerprint = self._stat()
+        if not force and self.loaded and fingerprint == self.fingerprint:
+            return None
+
+        if fingerprint is None:
+            text, digest = None, None
+        else:
+            raw = self.path.read_bytes()
+            digest = hashlib.sha1(raw).hexdigest()
+            text = raw.decode("utf-8-sig")
+
+        if not force and self.loaded and digest == self.digest:
+            # touched but identical: remember the new mtime and skip the parse
+            self.fingerprint = fingerprint
+            return None
+        return fingerprint, digest, self.parse(text)
+
+
+class ReloadReport:
+    def __init__(self):
+        self.changed: dict[str, str] = {}   # asset name -> short description
+        self.errors: dict[str, str] = {}    # asset name -> error message
+        self.elapsed = 0.0
+
+    def summary(self) -> str:
+        parts = [f"{name} ({desc})" for name, desc in self.changed.items()]
+        parts += [f"{name} FAILED: {err}" for name, err in self.errors.items()]
+        return ", ".join(parts) if parts else "no changes"
+
+
+def describe(value) -> str:
+    try:
+        return f"{len(value)} entries"
+    except TypeError:
+        return "loaded"
+
+
+class AssetRegistry:
+    def __init__(self):
+        self.assets: dict[str, Asset] = {}
+        self.listeners = []         # callables (changed asset names) run after a reload swaps anything in
+        self._lock = asyncio.Lock()
+
+    def register(self, name, path, parse, apply):
+        self.assets[name] = Asset(name, path, parse, apply)
+
+    async def reload(self, *, force: bool = False) -> ReloadReport:
+        """Re-read changed assets off the loop, then swap all valid ones in at once."""
+        async with self._lock:
+            report = ReloadReport()
+            started = time.perf_counter()
+            assets = list(self.assets.values())
+            results = await asyncio.gather(
+                *(asyncio.to_thread(a.check, force) for a in assets),
+                return_exceptions=True)
+
+            for asset, result in zip(assets, results):
+                if isinstance(result, BaseException):
+                    # keep serving the previous version of a broken file
+                    report.errors[asset.name] = str(result) or type(result).__name__
+                elif result is not None:
+                    fingerprint, digest, value = result
+                    asset.apply(value)
+                    asset.fingerprint, asset.digest, asset.loaded = fingerprint, digest, True
+                    report.changed[asset.name] = describe(value) if digest else "missing"
+
+            if report.changed:
+                for listener in self.listeners:
+                    listener(set(report.changed))
+            report.elapsed = time.perf_counter() - started
+            return report
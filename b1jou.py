@@ -1,33 +1,63 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import discord
 from discord.ext import commands, tasks
 from discord import ui, Interaction
-import os, json, random, csv, time, asyncio, pathlib
-from datetime import datetime, timedelta
-from flask import Flask
-from threading import Thread
-import firebase_admin
-from firebase_admin import credentials, firestore
-import unicodedata
-import bossfight
-
-cred_json = os.environ['FIREBASE_CREDENTIALS_JSON']
-cred = credentials.Certificate(json.loads(cred_json))
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
-
-# ✅ Allowed (guild_id, channel_id) pairs
-ALLOWED_CHANNELS = {
-    (1386929798831538248, 1387653760175706172),     # Cavern of Dreams, bot-commands
-    (1386929798831538248, 1390173770085437510),     # Cavern of Dreams, B1jou Center
-    (715855925285486682, 715855925285486685),       # LordStarship's Server, debugging
-    (746162870957637723, 1417486539457302638)       # Ella's Server, b1test
-}
-
-# Pray channel
-PRAY_CHANNELS = {
-    (1386929798831538248, 1387620244746534994),     # Cavern of Dreams, Prayers of the Wishful
-}
+import os, io, json, math, random, csv, asyncio, pathlib
+from contextlib import contextmanager
+from types import MappingProxyType
+from datetime import datetime
+from assets import AssetRegistry
+from line_templates import compile_lines
+from metrics import REGISTRY, CONTENT_TYPE, TimedLock
+from loop_watchdog import LoopWatchdog
+from webserver import HealthServer
+from score_store import ScoreStore, SessionLedger, answer_summary, total_points
+from prayer_store import FirestorePrayerStore, update_streak
+from guild_config import GuildConfigStore, SETTINGS
+from trivia_match import AnswerIndex, normalize_text, parse_tolerance
+from sampler import QuestionSampler, bank_id
+from question_stats import QuestionStats, MIN_ASKED
+from render_cache import RenderCache
+from ttl_map import TTLMap
+from channel_locks import ChannelLocks
+from scheduler import Scheduler
+from checkpoints import CheckpointStore
+import perf
+from perf import PERF, timed
+
+# Firestore is created on first use so importing this module has no side effects
+_db = None
+
+def get_db():
+    global _db
+    if _db is None:
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+        if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+            # local emulator (e.g. `gcloud emulators firestore start`): no credentials needed
+            from google.auth.credentials import AnonymousCredentials
+            from google.cloud import firestore as cloud_firestore
+            _db = cloud_firestore.Client(project=os.environ.get("FIRESTORE_PROJECT", "b1jou-local"),
+                                         credentials=AnonymousCredentials())
+            return _db
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(json.loads(os.environ['FIREBASE_CREDENTIALS_JSON']))
+            firebase_admin.initialize_app(cred)
+        _db = firestore.client()
+    return _db
+
+# Startup phase timings (seconds), reported once the bot is ready
+STARTUP_TIMINGS: dict[str, float] = {}
+
+@contextmanager
+def startup_phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[name] = time.perf_counter() - started
 
 # 🛠 Debugging channels for b!jou
 DEBUG_CHANNELS = {
@@ -35,42 +65,50 @@ DEBUG_CHANNELS = {
     (715855925285486682, 715855925285486685),
 }
 
-# Guild, channel pairs for logging
-LOGGING_CHANNELS = {
-    746162870957637723 : 1417486539457302638,   # Ella's server, b1test
-    1386929798831538248 : 1387653725077901322   # Cavern of Dreams, logs
-}
-
 ########## CONFIG ##########
 DISCORD_EPOCH           = 1420070400000         # discord snowflake
 TRIVIA_CSV              = 'trivia_sheet.csv'    # trivia question file
 TRIVIA_DATA_FILE        = 'trivia_data.json'    # trivia data file
+BOSS_POINTS_FILE        = 'boss_points.json'    # bossfight points per user
+PURCHASES_FILE          = 'purchases.json'      # role shop purchase records per user
 QUIZ_LENGTH_SEC         = 270                   # 4m 30s players can answer
 QUIZ_LENGTH_SEC_LOOP    = 30                    # 30s for fast trivia
 POST_ANSWER_WINDOW      = 3                     # window that stays open after 1st correct
 INTER_ROUND_COOLDOWN    = 300                   # total cycle time = 5 min
 PRE_ANNOUNCE_SEC        = 5                     # “Trivia in 5 seconds!” heads‑up
-BACKUP_CHANNEL_ID       = 1389077962116038848   # channel to receive backup
+SPEEDRUN_ROUND_GAP      = 5                     # pause between speedrun questions
+BACKUP_CHANNEL_ID       = int(os.environ.get("BACKUP_CHANNEL_ID", 1389077962116038848))  # owner's channel for backups of every guild's data
 BACKUP_INTERVAL_MINUTES = 60                    # backup every 1 hour
 DEFAULT_TARGET_NAME     = "Spica"               # used when b!hit has no mention
 TEMPLATE_FILE           = "hit_templates.csv"   # templates for the hit
 DAMAGE_FILE             = "damage_phrases.csv"  # templates for the damage
 BIRTHDAY_FILE           = "birthdays.json"      # Birthday file
+ASSET_WATCH_SECONDS     = 30                    # how often content files are checked for changes
+LOOP_BLOCK_THRESHOLD    = 0.25                  # log the stack when a callback blocks the loop this long (s)
+WEB_PORT                = 8080                  # health / metrics server port
+READY_MAX_PENDING       = 50                    # queued Discord requests before /ready reports backlog
+READY_MAX_LOOP_LAG      = 1.0                   # loop lag (s) before /ready reports backlog
+READY_MAX_LOCK_HOLD     = 10.0                  # FILE_LOCK hold (s) before the store counts as stuck
+SPEEDRUN_JOURNAL_FILE   = 'speedrun_journal.jsonl'  # uncommitted speedrun answers (one file per guild), replayed after a crash
+SPEEDRUN_CHECKPOINT_ROUNDS = 10                 # commit speedrun scores every N rounds (0 = only at the end)
+TRIVIA_ASKED_FILE       = 'trivia_asked.json'   # per-channel "already asked" bitmaps
+QUESTION_STATS_FILE     = 'question_stats.json' # per-question asked / solved / answer-time stats
+GUILD_CONFIG_FILE       = 'guild_config.json'   # per-guild channels and roles, edited with b!config
+SHARD_STATS_SECONDS     = 15                    # how often per-shard gateway event counts are sampled
+WELCOME_TTL_SECONDS     = 86400                 # welcome messages are deleted on review for this long
+WELCOME_MAX_TRACKED     = 5000                  # most welcome messages remembered at once (join floods)
+SESSION_CHECKPOINT_FILE = 'session_checkpoints.json'  # running trivia / bossfight state, resumed after a restart
 #############################
 
-TRIVIA_MODE1_CHANNELS = {
-    1387653760175706172,    # Cavern of Dreams #bot-commands
-    715855925285486685,     # LordStarship debug
-    1389860314488635504,    # Classic Trivia channel
-    # Add more channel IDs for Mode 1 here
-}
+# Channels and roles per guild (command / pray / trivia channels, log and
+# birthday channels, join and ping roles), changed live with b!config. The
+# backup channel is not among them: backups hold every guild's users, so
+# only the bot owner picks where they go (BACKUP_CHANNEL_ID).
+GUILD_CONFIG = GuildConfigStore(GUILD_CONFIG_FILE)
 
-TRIVIA_MODE2_CHANNELS = {
-    1387653760175706172,    # Cavern of Dreams #bot-commands
-    715855925285486685,     # LordStarship debug
-    1389860487499612190,    # Speedrun Trivia channel
-    # Add more channel IDs for Mode 2 here
-}
+def in_channels(ctx, setting: str) -> bool:
+    """True in DMs, or if this channel is in the guild's `setting` channel set."""
+    return ctx.guild is None or ctx.channel.id in getattr(GUILD_CONFIG.get(ctx.guild.id), setting)
 
 # ─── Special “ME / Mention” answers ────────────────────────────────
 # key   : normalized correct answer text in your CSV
@@ -88,27 +126,122 @@ intents.guilds = True
 intents.members = True
 intents.message_content = True
 
-bot = commands.Bot(command_prefix="b!", intents=intents)
+def parse_shard_ids(text: str) -> list[int]:
+    """Shard ids from SHARD_IDS: "0,1", "0-3" or a mix like "0-3,8"."""
+    ids = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        ids.extend(range(int(first), int(last or first) + 1))
+    return sorted(set(ids))
+
+# Sharding: by default Discord's recommended shard count, SHARD_COUNT fixes it.
+# Every shard must run in this one process: the score, purchase, checkpoint,
+# sampler, stats and guild config files are each rewritten whole from this
+# process's memory, so a second process on the same files would overwrite
+# its writes (and post its own backups). SHARD_IDS is therefore only accepted
+# when it lists every shard 0..SHARD_COUNT-1.
+SHARD_COUNT = int(os.environ["SHARD_COUNT"]) if os.environ.get("SHARD_COUNT") else None
+SHARD_IDS   = parse_shard_ids(os.environ["SHARD_IDS"]) if os.environ.get("SHARD_IDS") else None
+if SHARD_IDS is not None and SHARD_IDS != list(range(SHARD_COUNT or 0)):
+    raise SystemExit(f"[SHARD] SHARD_IDS={os.environ['SHARD_IDS']} must be used with SHARD_COUNT and cover every "
+                     f"shard: the bot's data files allow only one process")
+
+bot = commands.AutoShardedBot(command_prefix="b!", intents=intents,
+                              shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
 bot.remove_command('help')
-bossfight.setup(bot)
 
-# JSON data helper
-async def load_user_data(guild_id, user_id):
-    doc = db.collection('guilds').document(guild_id).collection('users').document(user_id).get()
-    return doc.to_dict() if doc.exists else {"count": 0, "streak": 0, "last_prayed": None}
+# ─── Metrics, served on /metrics ───────────────────────────────────
+COMMANDS_TOTAL    = REGISTRY.counter("b1jou_commands_total", "Commands invoked", ["command", "status"])
+COMMAND_SECONDS   = REGISTRY.histogram("b1jou_command_seconds", "Command wall time", ["command"])
+FIRESTORE_SECONDS = REGISTRY.histogram("b1jou_firestore_seconds", "Firestore operation latency", ["op"])
+STORE_SECONDS     = REGISTRY.histogram("b1jou_store_seconds", "Trivia store operation latency", ["op"])
+FILE_LOCK_WAIT    = REGISTRY.histogram("b1jou_file_lock_wait_seconds", "Time spent waiting for FILE_LOCK")
+FILE_LOCK_HOLD    = REGISTRY.histogram("b1jou_file_lock_hold_seconds", "Time FILE_LOCK is held")
+DISCORD_PENDING   = REGISTRY.gauge("b1jou_discord_outbound_pending", "Discord REST requests queued or in flight")
+DISCORD_SECONDS   = REGISTRY.histogram("b1jou_discord_request_seconds", "Discord REST request latency", ["method"])
+LOOP_LAG          = REGISTRY.gauge("b1jou_event_loop_lag_seconds", "Most recent event-loop wake-up delay")
+LOOP_LAG_SECONDS  = REGISTRY.histogram("b1jou_event_loop_lag", "Event-loop wake-up delay",
+                                       buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+LOOP_BLOCKS       = REGISTRY.counter("b1jou_event_loop_blocked_total", "Callbacks that blocked the loop past the threshold")
+GATEWAY_EVENTS    = REGISTRY.counter("b1jou_gateway_events_total", "Gateway events received", ["shard"])
+REGISTRY.gauge("b1jou_gateway_latency_seconds", "Gateway heartbeat latency", ["shard"],
+               callback=lambda: {(str(sid),): lat for sid, lat in bot.latencies})
+REGISTRY.gauge("b1jou_gateway_events_per_second", "Gateway event rate over the last sample", ["shard"],
+               callback=lambda: {(str(sid),): rate for sid, rate in SHARD_EVENT_RATES.items()})
+REGISTRY.gauge("b1jou_shard_guilds", "Guilds served", ["shard"],
+               callback=lambda: {(str(sid),): n for sid, n in shard_guild_counts().items()})
+REGISTRY.gauge("b1jou_trivia_sessions_active", "Running trivia sessions", callback=lambda: len(trivia_sessions))
+
+@bot.before_invoke
+async def _start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+    ctx.perf_token = PERF.start()
+
+@bot.after_invoke
+async def _record_command(ctx):
+    name = ctx.command.qualified_name
+    COMMANDS_TOTAL.labels(name, "error" if ctx.command_failed else "ok").inc()
+    COMMAND_SECONDS.labels(name).observe(time.perf_counter() - ctx.started_at)
+    PERF.finish(name, ctx.perf_token)
+
+def instrument_http(http):
+    """Count and time every outbound Discord REST request."""
+    request = http.request
+
+    async def timed_request(route, **kwargs):
+        DISCORD_PENDING.inc()
+        started = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        finally:
+            DISCORD_PENDING.dec()
+            elapsed = time.perf_counter() - started
+            DISCORD_SECONDS.labels(route.method).observe(elapsed)
+            perf.add("discord", elapsed)
 
-async def save_user_data(guild_id, user_id, data):
-    db.collection('guilds').document(guild_id).collection('users').document(user_id).set(data, merge=True)
+    http.request = timed_request
 
-async def increment_global_prayers(guild_id):
-    ref = db.collection('guilds').document(guild_id)
-    ref.set({"global": firestore.Increment(1)}, merge=True)
+# Prayer counters live in Firestore; swap PRAYERS for a MemoryPrayerStore to run offline
+PRAYERS = FirestorePrayerStore(get_db, timer=lambda op: timed(FIRESTORE_SECONDS.labels(op), "firestore"))
     
 def get_footer_info(guild):
     if guild and guild.icon:
         return {"text": guild.name, "icon_url": guild.icon.url}
     return {"text": guild.name if guild else "DM", "icon_url": None}
 
+# Pray embed texts: (title, description) per kind of prayer, compiled once
+PRAY_FIELDS = {"author", "quote", "streak", "first", "second", "third", "roles", "text"}
+PRAY_TEXTS = {
+    kind: compile_lines(texts, PRAY_FIELDS)
+    for kind, texts in {
+        "bot": ("⁉️ A prayer is sent... to me!?",
+                "R-really? you would pray for me? thank you!! ///\n\n> {quote}"),
+        "spica": ("🙏 A prayer is sent to Spica!",
+                  "**{author}** has prayed for **Spica the Dreamer!**\nHer journey toward the throne of Procyon shall succeed!\n"),
+        "one": ("💫 A prayer is sent to {first}!",
+                "**{author}** has prayed for **{first}**! How sweet!\n\n> {quote}"),
+        "two": ("✨ Prayers are sent to {first} and {second}!",
+                "**{author}** prays for their friends, **{first}** and **{second}**! How caring!\n\n> {quote}"),
+        "three": ("🌟 Lots of prayers for {first}, {second}, and {third}!",
+                  "Wow! It seems like **{author}** has a lot of friends!\nSuch a kind soul!\n\n> {quote}"),
+        "many": ("🌌 Prayers are sent to everyone!",
+                 "Lots of prayers are sent to everybody!\n**{author}** loves everyone so much they're willing to send many!\n\n> {quote}"),
+        "roles": ("🧑‍🤝‍🧑 Prayers to a whole role!",
+                  "**{author}** sends prayers to the roles: {roles}\n\n> {quote}"),
+        "text": ("⭐ A prayer is sent to somebody!",
+                 "**{author}** sends a prayer for **{text}**!\nWhoever they are, they have a lovely friend praying for them!\n\n> {quote}"),
+    }.items()
+}
+# Extra lines appended to the Spica prayer description
+PRAY_STREAK_TEXTS = dict(zip(("continued", "reset", "quote"), compile_lines((
+    "🔥 **Daily Streak:** `{streak}` days! Keep praying for the Dreamer! 🔥\n",
+    "😢 Your daily streak was broken. Let's start again today!\n",
+    "\n> {quote}",
+), PRAY_FIELDS)))
+
 PRAYER_QUOTES = [
     "*'May your dreams be guided by starlight.'*",
     "*'The cosmos hears your prayer.'*",
@@ -121,53 +254,20 @@ IMAGE_URL = "https://external-content.duckduckgo.com/iu/?u=https%3A%2F%2Fstatic.
 # PRAY COMMAND
 @bot.command()
 async def pray(ctx, *args):
-    if ctx.guild and (ctx.guild.id, ctx.channel.id) not in PRAY_CHANNELS:
+    if not in_channels(ctx, "pray_channels"):
         return
 
     guild_id = str(ctx.guild.id) if ctx.guild else "DM"
     user_id = str(ctx.author.id)
     today = datetime.utcnow().date()
 
-    # Load data
-    user_data = await load_user_data(guild_id, user_id)
-    guild_ref = db.collection("guilds").document(guild_id)
-    guild_doc = guild_ref.get()
-    guild_data = guild_doc.to_dict() if guild_doc.exists else {"global": 0}
-
-    last_prayed_str = user_data.get("last_prayed")
-    last_prayed_date = datetime.strptime(last_prayed_str, "%Y-%m-%d").date() if last_prayed_str else None
-
-    is_first_pray = last_prayed_date is None
-    continued_streak = False
-    reset_streak = False
-
     # STREAK logic for Spica
     is_spica_pray = len(args) == 0 and len(ctx.message.mentions) == 0 and len(ctx.message.role_mentions) == 0
 
-    if is_spica_pray:
-        if last_prayed_date == today:
-            pass
-        elif last_prayed_date == today - timedelta(days=1):
-            user_data["streak"] += 1
-            continued_streak = True
-        elif is_first_pray:
-            user_data["streak"] = 1
-        else:
-            user_data["streak"] = 1
-            reset_streak = True
-    else:
-        user_data["streak"] = user_data.get("streak", 0)
-
-    user_data["count"] = user_data.get("count", 0) + 1
-    user_data["last_prayed"] = str(today)
-
-    await save_user_data(guild_id, user_id, user_data)
-    await increment_global_prayers(guild_id)
-    db.collection("guilds").document(guild_id).collection("leaderboard").document(user_id).set({
-        "user_id": user_id,
-        "count": user_data["count"],
-        "streak": user_data["streak"]
-    }, merge=True)
+    # One read, then user doc + leaderboard row + guild total in one batched write
+    user_data = await PRAYERS.get_user(guild_id, user_id)
+    continued_streak, reset_streak = update_streak(user_data, today, is_spica_pray)
+    await PRAYERS.record_prayer(guild_id, user_id, user_data)
 
     # Build Embed
     streak = user_data["streak"]
@@ -194,57 +294,51 @@ async def pray(ctx, *args):
     embed.set_footer(text=footer_info['text'], icon_url=footer_info['icon_url'])
 
     # ===== MESSAGE HANDLING =====
+    names = [m.name for m in mentions[:3]]
+    values = {
+        "author": ctx.author.name,
+        "quote": quote,
+        "streak": str(streak),
+        "first": "", "second": "", "third": "",
+        "roles": ", ".join(f"@{r.name}" for r in role_mentions),
+        "text": " ".join(args),
+    }
+    values.update(zip(("first", "second", "third"), names))
 
     if len(mentions) == 1 and mentions[0].id == bot.user.id:
-        embed.title = "⁉️ A prayer is sent... to me!?"
-        embed.description = f"R-really? you would pray for me? thank you!! ///\n\n> {quote}"
-
+        kind = "bot"
     elif is_spica_pray:
-        embed.title = "🙏 A prayer is sent to Spica!"
-        embed.description = f"**{ctx.author.name}** has prayed for **Spica the Dreamer!**\nHer journey toward the throne of Procyon shall succeed!\n"
-        if continued_streak:
-            embed.description += f"🔥 **Daily Streak:** `{streak}` days! Keep praying for the Dreamer! 🔥\n"
-        elif reset_streak:
-            embed.description += "😢 Your daily streak was broken. Let's start again today!\n"
-        embed.description += f"\n> {quote}"
-
+        kind = "spica"
     elif mentions:
-        if len(mentions) == 1:
-            embed.title = f"💫 A prayer is sent to {mentions[0].name}!"
-            embed.description = f"**{ctx.author.name}** has prayed for **{mentions[0].name}**! How sweet!\n\n> {quote}"
-        elif len(mentions) == 2:
-            embed.title = f"✨ Prayers are sent to {mentions[0].name} and {mentions[1].name}!"
-            embed.description = f"**{ctx.author.name}** prays for their friends, **{mentions[0].name}** and **{mentions[1].name}**! How caring!\n\n> {quote}"
-        elif len(mentions) == 3:
-            embed.title = f"🌟 Lots of prayers for {mentions[0].name}, {mentions[1].name}, and {mentions[2].name}!"
-            embed.description = f"Wow! It seems like **{ctx.author.name}** has a lot of friends!\nSuch a kind soul!\n\n> {quote}"
-        else:
-            embed.title = "🌌 Prayers are sent to everyone!"
-            embed.description = f"Lots of prayers are sent to everybody!\n**{ctx.author.name}** loves everyone so much they're willing to send many!\n\n> {quote}"
-
+        kind = ("one", "two", "three")[len(mentions) - 1] if len(mentions) <= 3 else "many"
     elif role_mentions:
-        role_names = ", ".join(f"@{r.name}" for r in role_mentions)
-        embed.title = "🧑‍🤝‍🧑 Prayers to a whole role!"
-        embed.description = f"**{ctx.author.name}** sends prayers to the roles: {role_names}\n\n> {quote}"
-
+        kind = "roles"
     else:
-        text_target = " ".join(args)
-        embed.title = "⭐ A prayer is sent to somebody!"
-        embed.description = f"**{ctx.author.name}** sends a prayer for **{text_target}**!\nWhoever they are, they have a lovely friend praying for them!\n\n> {quote}"
+        kind = "text"
+
+    title, description = PRAY_TEXTS[kind]
+    embed.title = title.render(values)
+    parts = [description.render(values)]
+    if kind == "spica":
+        if continued_streak:
+            parts.append(PRAY_STREAK_TEXTS["continued"].render(values))
+        elif reset_streak:
+            parts.append(PRAY_STREAK_TEXTS["reset"].render(values))
+        parts.append(PRAY_STREAK_TEXTS["quote"].render(values))
+    embed.description = "".join(parts)
 
     await ctx.send(embed=embed)
 
 # b!stats (Shows stats of all prayers)
 @bot.command()
 async def stats(ctx):
-    if ctx.guild and (ctx.guild.id, ctx.channel.id) not in ALLOWED_CHANNELS:
+    if not in_channels(ctx, "command_channels"):
         return
 
     guild_id = str(ctx.guild.id)
     user_id = str(ctx.author.id)
-    user_data = await load_user_data(guild_id, user_id)
-    guild_doc = db.collection("guilds").document(guild_id).get()
-    guild_data = guild_doc.to_dict() if guild_doc.exists else {"global": 0}
+    user_data, global_prayers = await asyncio.gather(PRAYERS.get_user(guild_id, user_id),
+                                                     PRAYERS.get_global(guild_id))
 
     embed = discord.Embed(
         title="📊 Prayer Stats",
@@ -252,7 +346,7 @@ async def stats(ctx):
             f"{ctx.author.mention}, here are your stats:\n\n"
             f"**Your total prayers:** `{user_data.get('count', 0)}`\n"
             f"🔥 **Current streak:** `{user_data.get('streak', 0)}`\n"
-            f"🌌 **Global prayers:** `{guild_data.get('global', 0)}`"
+            f"🌌 **Global prayers:** `{global_prayers}`"
         ),
         color=discord.Color.gold()
     )
@@ -264,17 +358,14 @@ async def stats(ctx):
 # b!top (Top praying leaderboard)
 @bot.command()
 async def top(ctx):
-    if ctx.guild and (ctx.guild.id, ctx.channel.id) not in ALLOWED_CHANNELS:
+    if not in_channels(ctx, "command_channels"):
         return
 
     guild_id = str(ctx.guild.id)
-    lb_ref = db.collection('guilds').document(guild_id).collection('leaderboard')
-    query = lb_ref.order_by('count', direction=firestore.Query.DESCENDING).limit(5)
-    top_docs = query.stream()
+    top_rows = await PRAYERS.top(guild_id, 5)
 
     desc = ""
-    for doc in top_docs:
-        data = doc.to_dict()
+    for data in top_rows:
         user = await bot.fetch_user(int(data['user_id']))
         desc += f"**{user.name}** — `{data['count']}` prayers (🔥 {data['streak']}d streak)\n"
 
@@ -289,22 +380,25 @@ async def top(ctx):
     await ctx.send(embed=embed)
 
 JOU_CSV = "bot_texts.csv"
-JOU_LINES: list[str] = []
-
-def load_jou_lines():
-    path = pathlib.Path(JOU_CSV)
-    if not path.exists():
+JOU_LINES: tuple = ()       # compiled LineTemplates
+JOU_FIELDS = {"author", "target"}
+DEFAULT_JOU_LINES = compile_lines((      # fallback if CSV empty / absent
+    "**{author}** yeets a cosmic brick at **{target}**! Ouch!",
+    "**{author}** shares an existential meme with **{target}**.",
+    "**{author}** activates RGB powers against **{target}**!",
+), JOU_FIELDS)
+
+def parse_jou_lines(text: str | None):
+    if text is None:
         print(f"[JOU] '{JOU_CSV}' not found – using default lines.")
-        return
-    with path.open(encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        JOU_LINES.clear()
-        for row in reader:
-            line = (row.get("line") or "").strip()
-            if line:
-                JOU_LINES.append(line)
-    print(f"[JOU] Loaded {len(JOU_LINES)} fun lines.")
-    
+        return ()
+    lines = []
+    for row in csv.DictReader(io.StringIO(text)):
+        line = (row.get("line") or "").strip()
+        if line:
+            lines.append(line)
+    return compile_lines(lines, JOU_FIELDS)
+
 # Ping 
 @bot.command()
 async def jou(ctx, target: discord.Member | None = None):
@@ -323,245 +417,264 @@ async def jou(ctx, target: discord.Member | None = None):
         return await msg.edit(content=f"🏓 Pong! Latency: `{int(ping)} ms`")
 
     # ── Fun personalised line ──────────────────────────
-    if not JOU_LINES:        # fallback if CSV empty / absent
-        JOU_LINES.extend([
-            "**{author}** yeets a cosmic brick at **{target}**! Ouch!",
-            "**{author}** shares an existential meme with **{target}**.",
-            "**{author}** activates RGB powers against **{target}**!",
-        ])
-
-    line  = random.choice(JOU_LINES)
+    line  = random.choice(JOU_LINES or DEFAULT_JOU_LINES)
     author_name  = ctx.author.display_name
     target_name  = target.display_name if target else DEFAULT_TARGET_NAME
-    line_filled  = line.format(author=author_name, target=target_name)
+    line_filled  = line.render({"author": author_name, "target": target_name})
 
     await ctx.send(line_filled)
 
 # Member Joined Action
-welcome_messages = {}
-class JoinActionView(ui.View):
-    def __init__(self, member):
-        super().__init__(timeout=None)
-        self.member = member
-
-    async def disable_buttons(self, interaction: Interaction):
-        for item in self.children:
-            item.disabled = True
-        await interaction.message.edit(view=self)
-
-        msg = welcome_messages.pop(self.member.id, None)
-        if msg:
+# The review buttons carry the action and member id in their custom_id
+# ("join:kick:<member id>"), so one dynamic item registered at startup
+# handles every join message, including ones sent before a restart.
+# Welcome messages are remembered as ids only, for WELCOME_TTL_SECONDS.
+welcome_messages = TTLMap(WELCOME_TTL_SECONDS, WELCOME_MAX_TRACKED)   # (guild id, member id) -> (channel id, message id)
+
+JOIN_ACTIONS = {
+    "member": ("Assign Member Role", discord.ButtonStyle.success),
+    "bot": ("Assign Bot Role", discord.ButtonStyle.success),
+    "kick": ("Kick", discord.ButtonStyle.danger),
+    "ban": ("Ban", discord.ButtonStyle.danger),
+}
+
+class JoinActionButton(ui.DynamicItem[ui.Button], template=r"join:(?P<action>member|bot|kick|ban):(?P<member_id>\d+)"):
+    def __init__(self, action: str, member_id: int, disabled: bool = False):
+        label, style = JOIN_ACTIONS[action]
+        super().__init__(ui.Button(label=label, style=style, disabled=disabled,
+                                   custom_id=f"join:{action}:{member_id}"))
+        self.action = action
+        self.member_id = member_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: Interaction, item: ui.Button, match):
+        return cls(match["action"], int(match["member_id"]))
+
+    async def callback(self, interaction: Interaction):
+        # the fetch and moderation calls below can outlast Discord's 3 s reply window
+        await interaction.response.defer()
+        guild = interaction.guild
+        member = guild.get_member(self.member_id)
+        if member is None:
             try:
-                await msg.delete()
+                member = await guild.fetch_member(self.member_id)
             except discord.NotFound:
-                pass
+                member = None
 
-    @ui.button(label="Assign Member Role", style=discord.ButtonStyle.success)
-    async def assign_user_role(self, interaction: Interaction, button: ui.Button):
-        role = interaction.guild.get_role(1387624217117462538)
-        if not role:
-            await interaction.response.send_message("Role not found.", ephemeral=True)
+        if self.action == "ban":
+            # a member who already left can still be banned by id
+            name = member.display_name if member else f"<@{self.member_id}>"
+            try:
+                await guild.ban(member or discord.Object(id=self.member_id), reason="Banned by admin via bot")
+                await interaction.followup.send(f"⛔ {interaction.user.mention} banned **{name}**.")
+                await finish_join_review(interaction, self.member_id)
+            except discord.Forbidden:
+                await interaction.followup.send("I cannot ban this user.", ephemeral=True)
             return
-        if role in self.member.roles:
-            await interaction.response.send_message("They already have the role!", ephemeral=True)
+
+        if member is None:
+            await interaction.followup.send("They are no longer in the server.", ephemeral=True)
             return
-        try:
-            await self.member.add_roles(role, reason="Granted by bot")
-            await interaction.response.send_message(f"✨ {interaction.user.mention} assigned role to **{self.member.display_name}**.")
-            await self.disable_buttons(interaction)
-        except discord.Forbidden:
-            await interaction.response.send_message("I lack permission to assign the role.", ephemeral=True)
-            
-    @ui.button(label="Assign Bot Role", style=discord.ButtonStyle.success)
-    async def assign_bot_role(self, interaction: Interaction, button: ui.Button):
-        role = interaction.guild.get_role(1387624066801733643)
+
+        if self.action == "kick":
+            try:
+                await member.kick(reason="Kicked by admin via bot")
+                await interaction.followup.send(f"🚪 {interaction.user.mention} kicked **{member.display_name}**.")
+                await finish_join_review(interaction, self.member_id)
+            except discord.Forbidden:
+                await interaction.followup.send("I cannot kick this user.", ephemeral=True)
+            return
+
+        config = GUILD_CONFIG.get(guild.id)
+        role = guild.get_role((config.member_role if self.action == "member" else config.bot_role) or 0)
         if not role:
-            await interaction.response.send_message("Role not found.", ephemeral=True)
+            await interaction.followup.send("Role not found.", ephemeral=True)
             return
-        if role in self.member.roles:
-            await interaction.response.send_message("They already have the role!", ephemeral=True)
+        if role in member.roles:
+            await interaction.followup.send("They already have the role!", ephemeral=True)
             return
         try:
-            await self.member.add_roles(role, reason="Granted by bot")
-            await interaction.response.send_message(f"✨ {interaction.user.mention} assigned role to **{self.member.display_name}**.")
-            await self.disable_buttons(interaction)
+            await member.add_roles(role, reason="Granted by bot")
+            await interaction.followup.send(f"✨ {interaction.user.mention} assigned role to **{member.display_name}**.")
+            await finish_join_review(interaction, self.member_id)
         except discord.Forbidden:
-            await interaction.response.send_message("I lack permission to assign the role.", ephemeral=True)
+            await interaction.followup.send("I lack permission to assign the role.", ephemeral=True)
 
-    @ui.button(label="Kick", style=discord.ButtonStyle.danger)
-    async def kick_user(self, interaction: Interaction, button: ui.Button):
-        try:
-            await self.member.kick(reason="Kicked by admin via bot")
-            await interaction.response.send_message(f"🚪 {interaction.user.mention} kicked **{self.member.display_name}**.")
-            await self.disable_buttons(interaction)
-        except discord.Forbidden:
-            await interaction.response.send_message("I cannot kick this user.", ephemeral=True)
+def join_view(member_id: int, disabled: bool = False) -> ui.View:
+    view = ui.View(timeout=None)
+    for action in JOIN_ACTIONS:
+        view.add_item(JoinActionButton(action, member_id, disabled))
+    return view
+
+async def finish_join_review(interaction: Interaction, member_id: int):
+    """Grey out the buttons and delete the member's welcome message, if still known."""
+    await interaction.message.edit(view=join_view(member_id, disabled=True))
 
-    @ui.button(label="Ban", style=discord.ButtonStyle.danger)
-    async def ban_user(self, interaction: Interaction, button: ui.Button):
+    ids = welcome_messages.pop((interaction.guild.id, member_id))
+    channel = bot.get_channel(ids[0]) if ids else None
+    if channel:
         try:
-            await self.member.ban(reason="Banned by admin via bot")
-            await interaction.response.send_message(f"⛔ {interaction.user.mention} banned **{self.member.display_name}**.")
-            await self.disable_buttons(interaction)
-        except discord.Forbidden:
-            await interaction.response.send_message("I cannot ban this user.", ephemeral=True)
+            await channel.get_partial_message(ids[1]).delete()
+        except discord.NotFound:
+            pass
 
 # Automatic Message in both Admin and Welcome channel when User Joiened
 @bot.event
 async def on_member_join(member):
-    if member.guild.id != 1386929798831538248:
+    config = GUILD_CONFIG.get(member.guild.id)
+    if not (config.welcome_channel or config.join_admin_channel):
         return
 
-    welcome_channel = member.guild.get_channel(1387651996525269072)
-    admin_channel = member.guild.get_channel(1387653760175706172)
-    member_role = member.guild.get_role(1387624217117462538)
-    admin_role = member.guild.get_role(1386931817545990246)
+    welcome_channel = member.guild.get_channel(config.welcome_channel or 0)
+    admin_channel = member.guild.get_channel(config.join_admin_channel or 0)
+    member_role = member.guild.get_role(config.member_role or 0)
+    admin_role = member.guild.get_role(config.admin_role or 0)
 
     if member_role in member.roles:
         return
 
     if welcome_channel:
         welcome_msg = await welcome_channel.send(
-            f"🌟 Welcome to **Cavern of Dreams**, {member.mention}!\n"
+            f"🌟 Welcome to **{member.guild.name}**, {member.mention}!\n"
             "Please wait patiently while the stars align and a council member grants you access!"
         )
-        welcome_messages[member.id] = welcome_msg
+        welcome_messages.set((member.guild.id, member.id), (welcome_channel.id, welcome_msg.id))
 
     if admin_channel and admin_role:
         await admin_channel.send(
             f"🔔 **New arrival detected**: {member.mention}\n"
             f"{admin_role.mention}, please take action below.",
-            view=JoinActionView(member)
+            view=join_view(member.id)
         )
         
 # Trivia
-trivia_lists = {1: [], 2: []}
-trivia_tasks = {1: None, 2: None}
-trivia_running_flags = {1: False, 2: False}
-current_q = {1: None, 2: None}
-answerers = {1: {}, 2: {}}
-round_started_at = {1: 0.0, 2: 0.0}
-answered_flags = {1: False, 2: False}
-first_correct_events = {1: asyncio.Event(), 2: asyncio.Event()}
+class TriviaSession:
+    """One guild's running trivia in one mode (1 classic, 2 speedrun). Sessions
+    live in `trivia_sessions` only while their loop runs, so every guild can
+    run its own game and a shard only holds state for guilds it serves."""
+    __slots__ = ("guild_id", "mode", "channel_id", "task", "running", "question",
+                 "answerers", "attempted", "started_at", "answered", "next_ask",
+                 "asked", "scores")
+
+    def __init__(self, guild_id: int, mode: int, channel_id: int):
+        self.guild_id = guild_id
+        self.mode = mode
+        self.channel_id = channel_id
+        self.task = None
+        self.running = True
+        self.question = None
+        self.answerers = {}         # user id -> result of their correct answer
+        self.attempted = set()      # user ids with a wrong answer this round
+        self.started_at = 0         # ms timestamp of the question message
+        self.answered = False
+        self.next_ask = 0.0         # wall-clock time the next question is due
+        self.asked = 0              # questions asked so far
+        self.scores = {}            # speedrun: uid -> points this session
+
+    @property
+    def key(self) -> tuple[int, int]:
+        return (self.guild_id, self.mode)
+
+    def snapshot(self) -> dict:
+        """What a restart needs to carry on; answers of the round in flight are
+        not kept (the round is asked again)."""
+        return {"guild_id": self.guild_id, "mode": self.mode, "channel_id": self.channel_id,
+                "next_ask": self.next_ask, "asked": self.asked, "scores": self.scores}
+
+    @classmethod
+    def restore(cls, saved: dict) -> "TriviaSession":
+        session = cls(saved["guild_id"], saved["mode"], saved["channel_id"])
+        session.next_ask = saved["next_ask"]
+        session.asked = saved["asked"]
+        session.scores = dict(saved["scores"])
+        return session
+
+    def new_round(self, question, asked_at: float):
+        """Start accepting answers; started_at is refined from the question
+        message's id once it is sent."""
+        self.question = question
+        self.started_at = int(asked_at * 1000)
+        self.answerers.clear()
+        self.attempted.clear()
+        self.answered = False
+
+trivia_sessions: dict[tuple[int, int], TriviaSession] = {}     # (guild id, mode) -> session
+SCHEDULER = Scheduler()     # every session's round deadlines, keyed like trivia_sessions
+CHECKPOINTS = CheckpointStore(SESSION_CHECKPOINT_FILE)  # trivia and bossfight state for resume, see checkpoints.py
+REGISTRY.gauge("b1jou_trivia_next_fire_timestamp_seconds", "When each trivia session's next phase is due",
+               ["guild", "mode", "phase"],
+               callback=lambda: {(gid, mode, phase): when for (gid, mode), (phase, when) in SCHEDULER.pending().items()})
 
 # FILE LOCK -> Prevents overwriting data
-FILE_LOCK = asyncio.Lock()
+FILE_LOCK = TimedLock(FILE_LOCK_WAIT, FILE_LOCK_HOLD)
+SCORES = ScoreStore(TRIVIA_DATA_FILE, FILE_LOCK, timer=lambda op: timed(STORE_SECONDS.labels(op), "store"),
+                    boss_points_path=BOSS_POINTS_FILE, purchases_path=PURCHASES_FILE)
 
-async def safe_load_data() -> dict:
-    async with FILE_LOCK:
-        return load_trivia_data()
+# Lock/Unlock Channel: no-op changes are skipped and failures logged, see channel_locks.py
+CHANNEL_LOCKS = ChannelLocks()
+REGISTRY.gauge("b1jou_channel_lock_changes", "Channel lock requests by outcome", ["result"],
+               callback=lambda: {(result,): n for result, n in CHANNEL_LOCKS.stats.items()})
 
-async def safe_save_data(data: dict):
-    async with FILE_LOCK:
-        save_trivia_data(data)
-        
-# Lock/Unlock Channel
-async def _lock_channel(chan: discord.TextChannel, *, allow_send: bool):
-    ow = chan.overwrites_for(chan.guild.default_role)
-    ow.send_messages = allow_send
-    await chan.set_permissions(chan.guild.default_role, overwrite=ow)
+async def _lock_channel(chan: discord.TextChannel, *, allow_send: bool) -> bool:
+    return await CHANNEL_LOCKS.set(chan, allow_send=allow_send)
 
-# Normalize answer so it can accepts Unicode
-def normalize_text(text):
-    return unicodedata.normalize("NFKC", text).replace("’", "'").lower().strip()
+@bot.event
+async def on_guild_channel_update(before, after):
+    CHANNEL_LOCKS.forget(after.id)      # our cached state may no longer match
 
 # Helper functions
-def load_trivia(mode: int):
-    trivia_lists[mode].clear()
-    path = pathlib.Path(TRIVIA_CSV)
-    if not path.exists():
-        raise FileNotFoundError(f"CSV not found: {path.resolve()}")
-
-    with path.open(newline='', encoding='utf-8') as f:
-        for row in csv.DictReader(f):
-            q = row.get("question", "").strip()
-            a = [normalize_text(x) for x in row.get("answers", "").split("|") if x.strip()]
-            if q and a:
-                trivia_lists[mode].append({"q": q, "answers": a})
-    random.shuffle(trivia_lists[mode])
-    print(f"[TRIVIA] Loaded {len(trivia_lists[mode])} questions for mode {mode}.")
-
-def load_trivia_data():
-    p = pathlib.Path(TRIVIA_DATA_FILE)
-    if not p.exists() or p.stat().st_size == 0:
-        return {}
-    try:
-        return json.loads(p.read_text())
-    except json.JSONDecodeError:
-        print("[TRIVIA] Corrupt JSON, resetting.")
-        return {}
+TRIVIA_BANK: tuple = ()     # every parsed question, swapped as a whole on reload
 
-def save_trivia_data(data: dict):
-    tmp = pathlib.Path(TRIVIA_DATA_FILE + ".tmp")
-    tmp.write_text(json.dumps(data, indent=2))
-    tmp.replace(TRIVIA_DATA_FILE)
-
-def is_correct_answer(answers: list, message: discord.Message):
-    normalized_answers = [normalize_text(ans) for ans in answers]
-    content = message.content.strip()
-    normalized = normalize_text(content)
-
-    if normalized in normalized_answers:
-        return True
-
-    # Special case: if the answer is a username or mention
-    for ans in normalized_answers:
-        # Check if answer matches a member's display name or ID
-        for member in message.guild.members:
-            if normalize_text(member.display_name) == ans:
-                # Match "@user" mention
-                if message.content.strip() == member.mention:
-                    return True
-                # Match "me" if the user answering is the correct one
-                if message.author.id == member.id and normalized == "me":
-                    return True
-    return False
-    
-# Shop helper functions
-ROLE_SHOP_FILE = "role_shop.json"
-ROLE_SHOP: dict[int, int] = {}          
+def parse_trivia(text: str | None) -> tuple:
+    if text is None:
+        raise FileNotFoundError(f"CSV not found: {pathlib.Path(TRIVIA_CSV).resolve()}")
 
-def load_role_shop() -> None:
-    global ROLE_SHOP
-    p = pathlib.Path(ROLE_SHOP_FILE)
-    if not p.exists():
-        print(f"[SHOP] '{ROLE_SHOP_FILE}' not found – shop disabled.")
-        ROLE_SHOP.clear()
-        return
-    try:
-        raw = json.loads(p.read_text())
-        # convert keys to int
-        ROLE_SHOP = {int(rid): int(cost) for rid, cost in raw.items() if str(cost).isdigit()}
-        print(f"[SHOP] Loaded {len(ROLE_SHOP)} purchasable roles.")
-    except Exception as e:
-        print("[SHOP] failed loading:", e)
-        ROLE_SHOP.clear()
-
-async def get_user_score(uid: str) -> int:
-    data = await safe_load_data()
-    entry = data.get(uid)
-    if isinstance(entry, dict):
-        return entry.get("score", 0)
-    return int(entry or 0)
-
-async def change_user_score(uid: str, delta: int):
-    """delta can be negative to deduct"""
-    async with FILE_LOCK:
-        data = load_trivia_data()
-        entry = data.get(uid)
-        if isinstance(entry, dict):
-            entry["score"] = max(0, entry.get("score", 0) + delta)
-        else:  # legacy int or None
-            entry = {"score": max(0, (int(entry or 0) + delta)),
-                     "best_time": float("inf"), "best_question": ""}
-        data[uid] = entry
-        save_trivia_data(data)
-        
+    bank = []
+    for line, row in enumerate(csv.DictReader(io.StringIO(text)), 2):
+        q = (row.get("question") or "").strip()
+        a = tuple(normalize_text(x) for x in (row.get("answers") or "").split("|") if x.strip())
+        if q and a:
+            try:
+                tolerance = parse_tolerance(row.get("tolerance"))
+                weight = float((row.get("weight") or "").strip() or 1)
+                if not weight > 0:
+                    raise ValueError(f"weight must be positive, got {weight}")
+            except ValueError as e:
+                raise ValueError(f"{TRIVIA_CSV} line {line}: {e}") from None
+            bank.append(MappingProxyType({"q": q, "answers": a, "match": AnswerIndex(a, tolerance),
+                                          "weight": weight}))
+    if not bank:
+        raise ValueError(f"no valid questions in {TRIVIA_CSV}")
+    return tuple(bank)
+
+# Questions come from a weighted sampler that remembers, per channel, what was
+# already asked this cycle (saved to TRIVIA_ASKED_FILE, so restarts resume it)
+SAMPLER = QuestionSampler(TRIVIA_ASKED_FILE)
+
+def apply_trivia_bank(bank: tuple):
+    global TRIVIA_BANK
+    SAMPLER.set_bank(bank_id(q["q"] for q in bank), [q["weight"] for q in bank])
+    TRIVIA_BANK = bank
+
+QUESTION_STATS = QuestionStats(QUESTION_STATS_FILE)
+
+async def next_question(channel: discord.TextChannel):
+    if not TRIVIA_BANK:
+        raise FileNotFoundError(f"No trivia questions loaded from {TRIVIA_CSV}")
+    question = TRIVIA_BANK[SAMPLER.draw(channel.id)]
+    await SAMPLER.save()
+    return question
+
+def is_correct_answer(question, message: discord.Message):
+    index = question["match"]
+    # Special case: the answer is a member's name, given as a mention or "me"
+    return index.matches(message.content) or index.matches_member(message)
+    
 # Ping for classic trivia
 @bot.command()
 async def pingtrivia(ctx):
     """Add yourself to the trivia ping role."""
-    role = ctx.guild.get_role(1394860483864956948)
+    role = ctx.guild.get_role(GUILD_CONFIG.get(ctx.guild.id).trivia_ping_role or 0)
     if not role:
         return await ctx.send("⚠️ Role not found.")
 
@@ -578,7 +691,7 @@ async def pingtrivia(ctx):
 @bot.command()
 async def unpingtrivia(ctx):
     """Remove yourself from the trivia ping role."""
-    role = ctx.guild.get_role(1394860483864956948)
+    role = ctx.guild.get_role(GUILD_CONFIG.get(ctx.guild.id).trivia_ping_role or 0)
     if not role:
         return await ctx.send("⚠️ Role not found.")
 
@@ -591,152 +704,157 @@ async def unpingtrivia(ctx):
     except discord.Forbidden:
         await ctx.send("❌ I don't have permission to remove that role.")
 
-# b!starttrivia 1
-async def trivia_loop(channel: discord.TextChannel, mode: int):
-    data = await safe_load_data()
+def collect_round(session: TriviaSession) -> tuple[list[dict], list[str]]:
+    """This round's store results (correct answers fastest first, then everyone who
+    only guessed wrong) plus result lines for the correct ones."""
+    question = session.question["q"]
+    results, lines = [], []
+    for res in sorted(session.answerers.values(), key=lambda r: r['time_ms']):
+        uid = str(res['user'].id)
+        results.append({"uid": uid, "points": res["points"], "time_ms": res["time_ms"],
+                        "question": question, "chars": res["chars"]})
+        t = f"{res['time_ms']//1000}.{res['time_ms']%1000:03d}s"
+        name_display = res['user'].display_name if hasattr(res['user'], 'display_name') else uid
+        lines.append(f"{name_display} — `{res['points']} pt` ({t})")
+    for user_id in session.attempted - session.answerers.keys():
+        results.append({"uid": str(user_id), "points": 0, "time_ms": None, "question": question})
+    return results, lines
+
+async def record_question_stats(session: TriviaSession):
+    """Feed the round that just ended into its question's stats."""
+    times = [res["time_ms"] for res in session.answerers.values()]
+    QUESTION_STATS.record_round(session.question["q"], min(times) / 1000 if times else None, len(times))
+    await QUESTION_STATS.save()
+
+def speedrun_journal(guild_id: int) -> pathlib.Path:
+    path = pathlib.Path(SPEEDRUN_JOURNAL_FILE)
+    return path.with_name(f"{path.stem}_{guild_id}{path.suffix}")
+
+def checkpoint_session(session: TriviaSession):
+    CHECKPOINTS.put("trivia", f"{session.guild_id}:{session.mode}", session.snapshot())
+
+def end_session(session: TriviaSession):
+    session.running = False
+    session.question = None
+    SCHEDULER.cancel(session.key)
+    if trivia_sessions.get((session.guild_id, session.mode)) is session:
+        del trivia_sessions[(session.guild_id, session.mode)]
+    if not bot.is_closed():     # shutting down: keep the checkpoint so the session resumes
+        CHECKPOINTS.drop("trivia", f"{session.guild_id}:{session.mode}")
 
+# b!starttrivia 1
+# Rounds run on absolute deadlines from SCHEDULER: question k is due at
+# start + k * INTER_ROUND_COOLDOWN, answers close QUIZ_LENGTH_SEC after that
+# (or POST_ANSWER_WINDOW after the first correct answer), and the heads-up
+# goes out PRE_ANNOUNCE_SEC before the next question. Time spent sending or
+# saving never pushes later rounds back. A resumed session starts with its
+# saved next_ask, so it waits out the cooldown it was in (or asks at once).
+async def trivia_loop(channel: discord.TextChannel, session: TriviaSession):
+    session.next_ask = max(session.next_ask, time.time())
+    checkpoint_session(session)
     try:
-        while trivia_running_flags[mode]:
-            if not trivia_lists[mode]:
-                load_trivia(mode)
-
-            current_q[mode] = trivia_lists[mode].pop()
-            answerers[mode].clear()
-            answered_flags[mode] = False
-            first_correct_events[mode].clear()
+        while session.running:
+            if session.next_ask > time.time():
+                await SCHEDULER.sleep_until(session.key, session.next_ask - PRE_ANNOUNCE_SEC, "cooldown")
+                ping_role = GUILD_CONFIG.get(channel.guild.id).trivia_ping_role
+                await channel.send(f"{f'<@&{ping_role}> ' if ping_role else ''}✨ Trivia resumes in **5 seconds**…")
+                await SCHEDULER.sleep_until(session.key, session.next_ask, "announce")
+
+            asked_at = session.next_ask
+            session.new_round(await next_question(channel), asked_at)
+            # armed before any await: an answer that beats the send can already close it
+            answers_closed = SCHEDULER.sleep_until(session.key, asked_at + QUIZ_LENGTH_SEC, "answers")
             await _lock_channel(channel, allow_send=True)
 
             embed = discord.Embed(title="🌌 Spica's Trivia Challenge",
-                                  description=current_q[mode]["q"],
+                                  description=session.question["q"],
                                   color=discord.Color.purple())
             embed.set_thumbnail(url=THUMBNAIL_URL)
             msg = await channel.send(embed=embed)
 
-            round_started_at[mode] = ((msg.id >> 22) + DISCORD_EPOCH)
+            session.started_at = ((msg.id >> 22) + DISCORD_EPOCH)
 
-            try:
-                await asyncio.wait_for(first_correct_events[mode].wait(), timeout=QUIZ_LENGTH_SEC)
-            except asyncio.TimeoutError:
+            await answers_closed
+            if not session.answered:
                 await channel.send(embed=discord.Embed(
                     title="⏱️ Time’s Up!",
                     description="Nobody got it right… maybe next time, Dreamers.",
                     color=discord.Color.dark_grey()))
+                await SCORES.commit_results(collect_round(session)[0])
             else:
-                await asyncio.sleep(POST_ANSWER_WINDOW)
-
-                results = sorted(answerers[mode].values(), key=lambda r: r['time_ms'])
-                lines = []
-                data = await safe_load_data()
-
-                for res in results:
-                    uid = str(res['user'].id)
-                    prev = data.get(uid, {"score": 0, "best_time": float("inf"), "best_question": ""})
-                    if isinstance(prev, int):
-                        prev = {"score": prev, "best_time": float("inf"), "best_question": ""}
-
-                    new_score = prev["score"] + res["points"]
-                    best_time = min(res["time_ms"], prev["best_time"])
-                    best_q = current_q[mode]["q"] if best_time == res["time_ms"] else prev["best_question"]
-
-                    data[uid] = {
-                        "score": new_score,
-                        "total_score": prev.get("total_score", prev["score"]) + res["points"],
-                        "best_time": best_time,
-                        "best_question": best_q
-                    }
-
-                    t = f"{res['time_ms']//1000}.{res['time_ms']%1000:03d}s"
-                    name_display = res['user'].display_name if hasattr(res['user'], 'display_name') else str(uid)
-                    lines.append(f"{name_display} — `{res['points']} pt` ({t})")
-
-                await safe_save_data(data)
+                results, lines = collect_round(session)
+                await SCORES.commit_results(results)
                 await backup_trivia_to_channel()
                 await channel.send(embed=discord.Embed(title="📜 Round Results", description="\n".join(lines), color=discord.Color.gold()).set_thumbnail(url=THUMBNAIL_URL))
 
+            await record_question_stats(session)
             await _lock_channel(channel, allow_send=False)
 
-            elapsed = ((discord.utils.time_snowflake(discord.utils.utcnow()) >> 22) + DISCORD_EPOCH) - round_started_at[mode]
-            remaining = (INTER_ROUND_COOLDOWN * 1000) - elapsed - (PRE_ANNOUNCE_SEC * 1000)
-            if remaining > 0:
-                await asyncio.sleep(remaining / 1000)
-
-            await channel.send(f"<@&1394860483864956948> ✨ Trivia resumes in **5 seconds**…")
-            await asyncio.sleep(PRE_ANNOUNCE_SEC)
+            session.asked += 1
+            session.next_ask = asked_at + INTER_ROUND_COOLDOWN
+            checkpoint_session(session)
     finally:
-        await _lock_channel(channel, allow_send=True)
-        trivia_running_flags[mode] = False
-        current_q[mode] = None
+        # on shutdown the session is checkpointed: leave the channel as it is
+        # (HTTP may already be closed) and let resume_trivia pick it up
+        if not bot.is_closed():
+            await _lock_channel(channel, allow_send=True)
+        end_session(session)
 
 # b!starttrivia 2
-async def speedrun_trivia_loop(channel: discord.TextChannel, mode: int):
-    session_scores = {}
-    questions_asked = 0
-    data = await safe_load_data()
+async def speedrun_trivia_loop(channel: discord.TextChannel, session: TriviaSession):
+    session_scores = session.scores
+    # Scores are journaled each round and written to the store in batches
+    # (every SPEEDRUN_CHECKPOINT_ROUNDS and at the end), not once per round.
+    # Each guild journals to its own file so concurrent sessions never interleave;
+    # journaled rounds are replayed on startup, before a session resumes.
+    ledger = SessionLedger(SCORES, speedrun_journal(session.guild_id))
+    session.next_ask = max(session.next_ask, time.time())
+    checkpoint_session(session)
     try:
-        while trivia_running_flags[mode] and questions_asked < 30:
-            if not trivia_lists[mode]:
-                load_trivia(mode)
-
-            current_q[mode] = trivia_lists[mode].pop()
-            answerers[mode].clear()
-            answered_flags[mode] = False
-            first_correct_events[mode].clear()
+        while session.running and session.asked < 30:
+            await SCHEDULER.sleep_until(session.key, session.next_ask, "cooldown")
+            asked_at = session.next_ask
+            session.new_round(await next_question(channel), asked_at)
+            answers_closed = SCHEDULER.sleep_until(session.key, asked_at + QUIZ_LENGTH_SEC_LOOP, "answers")
 
             embed = discord.Embed(
-                title=f"Spica's Fast Trivia #{questions_asked + 1}",
-                description=current_q[mode]["q"],
+                title=f"Spica's Fast Trivia #{session.asked + 1}",
+                description=session.question["q"],
                 color=discord.Color.teal()
             ).set_thumbnail(url=THUMBNAIL_URL)
 
             question_msg = await channel.send(embed=embed)
-            round_started_at[mode] = ((question_msg.id >> 22) + DISCORD_EPOCH)
+            session.started_at = ((question_msg.id >> 22) + DISCORD_EPOCH)
 
-            try:
-                await asyncio.wait_for(first_correct_events[mode].wait(), timeout=QUIZ_LENGTH_SEC_LOOP)
-            except asyncio.TimeoutError:
+            await answers_closed
+            closed_at = time.time()
+            if not session.answered:
                 await channel.send(embed=discord.Embed(
                     title="⏱️ Time’s Up!",
                     description="Nobody got it right… maybe next one.",
                     color=discord.Color.dark_grey()))
+                await ledger.record(collect_round(session)[0])
             else:
-                await asyncio.sleep(POST_ANSWER_WINDOW)
-
-                results = sorted(answerers[mode].values(), key=lambda r: r['time_ms'])
-                lines = []
-                data = await safe_load_data()
-
+                results, lines = collect_round(session)
                 for res in results:
-                    uid = str(res['user'].id)
-                    session_scores[uid] = session_scores.get(uid, 0) + res["points"]
-                    prev = data.get(uid, {"score": 0, "best_time": float("inf"), "best_question": ""})
-                    if isinstance(prev, int):
-                        prev = {"score": prev, "best_time": float("inf"), "best_question": ""}
-
-                    new_score = prev["score"] + res["points"]
-                    best_time = min(res["time_ms"], prev["best_time"])
-                    best_q = current_q[mode]["q"] if best_time == res["time_ms"] else prev["best_question"]
-
-                    data[uid] = {
-                        "score": new_score,
-                        "total_score": prev.get("total_score", prev["score"]) + res["points"],
-                        "best_time": best_time,
-                        "best_question": best_q
-                    }
-
-                    t = f"{res['time_ms']//1000}.{res['time_ms']%1000:03d}s"
-                    name_display = res['user'].display_name if hasattr(res['user'], 'display_name') else str(uid)
-                    lines.append(f"{name_display} — `{res['points']} pt` ({t})")
-
-                await safe_save_data(data)
-                await backup_trivia_to_channel()
+                    if res["points"]:
+                        session_scores[res["uid"]] = session_scores.get(res["uid"], 0) + res["points"]
+                await ledger.record(results)
 
                 await channel.send(embed=discord.Embed(
                     title="📜 Round Results",
                     description="\n".join(lines),
                     color=discord.Color.gold()))
 
-            await asyncio.sleep(5)
-            questions_asked += 1
+            await record_question_stats(session)
+            session.asked += 1
+            if SPEEDRUN_CHECKPOINT_ROUNDS and session.asked % SPEEDRUN_CHECKPOINT_ROUNDS == 0:
+                await ledger.commit()
+            session.next_ask = closed_at + SPEEDRUN_ROUND_GAP
+            checkpoint_session(session)
+
+        if await ledger.commit():
+            await backup_trivia_to_channel()
 
         if session_scores:
             leaderboard = sorted(session_scores.items(), key=lambda t: t[1], reverse=True)
@@ -763,8 +881,8 @@ async def speedrun_trivia_loop(channel: discord.TextChannel, mode: int):
             await channel.send("No one scored any points this session.")
 
     finally:
-        trivia_running_flags[mode] = False
-        current_q[mode] = None
+        await ledger.commit()
+        end_session(session)
 
 # b!starttrivia main command
 @bot.command()
@@ -773,13 +891,13 @@ async def starttrivia(ctx, mode: int = 1):
         return await ctx.send("❌ Invalid mode. Use `1` (Classic) or `2` (Speedrun).")
 
     # Check if in allowed channel
-    allowed_channels = TRIVIA_MODE1_CHANNELS if mode == 1 else TRIVIA_MODE2_CHANNELS
-    if ctx.channel.id not in allowed_channels:
+    config = GUILD_CONFIG.get(ctx.guild.id) if ctx.guild else None
+    if config is None or ctx.channel.id not in config.trivia_channels(mode):
         return await ctx.send(f"❌ This channel is not allowed for mode {mode}.")
 
     # Permission checks
     is_admin = ctx.author.guild_permissions.administrator
-    has_speedrun_role = any(r.id == 1390941063899774976 for r in ctx.author.roles)
+    has_speedrun_role = any(r.id == config.speedrun_role for r in ctx.author.roles)
 
     if mode == 1:
         if not is_admin:
@@ -788,19 +906,40 @@ async def starttrivia(ctx, mode: int = 1):
         if not (is_admin or has_speedrun_role):
             return await ctx.send("❌ You don’t have permission to start Speedrun Trivia.")
 
-    if trivia_running_flags[mode]:
-        return await ctx.send(f"❗ Trivia mode {mode} is already running!")
+    if (ctx.guild.id, mode) in trivia_sessions:
+        pending = SCHEDULER.next_fire((ctx.guild.id, mode))
+        due = f" Next: {pending[0]} <t:{int(pending[1])}:R>." if pending else ""
+        return await ctx.send(f"❗ Trivia mode {mode} is already running!{due}")
 
-    load_trivia(mode)
-    trivia_running_flags[mode] = True
+    if not TRIVIA_BANK:
+        return await ctx.send("❌ No trivia questions are loaded.")
+    session = trivia_sessions[(ctx.guild.id, mode)] = TriviaSession(ctx.guild.id, mode, ctx.channel.id)
 
     if mode == 1:
-        trivia_tasks[1] = asyncio.create_task(trivia_loop(ctx.channel, mode))
+        session.task = asyncio.create_task(trivia_loop(ctx.channel, session))
         await ctx.send("🌠 Classic Trivia has begun!")
     else:
-        trivia_tasks[2] = asyncio.create_task(speedrun_trivia_loop(ctx.channel, mode))
+        session.task = asyncio.create_task(speedrun_trivia_loop(ctx.channel, session))
         await ctx.send("💫 Speedrun Trivia started!")
 
+async def resume_trivia(guild: discord.Guild):
+    """Restart the guild's trivia sessions that were running when the bot went down."""
+    for key, saved in CHECKPOINTS.get("trivia").items():
+        if saved["guild_id"] != guild.id or (guild.id, saved["mode"]) in trivia_sessions:
+            continue
+        channel = guild.get_channel(saved["channel_id"])
+        if channel is None or not TRIVIA_BANK:
+            if channel is not None:
+                await _lock_channel(channel, allow_send=True)   # don't leave it locked from the cooldown
+            CHECKPOINTS.drop("trivia", key)
+            print(f"[RESUME] Dropped trivia {key}: {'channel is gone' if channel is None else 'no questions loaded'}")
+            continue
+        session = trivia_sessions[(guild.id, saved["mode"])] = TriviaSession.restore(saved)
+        loop = trivia_loop if session.mode == 1 else speedrun_trivia_loop
+        session.task = asyncio.create_task(loop(channel, session))
+        print(f"[RESUME] Trivia mode {session.mode} in {guild.name} ({guild.id}) after {session.asked} questions")
+        await channel.send("♻️ Trivia is back after a restart and carries on where it left off.")
+
 # b!stoptrivia to stop trivia command
 @bot.command()
 @commands.has_permissions(administrator=True)
@@ -808,33 +947,44 @@ async def stoptrivia(ctx, mode: int = 1):
     if mode not in (1, 2):
         return await ctx.send("❌ Invalid mode. Use 1 (Classic) or 2 (Speedrun).")
 
-    allowed_channels = TRIVIA_MODE1_CHANNELS if mode == 1 else TRIVIA_MODE2_CHANNELS
-    if ctx.channel.id not in allowed_channels:
+    if ctx.guild is None or ctx.channel.id not in GUILD_CONFIG.get(ctx.guild.id).trivia_channels(mode):
         return await ctx.send("❌ This channel can't stop that mode.")
 
-    if not trivia_running_flags[mode]:
+    session = trivia_sessions.get((ctx.guild.id, mode))
+    if session is None:
         return await ctx.send("Trivia for that mode isn’t running.")
 
-    trivia_running_flags[mode] = False
-    if trivia_tasks[mode]:
-        trivia_tasks[mode].cancel()
+    session.running = False
+    if session.task:
+        session.task.cancel()
 
     await ctx.send(f"🛑 Trivia mode {mode} stopped.")
 
+def format_best_time(best_time) -> str:
+    """A record's best answer time in ms as "12.345s"; "N/A" if it has none
+    (participation-only records keep best_time = inf)."""
+    if not isinstance(best_time, (int, float)) or not math.isfinite(best_time):
+        return "N/A"
+    best_time = int(best_time)
+    return f"{best_time // 1000}.{best_time % 1000:03d}s"
+
+# Top users by total points earned
+def rank_trivia_users(data: dict, limit: int = 10) -> list:
+    # Only users who ever scored; legacy int scores become {"score": n}
+    valid_data = {
+        uid: stats if isinstance(stats, dict) else {"score": stats}
+        for uid, stats in data.items() if total_points(stats) > 0
+    }
+    return sorted(valid_data.items(), key=lambda t: total_points(t[1]), reverse=True)[:limit]
+
 # b!triviatop to view top points
 @bot.command()
 async def triviatop(ctx):
-    data = await safe_load_data()
+    data = await SCORES.read()
     if not data:
         return await ctx.send("Nobody has scored yet!")
 
-    # Filter out users with valid structured data
-    valid_data = {
-        uid: stats if isinstance(stats, dict) else {"score": stats}
-        for uid, stats in data.items()
-    }
-
-    top5 = sorted(valid_data.items(), key=lambda t: t[1].get("total_score", t[1].get("score", 0)), reverse=True)[:10]
+    top5 = rank_trivia_users(data)
     lines = []
     footer_info = get_footer_info(ctx.guild)
 
@@ -843,7 +993,7 @@ async def triviatop(ctx):
         score = stats.get("score", 0)
         best_time = stats.get("best_time")
         question = stats.get("best_question", "–")
-        time_str = f"{best_time // 1000}.{best_time % 1000:03d}s" if isinstance(best_time, (int, float)) else "N/A"
+        time_str = format_best_time(best_time)
         total_score = stats.get("total_score", score)
         
         lines.append(
@@ -876,11 +1026,11 @@ async def triviastats(ctx, target_input: str = None):
             return await ctx.send("❌ Couldn't find that user.")
         
     uid = str(target.id)
-    data = await safe_load_data()
+    data = await SCORES.read()
     stats = data.get(uid)
     footer_info = get_footer_info(ctx.guild)
 
-    if not stats:
+    if not total_points(stats):
         return await ctx.send(f"{target.display_name} hasn't scored yet!")
 
     # Handle legacy int-only score
@@ -891,16 +1041,26 @@ async def triviastats(ctx, target_input: str = None):
     total_score = stats.get("total_score", score)
     best_time = stats.get("best_time")
     question = stats.get("best_question", "–")
-    time_str = f"{best_time // 1000}.{best_time % 1000:03d}s" if isinstance(best_time, (int, float)) else "N/A"
+    time_str = format_best_time(best_time)
+
+    description = (
+        f"💰 **Available Points:** `{score}` pts\n"
+        f"⭐ **Total Points Earned:** `{total_score}` pts\n"
+        f"⚡ **Fastest Answer:** `{time_str}`\n"
+        f"🧠 **Best Question:** *{question}*"
+    )
+    summary = answer_summary(stats)
+    if summary:
+        description += (f"\n🎯 **Accuracy:** `{summary['correct']}/{summary['rounds']}` rounds "
+                        f"(`{summary['accuracy']:.0%}`)")
+        if summary["mean_ms"] is not None:
+            description += (f"\n⏱️ **Average Answer:** `{summary['mean_ms'] / 1000:.2f}s` "
+                            f"± `{summary['stdev_ms'] / 1000:.2f}s`\n"
+                            f"⌨️ **Typing Speed:** `{summary['wpm']:.0f}` WPM")
 
     embed = discord.Embed(
         title=f"📊 Trivia Stats – {target.display_name}",
-        description=(
-            f"💰 **Available Points:** `{score}` pts\n"
-            f"⭐ **Total Points Earned:** `{total_score}` pts\n"
-            f"⚡ **Fastest Answer:** `{time_str}`\n"
-            f"🧠 **Best Question:** *{question}*"
-        ),
+        description=description,
         color=discord.Color.gold()
     )
     embed.set_thumbnail(url=target.display_avatar.url)
@@ -909,85 +1069,65 @@ async def triviastats(ctx, target_input: str = None):
 
 # Trivia role shop
 ROLE_SHOP_FILE = "role_shop.json"
-ROLE_SHOP: dict[int, int] = {}          # role‑id ➜ cost
+ROLE_SHOP = MappingProxyType({})        # role‑id ➜ cost
 
-def load_role_shop() -> None:
-    global ROLE_SHOP
-    p = pathlib.Path(ROLE_SHOP_FILE)
-    if not p.exists():
+def parse_role_shop(text: str | None):
+    if text is None:
         print(f"[SHOP] '{ROLE_SHOP_FILE}' not found – shop disabled.")
-        ROLE_SHOP.clear()
-        return
-    try:
-        raw = json.loads(p.read_text())
-        # convert keys to int
-        ROLE_SHOP = {int(rid): int(cost) for rid, cost in raw.items() if str(cost).isdigit()}
-        print(f"[SHOP] Loaded {len(ROLE_SHOP)} purchasable roles.")
-    except Exception as e:
-        print("[SHOP] failed loading:", e)
-        ROLE_SHOP.clear()
+        return MappingProxyType({})
+    raw = json.loads(text)
+    if not isinstance(raw, dict):
+        raise ValueError("expected an object of role id -> cost")
+    # convert keys to int
+    return MappingProxyType({int(rid): int(cost) for rid, cost in raw.items() if str(cost).isdigit()})
 
 ROLE_ALIASES_FILE = "role_aliases.json"
-ROLE_ALIASES: dict[str, int] = {}   # alias ➜ role ID
+ROLE_ALIASES = MappingProxyType({})     # alias ➜ role ID
 
-def load_role_aliases():
-    global ROLE_ALIASES
-    p = pathlib.Path(ROLE_ALIASES_FILE)
-    if not p.exists():
+def parse_role_aliases(text: str | None):
+    if text is None:
         print("[SHOP] role_aliases.json not found")
-        ROLE_ALIASES.clear()
-        return
-    try:
-        raw = json.loads(p.read_text())
-        # lowercase all aliases, convert IDs to int
-        ROLE_ALIASES = {alias.lower(): int(rid) for alias, rid in raw.items()}
-        print(f"[SHOP] Loaded {len(ROLE_ALIASES)} role aliases.")
-    except Exception as e:
-        print("[SHOP] Failed to load aliases:", e)
-        ROLE_ALIASES.clear()
-
-async def get_user_score(uid: str) -> int:
-    data = await safe_load_data()
-    entry = data.get(uid)
-    if isinstance(entry, dict):
-        return entry.get("score", 0)
-    return int(entry or 0)
-
-async def change_user_score(uid: str, delta: int):
-    """delta can be negative to deduct"""
-    async with FILE_LOCK:
-        data = load_trivia_data()
-        entry = data.get(uid)
-        if isinstance(entry, dict):
-            entry["score"] = max(0, entry.get("score", 0) + delta)
-        else:  # legacy int or None
-            entry = {"score": max(0, (int(entry or 0) + delta)),
-                     "best_time": float("inf"), "best_question": ""}
-        data[uid] = entry
-        save_trivia_data(data)
+        return MappingProxyType({})
+    raw = json.loads(text)
+    if not isinstance(raw, dict):
+        raise ValueError("expected an object of alias -> role id")
+    # lowercase all aliases, convert IDs to int
+    return MappingProxyType({alias.lower(): int(rid) for alias, rid in raw.items()})
+
+# Why the bot can't hand out `role`, or None if it can
+def role_grant_problem(guild: discord.Guild, role: discord.Role) -> str | None:
+    me = guild.me
+    if not me.guild_permissions.manage_roles:
+        return "I don't have the Manage Roles permission."
+    if role >= me.top_role or role.managed:
+        return "That role is above my highest role, so I can't assign it."
+    return None
 
 # b!triviashop to buy roles
-@bot.command(name="triviashop", aliases=["shop"])
-async def triviashop(ctx):
+def render_triviashop(guild) -> dict:
     if not ROLE_SHOP or not ROLE_ALIASES:
-        return await ctx.send("🛒 The Spica Shop is empty right now. Maybe later... ✨")
+        return {"content": "🛒 The Spica Shop is empty right now. Maybe later... ✨"}
 
     lines = []
     for alias, role_id in ROLE_ALIASES.items():
         cost = ROLE_SHOP.get(role_id)
-        role = ctx.guild.get_role(role_id)
+        role = guild.get_role(role_id) if guild else None
         if role and cost is not None:
             lines.append(f"**{alias}** → {role.mention} — **{cost} pts**")
 
     if not lines:
-        return await ctx.send("🛒 No valid roles available for this server.")
+        return {"content": "🛒 No valid roles available for this server."}
 
     embed = discord.Embed(
         title="🌠 Spica's Cosmic Role Shop",
         description="\n".join(lines),
         color=discord.Color.magenta()
     ).set_footer(text="Use b!buy <alias> to claim your destiny ✨!")
-    await ctx.send(embed=embed)
+    return {"embed": embed}
+
+@bot.command(name="triviashop", aliases=["shop"])
+async def triviashop(ctx):
+    await ctx.send(**RENDERS.get("triviashop", ctx.guild))
 
 # b!buyrole to buy role using points
 @bot.command(name="buy", aliases=["buyrole"])
@@ -1011,20 +1151,29 @@ async def buy_role(ctx, *, alias: str = None):
     if role in ctx.author.roles:
         return await ctx.send("You already have that role!")
 
+    if role_id in await SCORES.owned_roles(str(ctx.author.id)):
+        return await ctx.send(f"You already own that role! Use `b!setrole {alias}` to wear it.")
+
+    # Check we can grant it before touching any points
+    problem = role_grant_problem(ctx.guild, role)
+    if problem:
+        return await ctx.send(f"❌ {problem}")
+
+    # Balance check + deduct + purchase record in one write, keyed by this message
     uid = str(ctx.author.id)
-    current_score = await get_user_score(uid)
-    if current_score < cost:
-        return await ctx.send(f"❌ You need **{cost} pts**, but you only have **{current_score} pts**.")
+    key = str(ctx.message.id)
+    status, balance = await SCORES.purchase(uid, role_id, cost, key)
+    if status == "insufficient":
+        return await ctx.send(f"❌ You need **{cost} pts**, but you only have **{balance} pts**.")
+    if status == "duplicate":
+        return
 
-    # Deduct + try to give role
-    await change_user_score(uid, -cost)
     try:
         await ctx.author.add_roles(role, reason="Bought from trivia shop")
-    except discord.Forbidden:
-        await change_user_score(uid, cost)
+    except discord.HTTPException:
+        await SCORES.refund_purchase(uid, key)
         return await ctx.send("❌ Couldn't assign the role (permissions issue). Refunded your points.")
-    
-    await backup_trivia_to_channel()
+
     await ctx.send(f"{ctx.author.name} has purchased {role.mention}!")
 
 @bot.command(name="setrole")
@@ -1045,10 +1194,7 @@ async def set_role(ctx, *, alias: str = None):
         return await ctx.send("You're already wearing that role!")
 
     uid = str(ctx.author.id)
-    user_score = await get_user_score(uid)
-
-    # Optional: Validate if they've bought it before by assuming roles owned = bought
-    if user_score + ROLE_SHOP.get(role_id, 99999999) >= await get_user_score(uid):
+    if role_id not in await SCORES.owned_roles(uid):
         return await ctx.send("❌ You haven't bought this role yet.")
 
     try:
@@ -1075,60 +1221,86 @@ async def unset_role(ctx, *, alias: str = None):
     if role not in ctx.author.roles:
         return await ctx.send("❌ You don't currently have this role equipped.")
 
+    # Roles bought before the inventory existed are only known by being worn:
+    # record them now so they can be equipped again with b!setrole
+    await SCORES.grant_role(str(ctx.author.id), role_id)
+
     try:
         await ctx.author.remove_roles(role, reason="Unequipped purchased role")
         await ctx.send(f"{ctx.author.mention} has unequipped {role.mention}.")
     except discord.Forbidden:
         await ctx.send("❌ Couldn't remove the role (permissions issue).")
 
+# b!inventory to list bought roles
+@bot.command(name="inventory", aliases=["inv"])
+async def inventory(ctx):
+    owned = await SCORES.owned_roles(str(ctx.author.id))
+    if not owned:
+        return await ctx.send("🎒 You haven't bought any roles yet. Check `b!triviashop`!")
+
+    aliases = {role_id: alias for alias, role_id in ROLE_ALIASES.items()}
+    lines = []
+    for role_id in sorted(owned):
+        role = ctx.guild.get_role(role_id)
+        if not role:
+            continue
+        state = "✅ equipped" if role in ctx.author.roles else "`b!setrole " + aliases.get(role_id, "?") + "`"
+        lines.append(f"{role.mention} — {state}")
+
+    await ctx.send(embed=discord.Embed(
+        title=f"🎒 {ctx.author.display_name}'s Roles",
+        description="\n".join(lines) or "None of your roles exist in this server.",
+        color=discord.Color.magenta()))
+
 # Listener function for answer
 @bot.event
 async def on_message(message: discord.Message):
     await bot.process_commands(message)
 
-    if message.author.bot or not message.content.strip():
+    if message.author.bot or message.guild is None or not message.content.strip():
         return
 
-    channel_id = message.channel.id
-
     for mode in (1, 2):
-        if not trivia_running_flags[mode]:
+        session = trivia_sessions.get((message.guild.id, mode))
+        if session is None or not session.running or session.channel_id != message.channel.id:
             continue
 
-        # Check if message is in a valid channel for this mode
-        valid_channels = TRIVIA_MODE1_CHANNELS if mode == 1 else TRIVIA_MODE2_CHANNELS
-        if channel_id not in valid_channels:
-            continue
-
-        if current_q[mode] is None or not message.channel.permissions_for(message.author).send_messages:
+        if session.question is None or not message.channel.permissions_for(message.author).send_messages:
             continue
 
         # Check if answer is correct
-        if is_correct_answer(current_q[mode]["answers"], message):
-            if message.author.id in answerers[mode]:
+        if is_correct_answer(session.question, message):
+            if message.author.id in session.answerers:
                 return  # Already answered
 
             now_ms = ((message.id >> 22) + DISCORD_EPOCH)
-            delta = now_ms - round_started_at[mode]
+            delta = now_ms - session.started_at
 
-            answerers[mode][message.author.id] = {
+            session.answerers[message.author.id] = {
                 "user": message.author,
-                "points": 2 if not answered_flags[mode] else 1,
+                "points": 2 if not session.answered else 1,
                 "time_ms": delta,
-                "formatted_time": f"{delta // 1000}.{delta % 1000:03d}s"
+                "formatted_time": f"{delta // 1000}.{delta % 1000:03d}s",
+                "chars": len(message.content.strip()),
             }
 
-            if not answered_flags[mode]:
-                answered_flags[mode] = True
-                first_correct_events[mode].set()
+            if not session.answered:
+                session.answered = True
+                # the answer window now closes POST_ANSWER_WINDOW after this message
+                SCHEDULER.advance(session.key, (now_ms / 1000) + POST_ANSWER_WINDOW, "answers")
+        else:
+            session.attempted.add(message.author.id)
 
 @bot.event
 async def on_message_edit(message_before, message_after):
-    if message_before.author == bot.user or (ctx.guild.get_role(1387624066801733643) in message.author.roles):
+    if message_before.guild is None or message_before.author == bot.user:
+        return
+    config = GUILD_CONFIG.get(message_before.guild.id)
+    if any(r.id == config.bot_role for r in getattr(message_before.author, "roles", ())):
         return
 
-    if message_before.guild.id in list(LOGGING_CHANNELS.keys()):
-        channel = bot.get_channel(LOGGING_CHANNELS[message_before.guild.id])
+    channel = bot.get_channel(config.log_channel or 0)
+    if channel:
 
         embed = discord.Embed(
             title="Edited Message Logged:",
@@ -1170,11 +1342,14 @@ async def on_message_edit(message_before, message_after):
 
 @bot.event
 async def on_message_delete(message):
-    if message.author == bot.user or (ctx.guild.get_role(1387624066801733643) in message.author.roles):
+    if message.guild is None or message.author == bot.user:
+        return
+    config = GUILD_CONFIG.get(message.guild.id)
+    if any(r.id == config.bot_role for r in getattr(message.author, "roles", ())):
         return
 
-    if message.guild.id in list(LOGGING_CHANNELS.keys()):
-        channel = bot.get_channel(LOGGING_CHANNELS[message.guild.id])
+    channel = bot.get_channel(config.log_channel or 0)
+    if channel:
 
         embed = discord.Embed(
             title = "Deleted Message Logged",
@@ -1202,22 +1377,30 @@ async def on_message_delete(message):
 
         await channel.send("Deleted Message Detected", embed=embed)
 
-# Hourly backup, on trivia_data.json
+def configured_channels(setting: str) -> list:
+    """Every guild's `setting` channel (e.g. "birthday_channel") that the bot can see."""
+    return [channel for config in GUILD_CONFIG.all()
+            if (channel := bot.get_channel(getattr(config, setting) or 0))]
+
+def score_backup_files(suffix: str) -> list:
+    """Every non-empty score partition as an attachment, e.g. trivia_data_backup_<ts>.json."""
+    return [discord.File(fp=p, filename=f"{p.stem}_{suffix}{p.suffix}") for p in SCORES.files()]
+
+# Hourly backup, on trivia_data.json and the other score partitions
 @tasks.loop(minutes=BACKUP_INTERVAL_MINUTES)
 async def backup_trivia_data():
     try:
         async with FILE_LOCK:
-            p = pathlib.Path(TRIVIA_DATA_FILE)
-            if not p.exists() or p.stat().st_size == 0:
+            if not SCORES.files():
                 return
             channel = bot.get_channel(BACKUP_CHANNEL_ID)
-            if channel is None:
+            if not channel:
                 print("[BACKUP TRIVIA] backup channel not found")
                 return
             ts = datetime.utcnow().strftime("%Y-%m-%d_%H-%M")
             await channel.send(
                 content=f"🗂️ **Trivia backup – UTC {ts}**",
-                file=discord.File(fp=TRIVIA_DATA_FILE, filename=f"trivia_data_backup_{ts}.json"))
+                files=score_backup_files(f"backup_{ts}"))
             print("[BACKUP TRIVIA] sent backup", ts)
     except Exception as e:
         print("[BACKUP TRIVIA] error:", e)
@@ -1231,7 +1414,7 @@ async def backup_birthday_data():
             if not p.exists() or p.stat().st_size == 0:
                 return
             channel = bot.get_channel(BACKUP_CHANNEL_ID)
-            if channel is None:
+            if not channel:
                 print("[BACKUP BDAY] channel not found")
                 return
             ts = datetime.utcnow().strftime("%Y-%m-%d_%H-%M")
@@ -1246,8 +1429,7 @@ async def backup_birthday_data():
 async def backup_trivia_to_channel():
     try:
         async with FILE_LOCK:
-            p = pathlib.Path(TRIVIA_DATA_FILE)
-            if not p.exists() or p.stat().st_size == 0:
+            if not SCORES.files():
                 return
             channel = bot.get_channel(BACKUP_CHANNEL_ID)
             if not channel:
@@ -1256,7 +1438,7 @@ async def backup_trivia_to_channel():
             ts = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
             await channel.send(
                 content=f"📦 **Auto Trivia Backup – UTC {ts}**",
-                file=discord.File(fp=TRIVIA_DATA_FILE, filename=f"trivia_data_auto_{ts}.json"))
+                files=score_backup_files(f"auto_{ts}"))
             print(f"[AUTO BACKUP] Sent backup at {ts}")
     except Exception as e:
         print("[AUTO BACKUP ERROR]", e)
@@ -1270,14 +1452,13 @@ async def backuptrivia(ctx):
     
     try:
         async with FILE_LOCK:
-            p = pathlib.Path(TRIVIA_DATA_FILE)
-            if not p.exists() or p.stat().st_size == 0:
+            if not SCORES.files():
                 return await ctx.send("⚠️ Trivia data file is empty or missing.")
 
             ts = datetime.utcnow().strftime("%Y-%m-%d_%H-%M")
             await ctx.send(
                 content=f"🗂️ **Manual Trivia Backup – UTC {ts}**",
-                file=discord.File(fp=TRIVIA_DATA_FILE, filename=f"trivia_data_backup_{ts}.json"))
+                files=score_backup_files(f"backup_{ts}"))
             print("[MANUAL BACKUP] Sent successfully")
     
     except Exception as e:
@@ -1285,39 +1466,27 @@ async def backuptrivia(ctx):
         await ctx.send("⚠️ Failed to send backup.")
 
 # Hit commands
-TEMPLATES: list[str] = []
-DAMAGES:   list[str] = []
-SPICA_HIT_LINES: list[str] = []
-
-def load_spica_lines():
-    path = pathlib.Path("spica_hit_lines.csv")
-    if path.exists():
-        with path.open(encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            SPICA_HIT_LINES.clear()
-            SPICA_HIT_LINES.extend(row['line'] for row in reader if row.get('line'))
-
-def _load_file(path: str) -> list[str]:
-    out = []
-    p = pathlib.Path(path)
-    if not p.exists():
-        print(f"[HIT] File not found: {p.resolve()}")
-        return out
-    with p.open(encoding="utf-8") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row and row[0].strip():
-                out.append(row[0].strip())
-    print(f"[HIT] loaded {len(out):>3} lines from {path}")
-    return out
-
-def load_hit_assets():
-    """populate TEMPLATES and DAMAGES lists"""
-    TEMPLATES[:] = _load_file(TEMPLATE_FILE)
-    DAMAGES[:]   = _load_file(DAMAGE_FILE)
-
-# load once at import time
-load_hit_assets()
+SPICA_HIT_FILE = "spica_hit_lines.csv"
+# compiled LineTemplates; placeholders each file may use
+TEMPLATES: tuple = ()           # {attacker} {target} {damage}
+DAMAGES:   tuple = ()           # {target}
+SPICA_HIT_LINES: tuple = ()     # {attacker}
+
+def parse_spica_lines(text: str | None):
+    if text is None:
+        return ()
+    lines = [row['line'] for row in csv.DictReader(io.StringIO(text)) if row.get('line')]
+    return compile_lines(lines, {"attacker"})
+
+def parse_line_file(path: str, fields: set[str]):
+    """parser for single-column line files such as TEMPLATE_FILE and DAMAGE_FILE"""
+    def parse(text: str | None):
+        if text is None:
+            print(f"[HIT] File not found: {pathlib.Path(path).resolve()}")
+            return ()
+        lines = [row[0].strip() for row in csv.reader(io.StringIO(text)) if row and row[0].strip()]
+        return compile_lines(lines, fields)
+    return parse
 
 # b!hit to hit people
 @bot.command()
@@ -1329,7 +1498,7 @@ async def hit(ctx, target: discord.Member = None):
         if not SPICA_HIT_LINES:
             await ctx.send("⚠️ No Spica hit lines loaded.")
             return
-        line = random.choice(SPICA_HIT_LINES).replace("{attacker}", attacker_name)
+        line = random.choice(SPICA_HIT_LINES).render({"attacker": attacker_name})
         embed = discord.Embed(
             title="🌠 A blow is dealt to Spica!",
             description=line,
@@ -1344,11 +1513,11 @@ async def hit(ctx, target: discord.Member = None):
         template = random.choice(TEMPLATES)
         damage = random.choice(DAMAGES)
 
-        if "{damage}" in template:
-            result = (template.replace("{attacker}", attacker_name).replace("{target}", target.display_name).replace("{damage}", damage.replace("{target}", target.display_name)))
-        else:
-            result = (template.replace("{attacker}", attacker_name).replace("{target}", target.display_name))
-            result = f"{result}\n{damage.replace('{target}', target.display_name)}"
+        values = {"attacker": attacker_name, "target": target.display_name}
+        values["damage"] = damage.render(values)
+        result = template.render(values)
+        if "damage" not in template:
+            result = f"{result}\n{values['damage']}"
 
         embed = discord.Embed(
             title="💥 A hit has been landed!",
@@ -1398,13 +1567,13 @@ async def birthday_checker():
     data = load_birthdays()
     now = datetime.utcnow()
     today = (now.day, now.month)
-    channel = bot.get_channel(1387429732370481173)
+    channels = configured_channels("birthday_channel")
 
     for uid, bday in data.items():
         if (bday["day"], bday["month"]) == today:
             try:
                 user = await bot.fetch_user(int(uid))
-                if channel:
+                for channel in channels:
                     if "year" in bday:
                         age = now.year - bday["year"]
                         await channel.send(f"🎉 Happy birthday {user.mention}!! You are now **{age}** years old! 🎂")
@@ -1413,12 +1582,161 @@ async def birthday_checker():
             except Exception as e:
                 print(f"Error sending birthday message: {e}")
 
-# Help Command
+# b!perf for per-command latency over the last hour
+@bot.command(name="perf")
+@commands.has_permissions(administrator=True)
+async def perf_report(ctx):
+    rows = PERF.report()
+    if not rows:
+        return await ctx.send("No commands recorded in the last hour.")
+
+    def ms(seconds):
+        return f"{seconds * 1000:.0f}"
+
+    embed = discord.Embed(title="⏱️ Command Latency — last hour",
+                          description="wall p50 / p95 / p99 in ms, then median time per segment",
+                          color=discord.Color.blurple())
+    for row in rows[:20]:
+        p50, p95, p99 = row["wall"]
+        seg = row["segments"]
+        embed.add_field(
+            name=f"b!{row['command']} ×{row['count']}",
+            value=(f"`{ms(p50)} / {ms(p95)} / {ms(p99)}`\n"
+                   f"fs {ms(seg['firestore'])} · store {ms(seg['store'])} · "
+                   f"discord {ms(seg['discord'])} · cpu {ms(seg['cpu'])}"),
+            inline=True)
+    await ctx.send(embed=embed)
+
+# Per-shard gateway stats: every dispatched event bumps the shard's gateway
+# sequence number, so sampling it gives event rates without a listener per event.
+# discord.py has no public accessor for it (the socket events don't say which
+# shard they came from), so the lookup is guarded: if a library release moves
+# it, rates simply stop being reported.
+SHARD_EVENT_RATES: dict[int, float] = {}    # shard id -> events/s over the last sample
+_shard_sequences: dict[int, int] = {}
+
+def shard_guild_counts() -> dict[int, int]:
+    counts = dict.fromkeys(bot.shards, 0)
+    for guild in bot.guilds:
+        counts[guild.shard_id] = counts.get(guild.shard_id, 0) + 1
+    return counts
+
+def shard_sequence(info) -> int | None:
+    """The shard's last gateway sequence number, None if it can't be read."""
+    ws = getattr(getattr(info, "_parent", None), "ws", None)    # ShardInfo has no public sequence
+    if ws is None or not hasattr(ws, "sequence"):
+        return None
+    seq = ws.sequence
+    if seq is None:                 # nothing dispatched yet on this session
+        return 0
+    return seq if isinstance(seq, int) else None
+
+@tasks.loop(seconds=SHARD_STATS_SECONDS)
+async def sample_shard_events():
+    for sid, info in bot.shards.items():
+        seq = shard_sequence(info)
+        if seq is None:
+            SHARD_EVENT_RATES.pop(sid, None)
+            _shard_sequences.pop(sid, None)
+            continue
+        last = _shard_sequences.get(sid)
+        _shard_sequences[sid] = seq
+        if last is None:
+            continue
+        received = seq - last if seq >= last else seq  # a new session restarts the sequence
+        GATEWAY_EVENTS.labels(sid).inc(received)
+        SHARD_EVENT_RATES[sid] = received / SHARD_STATS_SECONDS
+
+# b!shards for per-shard latency, event rate and guild count
+@bot.command(name="shards")
+@commands.has_permissions(administrator=True)
+async def shards_report(ctx):
+    guilds = shard_guild_counts()
+    here = ctx.guild.shard_id if ctx.guild else None
+    lines = []
+    for sid, latency in sorted(bot.latencies):
+        ms = f"{latency * 1000:.0f}ms" if math.isfinite(latency) else "not connected"
+        marker = " ← this server" if sid == here else ""
+        rate = SHARD_EVENT_RATES.get(sid)
+        rate = f"{rate:.1f} events/s" if rate is not None else "events/s n/a"
+        lines.append(f"**Shard {sid}** — {ms} · {rate} · "
+                     f"{guilds.get(sid, 0)} guilds{marker}")
+    embed = discord.Embed(title="🛰️ Shards", description="\n".join(lines) or "No shards connected.",
+                          color=discord.Color.blurple())
+    embed.set_footer(text=f"{len(lines)} of {bot.shard_count or len(lines)} shards in this process")
+    await ctx.send(embed=embed)
+
+# b!qstats to find questions that are too hard, too easy or never solved
 @bot.command()
-async def help(ctx):
-    if ctx.guild and (ctx.guild.id, ctx.channel.id) not in ALLOWED_CHANNELS:
-        return
+@commands.has_permissions(administrator=True)
+async def qstats(ctx, view: str = "hard"):
+    view = view.lower()
+    if view not in ("hard", "easy", "dead"):
+        return await ctx.send("❌ Use `b!qstats hard`, `b!qstats easy` or `b!qstats dead`.")
 
+    rows = QUESTION_STATS.ranked((q["q"] for q in TRIVIA_BANK), view)
+    if not rows:
+        return await ctx.send("Not enough rounds recorded yet.")
+
+    lines = []
+    for text, rec in rows[:10]:
+        timing = (f"p50 `{rec.times.quantile(0.5):.1f}s` · p90 `{rec.times.quantile(0.9):.1f}s`"
+                  if rec.solved else "never solved")
+        lines.append(f"**{text[:80]}**\nasked `{rec.asked}` · solved `{rec.solved / rec.asked:.0%}` · {timing}")
+
+    embed = discord.Embed(title=f"📊 Trivia Questions — {view}",
+                          description="\n\n".join(lines),
+                          color=discord.Color.blurple())
+    embed.set_footer(text=f"{len(rows)} questions asked at least {MIN_ASKED} times")
+    await ctx.send(embed=embed)
+
+# b!config to view or change this server's channels and roles
+@bot.command(name="config")
+@commands.has_permissions(administrator=True)
+async def config_command(ctx, action: str = None, key: str = None, *, value: str = None):
+    if ctx.guild is None:
+        return await ctx.send("❌ Server settings can only be changed in a server.")
+    usage = ("Usage: `b!config`, `b!config set <setting> <value>`, `b!config add|remove <setting> <#channel>`, "
+             "`b!config clear <setting>`\nSettings: " + ", ".join(f"`{k}`" for k in SETTINGS))
+
+    if action is None:
+        config = GUILD_CONFIG.get(ctx.guild.id)
+        lines = []
+        for name, kind in SETTINGS.items():
+            current = getattr(config, name)
+            if kind == "channels":
+                shown = " ".join(f"<#{c}>" for c in sorted(current)) or "–"
+            elif kind == "channel":
+                shown = f"<#{current}>" if current else "–"
+            elif kind == "role":
+                shown = f"<@&{current}>" if current else "–"
+            else:
+                shown = current or "–"
+            lines.append(f"**{name}:** {shown}")
+        return await ctx.send(embed=discord.Embed(title=f"⚙️ Settings — {ctx.guild.name}",
+                                                  description="\n".join(lines), color=discord.Color.blurple()))
+
+    action = action.lower()
+    kind = SETTINGS.get(key or "")
+    if action not in ("set", "add", "remove", "clear") or kind is None or (action != "clear" and not value):
+        return await ctx.send(usage)
+
+    parsed = value
+    if action != "clear" and kind != "text":
+        digits = "".join(ch for ch in value if ch.isdigit())
+        found = (ctx.guild.get_role if kind == "role" else ctx.guild.get_channel)(int(digits or 0))
+        if found is None:
+            return await ctx.send(f"❌ `{value}` is not a {'role' if kind == 'role' else 'channel'} in this server.")
+        parsed = found.id
+
+    try:
+        await GUILD_CONFIG.update(ctx.guild.id, key, action, parsed)
+    except ValueError as e:
+        return await ctx.send(f"❌ {e}")
+    await ctx.send(f"✅ `{key}` updated ({action}).")
+
+# Help Command
+def render_help(guild) -> dict:
     embed = discord.Embed(
         title="🌌 B1jou — Help Menu",
         description="May your journey through the stars be guided...\nHere's how you may interact with me:",
@@ -1466,11 +1784,12 @@ async def help(ctx):
             "`b!starttrivia 1` — Start Classic Trivia (Admins only)\n"
             "`b!starttrivia 2` — Start Speedrun Trivia (Admins or Gemstone Collectors 💎)\n"
             "`b!stoptrivia [mode]` — Stop an active trivia session\n"
-            "`b!triviastats [user]` — View trivia stats including best time, average, and WPM\n"
+            "`b!triviastats [user]` — View trivia stats including best time, average, WPM and accuracy\n"
             "`b!triviatop` — See the trivia leaderboard\n"
             "`b!triviashop` — View the role shop\n"
             "`b!buyrole <id>` — Spend trivia points to buy roles\n"
-            "`b!setrole <id>` — Set your purchased role on or off\n"
+            "`b!setrole <id>` • `b!unsetrole <id>` — Wear or take off a role you bought\n"
+            "`b!inventory` — List the roles you own\n"
             "`b!pingtrivia` — Assign role to ping when Classic Trivia happens\n"
             "`b!unpingtrivia` — Remove role to ping when Classic Trivia happens"
         ),
@@ -1490,42 +1809,181 @@ async def help(ctx):
     embed.set_thumbnail(url=THUMBNAIL_URL)
     embed.set_footer(
         text="Use your prayers wisely, Dreamer...",
-        icon_url=get_footer_info(ctx.guild)["icon_url"]
+        icon_url=get_footer_info(guild)["icon_url"]
     )
+    return {"embed": embed}
 
-    await ctx.send(embed=embed)
+@bot.command()
+async def help(ctx):
+    if not in_channels(ctx, "command_channels"):
+        return
+    await ctx.send(**RENDERS.get("help", ctx.guild))
+
+# help and triviashop are built once per guild and rebuilt only after something they show changes
+RENDERS = RenderCache()
+RENDERS.register("help", render_help)
+RENDERS.register("triviashop", render_triviashop, assets=("role_shop", "role_aliases"))
+GUILD_CONFIG.listeners.append(lambda guild_id, key: RENDERS.invalidate_guild(guild_id))
+REGISTRY.gauge("b1jou_render_cache_lookups", "Render cache lookups", ["result"],
+               callback=lambda: {(result,): n for result, n in RENDERS.stats.items()})
+
+@bot.event
+async def on_guild_role_create(role):
+    RENDERS.invalidate_guild(role.guild.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    RENDERS.invalidate_guild(after.guild.id)
+
+@bot.event
+async def on_guild_role_delete(role):
+    RENDERS.invalidate_guild(role.guild.id)
+
+@bot.event
+async def on_guild_update(before, after):
+    if before.icon != after.icon or before.name != after.name:
+        RENDERS.invalidate_guild(after.id)
+
+@bot.event
+async def on_guild_remove(guild):
+    RENDERS.invalidate_guild(guild.id)
+
+# Content assets: parsed off the loop, swapped in together, reloadable while running
+def _swap(name: str):
+    return lambda value: globals().__setitem__(name, value)
+
+ASSETS = AssetRegistry()
+ASSETS.register("jou", JOU_CSV, parse_jou_lines, _swap("JOU_LINES"))
+ASSETS.register("hit_templates", TEMPLATE_FILE,
+                parse_line_file(TEMPLATE_FILE, {"attacker", "target", "damage"}), _swap("TEMPLATES"))
+ASSETS.register("damage_phrases", DAMAGE_FILE, parse_line_file(DAMAGE_FILE, {"target"}), _swap("DAMAGES"))
+ASSETS.register("spica_hit_lines", SPICA_HIT_FILE, parse_spica_lines, _swap("SPICA_HIT_LINES"))
+ASSETS.register("role_shop", ROLE_SHOP_FILE, parse_role_shop, _swap("ROLE_SHOP"))
+ASSETS.register("role_aliases", ROLE_ALIASES_FILE, parse_role_aliases, _swap("ROLE_ALIASES"))
+ASSETS.register("trivia", TRIVIA_CSV, parse_trivia, apply_trivia_bank)
+ASSETS.listeners.append(RENDERS.invalidate_assets)
+
+# Independent asset loads run concurrently in worker threads
+async def load_assets():
+    report = await ASSETS.reload(force=True)
+    print(f"[ASSETS] {report.summary()} in {report.elapsed * 1000:.0f}ms")
+
+@tasks.loop(seconds=ASSET_WATCH_SECONDS)
+async def watch_assets():
+    report = await ASSETS.reload()
+    if report.changed or report.errors:
+        print(f"[ASSETS] reloaded: {report.summary()} in {report.elapsed * 1000:.0f}ms")
+
+# b!reload to pick up content changes right away
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def reload(ctx):
+    report = await ASSETS.reload()
+    await ctx.send(f"🔄 Reload finished in `{report.elapsed * 1000:.0f} ms`: {report.summary()}")
+
+def _record_loop_lag(lag: float):
+    LOOP_LAG.set(lag)
+    LOOP_LAG_SECONDS.observe(lag)
+
+LOOP_WATCHDOG = LoopWatchdog(threshold=LOOP_BLOCK_THRESHOLD, on_lag=_record_loop_lag,
+                             on_block=lambda stalled, stack: LOOP_BLOCKS.inc())
+
+# Runs once before the gateway connects: warm Firestore and load assets in parallel
+@bot.event
+async def setup_hook():
+    instrument_http(bot.http)
+    bot.add_dynamic_items(JoinActionButton)     # join review buttons, also on messages from before a restart
+    LOOP_WATCHDOG.start()
+
+    # ⏳ Start webserver
+    with startup_phase("webserver"):
+        await WEB_SERVER.start()
+
+    async def warm_firestore():
+        with startup_phase("firestore"):
+            await asyncio.to_thread(get_db)
+
+    async def assets():
+        with startup_phase("assets"):
+            await asyncio.to_thread(SAMPLER.load_sync)     # before the bank is applied
+            await asyncio.to_thread(QUESTION_STATS.load_sync)
+            await load_assets()
+
+    async def score_store():
+        with startup_phase("store"):
+            boss_rows, purchase_users = await SCORES.migrate()
+            if boss_rows or purchase_users:
+                print(f"[TRIVIA] Moved {boss_rows} boss point rows and {purchase_users} users' purchases "
+                      f"out of {TRIVIA_DATA_FILE}")
+            journal = pathlib.Path(SPEEDRUN_JOURNAL_FILE)
+            for path in sorted(journal.parent.glob(f"{journal.stem}*{journal.suffix}")):
+                replayed = await SCORES.recover_journal(path)
+                if replayed:
+                    print(f"[TRIVIA] Recovered {replayed} uncommitted speedrun answers from {path}")
+            await SCORES.load_inventory()
+
+    with startup_phase("config"):
+        await asyncio.to_thread(GUILD_CONFIG.load_sync)
+        await asyncio.to_thread(CHECKPOINTS.load_sync)
+    await asyncio.gather(warm_firestore(), assets(), score_store())
 
 # Call loop when bot runs
 @bot.event
 async def on_ready():
-    await bot.wait_until_ready()
-    load_role_shop()
-    load_role_aliases()
-    load_jou_lines()
-    load_spica_lines()    
     if not birthday_checker.is_running():
         birthday_checker.start()  
     if not backup_trivia_data.is_running():
         backup_trivia_data.start()
     if not backup_birthday_data.is_running():
         backup_birthday_data.start()
+    if not watch_assets.is_running():
+        watch_assets.start()
+    if not sample_shard_events.is_running():
+        sample_shard_events.start()
+
+    if "ready" not in STARTUP_TIMINGS:
+        STARTUP_TIMINGS["ready"] = time.perf_counter() - _IMPORT_STARTED
+        report = ", ".join(f"{name} {secs * 1000:.0f}ms" for name, secs in STARTUP_TIMINGS.items())
+        print(f"[STARTUP] {report}")
 
-# 🌐 Flask keep_alive() setup
-app = Flask('')
+@bot.event
+async def on_shard_ready(shard_id):
+    print(f"[SHARD] Shard {shard_id} ready with {shard_guild_counts().get(shard_id, 0)} guilds")
+    # pick up sessions interrupted by a restart as soon as their guild's shard is in
+    import bossfight
+    for guild in bot.guilds:
+        if guild.shard_id == shard_id:
+            await resume_trivia(guild)
+            await bossfight.resume(bot, guild)
+
+# 🌐 Health server on the bot's own loop: /, /metrics and /ready
+def readiness() -> dict:
+    # one dead shard makes the whole process unready; report the slowest shard
+    latency = max((lat for _, lat in bot.latencies), default=float("inf"))
+    gateway_ok = bot.is_ready() and not bot.is_closed() and math.isfinite(latency)
+    held = FILE_LOCK.held_for()
+    store_ok = held < READY_MAX_LOCK_HOLD and os.access(pathlib.Path(TRIVIA_DATA_FILE).resolve().parent, os.W_OK)
+    pending, lag = DISCORD_PENDING.get(), LOOP_LAG.get()
+    return {
+        "gateway": (gateway_ok, f"{len(bot.latencies)} shards, slowest {latency * 1000:.0f}ms"
+                    if math.isfinite(latency) else "a shard is not connected"),
+        "store": (store_ok, f"FILE_LOCK held {held:.1f}s"),
+        "backlog": (pending <= READY_MAX_PENDING and lag <= READY_MAX_LOOP_LAG,
+                    f"{pending} Discord requests pending, loop lag {lag * 1000:.0f}ms"),
+    }
 
-@app.route('/')
-def home():
-    return "Bot is alive!", 200
+WEB_SERVER = HealthServer("0.0.0.0", WEB_PORT, metrics=REGISTRY.render, readiness=readiness,
+                          content_type=CONTENT_TYPE)
 
-def run_web():
-    app.run(host='0.0.0.0', port=8080)
+STARTUP_TIMINGS["import"] = time.perf_counter() - _IMPORT_STARTED
 
-def keep_alive():
-    t = Thread(target=run_web)
-    t.start()
+def main():
+    import bossfight
+    with startup_phase("extensions"):
+        bossfight.setup(bot, SCORES, _lock_channel, CHECKPOINTS)
 
-# ⏳ Start webserver
-keep_alive()
+    # 🛰️ Start bot
+    bot.run(os.environ['TOKEN'])
 
-# 🛰️ Start bot
-bot.run(os.environ['TOKEN'])
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# ---------------------------
+# Shared benchmark helpers
+# ---------------------------
+RESULTS_DIR = pathlib.Path("bench_results")
+
+
+def measure(fn, *, repeat: int = 5, number: int = 1, setup=None) -> dict:
+    """Run fn() `number` times per sample, `repeat` samples; times are per call in ms.
+    `setup`, if given, runs untimed before each sample."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) * 1000 / number)
+    return summarize(samples, runs=repeat * number)
+
+
+def summarize(samples_ms: list[float], **extra) -> dict:
+    samples = sorted(samples_ms)
+    return {
+        "min_ms": round(samples[0], 4),
+        "p50_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "max_ms": round(samples[-1], 4),
+        **extra,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(suite: str, results: dict, out: str | None = None) -> pathlib.Path:
+    commit = git_commit()
+    path = pathlib.Path(out) if out else RESULTS_DIR / f"{suite}-{commit}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "suite": suite,
+        "commit": commit,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    path.write_text(json.dumps(payload, indent=2))
+    return path
+
+
+def compare(baseline_path: str, results: dict, key: str = "p50_ms"):
+    """Print each case's ratio against a previous results file (>1 means slower now)."""
+    baseline = json.loads(pathlib.Path(baseline_path).read_text())["results"]
+    print(f"\ncompared with {baseline_path} ({key}, now / before):")
+    for case, sizes in results.items():
+        for size, stats in sizes.items():
+            before = baseline.get(case, {}).get(size, {}).get(key)
+            if before:
+                print(f"  {case:<28} {size:>8}  {stats[key] / before:6.2f}x")
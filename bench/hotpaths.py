@@ -0,0 +1,182 @@
+"""Micro- and scale-benchmarks for the bot's hot paths.
+
+Runs entirely offline: no Discord connection, no Firebase credentials.
+
+    python -m bench.hotpaths                 # full sizes, writes bench_results/hotpaths-<commit>.json
+    python -m bench.hotpaths --quick         # smaller sizes for a fast check
+    python -m bench.hotpaths --compare bench_results/hotpaths-abc1234.json
+"""
+import argparse
+import asyncio
+import csv
+import io
+import pathlib
+import random
+import string
+import tempfile
+from types import SimpleNamespace
+
+import b1jou
+import bossfight
+from bench.common import measure, write_results, compare
+from trivia_match import AnswerIndex
+
+random.seed(1234)
+
+
+def _word(n: int = 8) -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=n))
+
+
+def _user_record(i: int) -> dict:
+    score = random.randint(0, 50000)
+    return {"score": score, "total_score": score + random.randint(0, 5000),
+            "best_time": random.randint(300, 270000), "best_question": f"Question number {i}?"}
+
+
+def make_store(users: int) -> dict:
+    return {str(10**17 + i): _user_record(i) for i in range(users)}
+
+
+def make_bank_csv(questions: int) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["question", "answers"])
+    for i in range(questions):
+        writer.writerow([f"Question {i}: what is {_word()}?", f"{_word()}|{_word(5)} {_word(4)}"])
+    return out.getvalue()
+
+
+def make_guild(members: int) -> SimpleNamespace:
+    people = [SimpleNamespace(id=10**17 + i, display_name=f"{_word(6)}{i}", mention=f"<@{10**17 + i}>")
+              for i in range(members)]
+    return SimpleNamespace(members=people)
+
+
+# ---------------------------
+# Cases
+# ---------------------------
+def bench_normalize_text(results):
+    texts = [f"  Ｔｈｅ Ｑｕｉｃｋ ’{_word()}’ Fox {i} " for i in range(10000)]
+    results["normalize_text"] = {
+        "10000": measure(lambda: [b1jou.normalize_text(t) for t in texts], repeat=5),
+    }
+
+
+def bench_is_correct_answer(results, sizes):
+    case_miss, case_mention = {}, {}
+    for n in sizes:
+        guild = make_guild(n)
+        target = guild.members[n // 2]
+        question = {"match": AnswerIndex([target.display_name, "moon lord"])}
+        author = guild.members[0]
+        wrong = SimpleNamespace(content="definitely not it", author=author, guild=guild)
+        mention = SimpleNamespace(content=target.mention, author=author, guild=guild,
+                                  mentions=[target], raw_mentions=[target.id])
+        case_miss[str(n)] = measure(lambda: b1jou.is_correct_answer(question, wrong), repeat=5)
+        case_mention[str(n)] = measure(lambda: b1jou.is_correct_answer(question, mention), repeat=5)
+    results["is_correct_answer.miss"] = case_miss
+    results["is_correct_answer.mention"] = case_mention
+
+
+def bench_fuzzy_match(results):
+    long_word = "pneumonoultramicroscopicsilicovolcanoconiosis"
+    index = AnswerIndex([long_word, "this stinks as much as the owner btw", "moon lord"], tolerance=None)
+    guesses = {
+        "typo": "pneumonoultramicroscopicsilicovolcanokoniosis",
+        "squeezed": "moonlord",
+        "miss": "definitely not the answer at all",
+        "miss_long": _word(400),
+    }
+    results["answer_index.matches"] = {
+        name: measure(lambda: index.matches(guess), repeat=5, number=200) for name, guess in guesses.items()
+    }
+
+
+def bench_load_trivia(results, sizes, workdir):
+    parse, build, draw = {}, {}, {}
+    b1jou.SAMPLER.path = pathlib.Path(workdir) / "trivia_asked.json"
+    for n in sizes:
+        text = make_bank_csv(n)
+        parse[str(n)] = measure(lambda: b1jou.parse_trivia(text), repeat=3)
+        bank = b1jou.parse_trivia(text)
+        build[str(n)] = measure(lambda: b1jou.apply_trivia_bank(bank), repeat=3)
+        draw[str(n)] = measure(lambda: b1jou.SAMPLER.draw(1), repeat=5, number=n // 2)
+    results["parse_trivia"] = parse
+    results["apply_trivia_bank"] = build
+    results["sampler.draw"] = draw
+
+
+def bench_store(results, sizes, workdir):
+    loop = asyncio.new_event_loop()
+    load, save, top = {}, {}, {}
+    b1jou.SCORES.path = pathlib.Path(workdir) / "trivia_data.json"
+    try:
+        for n in sizes:
+            data = make_store(n)
+            b1jou.SCORES.save_sync(data)
+            repeat = 3 if n < 1_000_000 else 1
+            load[str(n)] = measure(lambda: loop.run_until_complete(b1jou.SCORES.read()), repeat=repeat)
+            save[str(n)] = measure(lambda: b1jou.SCORES.save_sync(data), repeat=repeat)
+            top[str(n)] = measure(lambda: b1jou.rank_trivia_users(data), repeat=repeat)
+    finally:
+        loop.close()
+    results["scores.read"] = load
+    results["scores.save_sync"] = save
+    results["triviatop.rank"] = top
+
+
+def bench_bossfight_turn(results, sizes):
+    out = {}
+    for n in sizes:
+        state = bossfight.new_state(1, 1)
+
+        def roster():
+            state["boss_hp"] = bossfight.BOSS_START_HP * 1000
+            state["players"] = {uid: {"hp": 10**9, "phase_death": None} for uid in range(n)}
+            state["turn_hits"] = set(range(0, n, 2))
+
+        def turn():
+            bossfight.resolve_hits(state)
+            bossfight.boss_retaliate(state)
+        out[str(n)] = measure(turn, repeat=3, setup=roster)
+    results["bossfight.turn"] = out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="use smaller sizes")
+    parser.add_argument("--out", help="results file (default bench_results/hotpaths-<commit>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    members = [1_000, 10_000] if args.quick else [1_000, 10_000, 100_000]
+    banks = [1_000, 10_000] if args.quick else [1_000, 10_000, 100_000]
+    stores = [1_000, 10_000, 100_000] if args.quick else [1_000, 10_000, 100_000, 1_000_000]
+    rosters = [100, 1_000, 10_000] if args.quick else [100, 1_000, 10_000, 100_000]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, run in (
+            ("normalize_text", lambda: bench_normalize_text(results)),
+            ("is_correct_answer", lambda: bench_is_correct_answer(results, members)),
+            ("fuzzy_match", lambda: bench_fuzzy_match(results)),
+            ("load_trivia", lambda: bench_load_trivia(results, banks, workdir)),
+            ("store", lambda: bench_store(results, stores, workdir)),
+            ("bossfight", lambda: bench_bossfight_turn(results, rosters)),
+        ):
+            print(f"[BENCH] {name}…", flush=True)
+            run()
+
+    for case, by_size in results.items():
+        for size, stats in by_size.items():
+            print(f"  {case:<28} {size:>8}  p50 {stats['p50_ms']:>10.3f} ms")
+
+    path = write_results("hotpaths", results, args.out)
+    print(f"[BENCH] results written to {path}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Throughput benchmark for b!pray.
+
+Fires many concurrent synthetic b!pray invocations at the real command body,
+with the prayer store swapped for an in-memory one that sleeps to imitate
+Firestore latency (or the local Firestore emulator with --emulator).
+
+    python -m bench.prayers                          # 5000 prayers, 20 ms ± 10 ms per round trip
+    python -m bench.prayers --prayers 20000 --latency 0.05
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m bench.prayers --emulator
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+import b1jou
+from bench.common import summarize, write_results, compare
+from prayer_store import FirestorePrayerStore, MemoryPrayerStore
+
+random.seed(1234)
+
+
+def make_ctx(user_id: int, args: tuple, send_latency: float) -> SimpleNamespace:
+    async def send(*_, **__):
+        if send_latency:
+            await asyncio.sleep(send_latency)
+
+    author = SimpleNamespace(id=user_id, name=f"user{user_id}", display_name=f"User {user_id}")
+    return SimpleNamespace(
+        guild=None, channel=SimpleNamespace(id=1), author=author, send=send,
+        message=SimpleNamespace(mentions=[], role_mentions=[]),
+    )
+
+
+async def watch_lag(samples: list, stop: asyncio.Event, interval: float = 0.005):
+    """Record how late each short sleep wakes up, i.e. event-loop lag."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def run(prayers: int, users: int, concurrency: int, send_latency: float) -> dict:
+    store = b1jou.PRAYERS
+    latencies, lag = [], []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        # most prayers are to Spica (streaks), the rest carry free text
+        args = () if random.random() < 0.7 else ("the", "moon")
+        ctx = make_ctx(random.randrange(users), args, send_latency)
+        async with gate:
+            started = time.perf_counter()
+            await b1jou.pray.callback(ctx, *args)
+            latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_lag(lag, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(prayers)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await watcher
+
+    ms = sorted(x * 1000 for x in latencies)
+    lag_ms = sorted(x * 1000 for x in lag) or [0.0]
+    return {
+        **summarize(ms, runs=prayers),
+        "p99_ms": round(ms[int(0.99 * (len(ms) - 1))], 4),
+        "prayers_per_s": round(prayers / elapsed, 1),
+        "rpcs_per_prayer": round(store.ops["rpcs"] / prayers, 3),
+        "reads_per_prayer": round(store.ops["reads"] / prayers, 3),
+        "writes_per_prayer": round(store.ops["writes"] / prayers, 3),
+        "loop_lag_p99_ms": round(lag_ms[int(0.99 * (len(lag_ms) - 1))], 4),
+        "loop_lag_max_ms": round(lag_ms[-1], 4),
+        "loop_lag_mean_ms": round(statistics.fmean(lag_ms), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prayers", type=int, default=5000, help="total b!pray invocations")
+    parser.add_argument("--users", type=int, default=1000, help="distinct praying users")
+    parser.add_argument("--concurrency", type=int, default=5000, help="prayers in flight at once")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per store round trip")
+    parser.add_argument("--jitter", type=float, default=0.01, help="± seconds added to each round trip")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="seconds per ctx.send")
+    parser.add_argument("--emulator", action="store_true", help="use Firestore at FIRESTORE_EMULATOR_HOST")
+    parser.add_argument("--out", help="results file (default bench_results/prayers-<commit>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    if args.emulator:
+        if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+            parser.error("--emulator needs FIRESTORE_EMULATOR_HOST")
+        b1jou.PRAYERS = FirestorePrayerStore(b1jou.get_db)
+        backend = "emulator"
+    else:
+        b1jou.PRAYERS = MemoryPrayerStore(latency=args.latency, jitter=args.jitter)
+        backend = f"memory {args.latency * 1000:.0f}±{args.jitter * 1000:.0f}ms"
+
+    print(f"[BENCH] {args.prayers} prayers, {args.users} users, concurrency {args.concurrency}, store {backend}…",
+          flush=True)
+    stats = asyncio.run(run(args.prayers, args.users, args.concurrency, args.send_latency))
+    for key, value in stats.items():
+        print(f"  {key:<20} {value}")
+
+    results = {"pray": {str(args.prayers): stats}}
+    path = write_results("prayers", results, args.out)
+    print(f"[BENCH] results written to {path}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,40 +2,15 @@ import discord
 from discord.ext import commands
 import asyncio
 import random
-import unicodedata
-import json
-import pathlib
 from datetime import datetime
+from metrics import REGISTRY
+from trivia_match import normalize_text
 
-try:
-    from b1jou import safe_load_data, safe_save_data, _lock_channel, normalize_text
-except Exception:
-    FILE_LOCK = asyncio.Lock()
-    TRIVIA_DATA_FILE = "trivia_data.json"
-
-    async def safe_load_data() -> dict:
-        async with FILE_LOCK:
-            p = pathlib.Path(TRIVIA_DATA_FILE)
-            if not p.exists() or p.stat().st_size == 0:
-                return {}
-            try:
-                return json.loads(p.read_text(encoding="utf-8"))
-            except Exception:
-                return {}
-
-    async def safe_save_data(data: dict):
-        async with FILE_LOCK:
-            tmp = pathlib.Path(TRIVIA_DATA_FILE + ".tmp")
-            tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
-            tmp.replace(TRIVIA_DATA_FILE)
-
-    async def _lock_channel(chan: discord.TextChannel, *, allow_send: bool):
-        ow = chan.overwrites_for(chan.guild.default_role)
-        ow.send_messages = allow_send
-        await chan.set_permissions(chan.guild.default_role, overwrite=ow)
-
-    def normalize_text(txt: str) -> str:
-        return unicodedata.normalize("NFKC", txt).replace("’", "'").lower().strip()
+# Set by setup(): the bot's shared ScoreStore, its channel lock helper and its
+# CheckpointStore, so bossfight never opens trivia_data.json on its own
+_store = None
+_lock_channel = None
+_checkpoints = None
 
 # ---------------------------
 # Config 
@@ -50,9 +25,6 @@ SPEEDRUN_TRIVIA_QUESTIONS = 10
 SOLO_TRIVIA_TAG_COUNT = 10
 TYPING_ROUNDS = 30
 
-# Storage key for points
-POINTS_KEY = "boss_points"   # structure: { "user_id": points }
-
 PLACEHOLDER_SPEEDRUN = [
     {"q": "What color is the sky on a clear day?", "answers": ["blue"]},
     {"q": "2 + 2 = ?", "answers": ["4", "four"]},
@@ -70,28 +42,78 @@ PLACEHOLDER_TYPING_WORDS = [f"word{i}" for i in range(1, TYPING_ROUNDS + 1)]
 # ---------------------------
 # Internal state
 # ---------------------------
-_state = {
-    "active": False,
-    "boss_hp": BOSS_START_HP,
-    "phase": 1,                # 1..5
-    "players": {},             # user_id -> {"hp": int, "phase_death": None or phase}
-    "turn_hits": set(),        # user_ids who hit this turn
-    "boss_channel_id": None,
-    "event_lock": False,       # prevents new turns when event running
-    "one_time_done": {
-        "speedrun": False,
-        "solo": False,
-        "typing": False,
-    },
-    "solo_tagged": [],         # list of tagged user_ids (for solo trivia)
-    "final_mode": False,
-}
+# One state dict per guild with a fight, so fights in different servers (and
+# on different shards) never share HP, players or the event lock.
+def new_state(guild_id: int, channel_id: int) -> dict:
+    return {
+        "guild_id": guild_id,
+        "active": True,
+        "boss_hp": BOSS_START_HP,
+        "phase": 1,                # 1..5
+        "players": {},             # user_id -> {"hp": int, "phase_death": None or phase}
+        "turn_hits": set(),        # user_ids who hit this turn
+        "boss_channel_id": channel_id,
+        "event_lock": False,       # prevents new turns when event running
+        "one_time_done": {
+            "speedrun": False,
+            "solo": False,
+            "typing": False,
+        },
+        "solo_tagged": [],         # list of tagged user_ids (for solo trivia)
+        "final_mode": False,
+    }
+
+_states = {}    # guild_id -> state of that guild's current bossfight
+
+REGISTRY.gauge("b1jou_bossfight_sessions_active", "Running bossfights",
+               callback=lambda: sum(st["active"] for st in _states.values()))
 
 # ---------------------------
 # Utility helpers
 # ---------------------------
-def get_alive_players():
-    return {uid: p for uid, p in _state["players"].items() if p["hp"] > 0}
+def active_state(guild):
+    """The running fight in this guild, or None (also in DMs)."""
+    state = _states.get(guild.id) if guild else None
+    return state if state and state["active"] else None
+
+def end_state(state):
+    state["active"] = False
+    state["event_lock"] = False
+    if _states.get(state["guild_id"]) is state:
+        del _states[state["guild_id"]]
+    if _checkpoints is not None:
+        _checkpoints.drop("bossfight", state["guild_id"])
+
+# A fight is checkpointed after every turn, join and event, so a restart
+# resumes it at the next turn. What was going on inside a turn or an event
+# at the time is not kept: the turn is played again, an interrupted one-time
+# event counts as done, and the final phase starts a new round.
+def snapshot(state) -> dict:
+    return {
+        "guild_id": state["guild_id"],
+        "boss_hp": state["boss_hp"],
+        "phase": state["phase"],
+        "players": {str(uid): dict(p) for uid, p in state["players"].items()},
+        "boss_channel_id": state["boss_channel_id"],
+        "one_time_done": dict(state["one_time_done"]),
+        "solo_tagged": list(state["solo_tagged"]),
+        "final_mode": state["final_mode"],
+    }
+
+def restore(saved) -> dict:
+    state = new_state(saved["guild_id"], saved["boss_channel_id"])
+    state.update(boss_hp=saved["boss_hp"], phase=saved["phase"], final_mode=saved["final_mode"],
+                 solo_tagged=list(saved["solo_tagged"]))
+    state["players"] = {int(uid): dict(p) for uid, p in saved["players"].items()}
+    state["one_time_done"].update(saved["one_time_done"])
+    return state
+
+def save_state(state):
+    if _checkpoints is not None and state["active"]:
+        _checkpoints.put("bossfight", state["guild_id"], snapshot(state))
+
+def get_alive_players(state):
+    return {uid: p for uid, p in state["players"].items() if p["hp"] > 0}
 
 def user_mention(bot, uid):
     m = bot.get_user(uid)
@@ -100,27 +122,37 @@ def user_mention(bot, uid):
 async def award_points(bot, winners_map):
     """
     winners_map: dict user_id -> points_to_add
-    Saves points into persistent storage via safe_load_data / safe_save_data.
+    Saves every award in one store write.
     Returns the saved snapshot for those users.
     """
-    data = await safe_load_data()
-    if not isinstance(data, dict):
-        data = {}
-    points = data.get(POINTS_KEY, {})
-    if not isinstance(points, dict):
-        points = {}
-
-    changed = {}
-    for uid, add in winners_map.items():
-        sid = str(uid)
-        old = int(points.get(sid, 0))
-        new = old + int(add)
-        points[sid] = new
-        changed[uid] = {"old": old, "new": new}
-
-    data[POINTS_KEY] = points
-    await safe_save_data(data)
-    return changed
+    saved = await _store.award_boss_points({str(uid): add for uid, add in winners_map.items()})
+    return {int(uid): {"old": old, "new": new} for uid, (old, new) in saved.items()}
+
+def resolve_hits(state):
+    """Apply this turn's hits to the boss. Returns (hits_count, total_damage)."""
+    total_damage = 0
+    hits_count = 0
+    alive = get_alive_players(state)
+    for uid in list(state["turn_hits"]):
+        if uid in alive:
+            dmg = random.randint(*HIT_DAMAGE_RANGE)
+            total_damage += dmg
+            hits_count += 1
+    if hits_count:
+        state["boss_hp"] = max(0, state["boss_hp"] - total_damage)
+    return hits_count, total_damage
+
+def boss_retaliate(state):
+    """Boss hits every alive player for 10-30 damage. Returns the damage, or None if nobody is alive."""
+    alive = get_alive_players(state)
+    if not alive:
+        return None
+    retaliation = random.randint(10, 30)
+    for uid in list(alive.keys()):
+        state["players"][uid]["hp"] -= retaliation
+        if state["players"][uid]["hp"] <= 0 and state["players"][uid]["phase_death"] is None:
+            state["players"][uid]["phase_death"] = state["phase"]
+    return retaliation
 
 def embed_simple(title, desc=None, color=0xFF8800):
     e = discord.Embed(title=title, description=desc or "", color=color)
@@ -131,118 +163,101 @@ def embed_simple(title, desc=None, color=0xFF8800):
 # Core logic: commands & loops
 # ---------------------------
 async def start_bossfight(ctx):
-    if _state["active"]:
+    if ctx.guild is None:
+        return await ctx.send("Bossfights can only be started in a server.")
+    if active_state(ctx.guild):
         return await ctx.send("A bossfight is already active in another channel.")
-    _state["active"] = True
-    _state["boss_hp"] = BOSS_START_HP
-    _state["phase"] = 1
-    _state["players"].clear()
-    _state["turn_hits"].clear()
-    _state["boss_channel_id"] = ctx.channel.id
-    _state["event_lock"] = False
-    _state["one_time_done"] = {"speedrun": False, "solo": False, "typing": False}
-    _state["solo_tagged"] = []
-    _state["final_mode"] = False
+    state = _states[ctx.guild.id] = new_state(ctx.guild.id, ctx.channel.id)
+    save_state(state)
 
     await ctx.send(embed=embed_simple("🔥 Bossfight Started!",
         "Register with `!bossjoin`. Each registrant gets 100 HP.\nType `hit` during turns to attack."))
     # Small delay then start the turn loop
     await asyncio.sleep(2)
     # spawn background task so command returns immediately
-    asyncio.create_task(turn_loop(ctx.bot, ctx.channel))
+    asyncio.create_task(turn_loop(ctx.bot, ctx.channel, state))
 
 async def join_bossfight(ctx):
-    if not _state["active"] or ctx.channel.id != _state["boss_channel_id"]:
+    state = active_state(ctx.guild)
+    if state is None or ctx.channel.id != state["boss_channel_id"]:
         return await ctx.send("No active bossfight in this channel.")
     uid = ctx.author.id
-    if uid in _state["players"]:
+    if uid in state["players"]:
         return await ctx.send("You're already registered for this bossfight.")
-    _state["players"][uid] = {"hp": PLAYER_START_HP, "phase_death": None}
+    state["players"][uid] = {"hp": PLAYER_START_HP, "phase_death": None}
+    save_state(state)
     return await ctx.send(embed=embed_simple("✅ Registered",
         f"{ctx.author.mention} joined the bossfight with {PLAYER_START_HP} HP."))
 
-async def turn_loop(bot, channel: discord.TextChannel):
+async def turn_loop(bot, channel: discord.TextChannel, state):
     """
     Main loop for turns. Runs until boss dead or fight canceled.
     """
-    while _state["active"] and _state["boss_hp"] > 0:
-        if _state["event_lock"]:
+    while state["active"] and state["boss_hp"] > 0:
+        if state["event_lock"]:
             await asyncio.sleep(1)
             continue
 
-        if len(get_alive_players()) == 0:
+        if len(get_alive_players(state)) == 0:
             # if no players alive/registered, end fight
             await channel.send(embed=embed_simple("Fight ended", "No players remain — bossfight ended."))
-            _state["active"] = False
+            end_state(state)
             return
 
-        _state["turn_hits"].clear()
-        await channel.send(embed=embed_simple(f"Turn — Boss HP: {_state['boss_hp']}",
+        state["turn_hits"].clear()
+        await channel.send(embed=embed_simple(f"Turn — Boss HP: {state['boss_hp']}",
             f"Type `hit` (once) within the next {TURN_TIME} seconds to attack!"))
 
         # wait TURN_TIME seconds to collect hits
         await asyncio.sleep(TURN_TIME)
 
         # resolve hits
-        total_damage = 0
-        hits_count = 0
-        for uid in list(_state["turn_hits"]):
-            if uid in get_alive_players():
-                dmg = random.randint(*HIT_DAMAGE_RANGE)
-                total_damage += dmg
-                hits_count += 1
-
+        hits_count, total_damage = resolve_hits(state)
         if hits_count:
-            _state["boss_hp"] = max(0, _state["boss_hp"] - total_damage)
             await channel.send(embed=embed_simple("💥 Hits Resolved",
-                f"{hits_count} players hit the boss this turn for a total of {total_damage} damage.\nBoss HP: {_state['boss_hp']}"))
+                f"{hits_count} players hit the boss this turn for a total of {total_damage} damage.\nBoss HP: {state['boss_hp']}"))
         else:
             await channel.send("No hits this turn!")
 
         # If boss is alive, boss may attack after turn (we'll do a simple mechanic: small AoE)
-        if _state["boss_hp"] > 0:
-            # small boss attack that scales with number of remaining players
-            alive = get_alive_players()
-            if alive:
-                # boss does a light retaliatory attack: 10-30 damage randomly to all alive
-                retaliation = random.randint(10, 30)
-                for uid in list(alive.keys()):
-                    _state["players"][uid]["hp"] -= retaliation
-                    if _state["players"][uid]["hp"] <= 0 and _state["players"][uid]["phase_death"] is None:
-                        _state["players"][uid]["phase_death"] = _state["phase"]
+        if state["boss_hp"] > 0:
+            # boss does a light retaliatory attack: 10-30 damage randomly to all alive
+            retaliation = boss_retaliate(state)
+            if retaliation is not None:
                 await channel.send(f"⚔️ Boss retaliates for {retaliation} damage to everyone still alive.")
 
         # check phase transitions and trigger events (one-time each)
         # Phase transitions: <=7500 -> speedrun, <=5000 -> solo, <=2500 -> typing, <=500 -> final
-        if _state["phase"] == 1 and _state["boss_hp"] <= 7500 and not _state["one_time_done"]["speedrun"]:
-            _state["phase"] = 2
-            asyncio.create_task(event_speedrun_trivia(bot, channel))
-        elif _state["phase"] == 2 and _state["boss_hp"] <= 5000 and not _state["one_time_done"]["solo"]:
-            _state["phase"] = 3
-            asyncio.create_task(event_solo_trivia(bot, channel))
-        elif _state["phase"] == 3 and _state["boss_hp"] <= 2500 and not _state["one_time_done"]["typing"]:
-            _state["phase"] = 4
-            asyncio.create_task(event_typing_challenge(bot, channel))
-        elif _state["phase"] == 4 and _state["boss_hp"] <= 500 and not _state["final_mode"]:
-            _state["phase"] = 5
-            _state["final_mode"] = True
-            asyncio.create_task(event_final_phase(bot, channel))
+        if state["phase"] == 1 and state["boss_hp"] <= 7500 and not state["one_time_done"]["speedrun"]:
+            state["phase"] = 2
+            asyncio.create_task(event_speedrun_trivia(bot, channel, state))
+        elif state["phase"] == 2 and state["boss_hp"] <= 5000 and not state["one_time_done"]["solo"]:
+            state["phase"] = 3
+            asyncio.create_task(event_solo_trivia(bot, channel, state))
+        elif state["phase"] == 3 and state["boss_hp"] <= 2500 and not state["one_time_done"]["typing"]:
+            state["phase"] = 4
+            asyncio.create_task(event_typing_challenge(bot, channel, state))
+        elif state["phase"] == 4 and state["boss_hp"] <= 500 and not state["final_mode"]:
+            state["phase"] = 5
+            state["final_mode"] = True
+            asyncio.create_task(event_final_phase(bot, channel, state))
+        save_state(state)
 
         # small loop pause
         await asyncio.sleep(1)
 
     # boss dead or fight ended
-    if _state["boss_hp"] <= 0:
-        await finish_bossfight(bot, channel)
+    if state["boss_hp"] <= 0:
+        await finish_bossfight(bot, channel, state)
 
-async def event_speedrun_trivia(bot, channel):
+async def event_speedrun_trivia(bot, channel, state):
     """
     Trigger a speedrun trivia event with custom (hardcoded/placeholders) questions.
     Players answer normally; more correct answers = more boss damage.
     If nobody answers correctly at all, boss deals a critical AoE to all registered players.
     """
-    _state["event_lock"] = True
-    _state["one_time_done"]["speedrun"] = True
+    state["event_lock"] = True
+    state["one_time_done"]["speedrun"] = True
     await channel.send(embed=embed_simple("⚡ Speedrun Trivia Event!", 
         f"{SPEEDRUN_TRIVIA_QUESTIONS} questions — fastest correct answers reduce the boss HP.\nAnswer in-channel normally."))
     # load questions (placeholder list). You will replace these with your real list.
@@ -280,33 +295,34 @@ async def event_speedrun_trivia(bot, channel):
     if correct_counts > 0:
         # total damage: each correct -> random 200..500
         total = sum(random.randint(200, 500) for _ in range(correct_counts))
-        _state["boss_hp"] = max(0, _state["boss_hp"] - total)
-        await channel.send(embed=embed_simple("💥 Speedrun Result", f"{correct_counts} correct answers reduced the boss for {total} HP!\nBoss HP: {_state['boss_hp']}"))
+        state["boss_hp"] = max(0, state["boss_hp"] - total)
+        await channel.send(embed=embed_simple("💥 Speedrun Result", f"{correct_counts} correct answers reduced the boss for {total} HP!\nBoss HP: {state['boss_hp']}"))
     else:
         # nobody answered => boss does critical full-damage to all registered players
         await channel.send(embed=embed_simple("❌ No correct answers", "Boss enrages and does a critical attack to all registered players!"))
-        for uid in list(_state["players"].keys()):
-            if _state["players"][uid]["hp"] > 0:
+        for uid in list(state["players"].keys()):
+            if state["players"][uid]["hp"] > 0:
                 dmg = random.randint(400, 800)
-                _state["players"][uid]["hp"] -= dmg
-                if _state["players"][uid]["hp"] <= 0 and _state["players"][uid]["phase_death"] is None:
-                    _state["players"][uid]["phase_death"] = _state["phase"]
+                state["players"][uid]["hp"] -= dmg
+                if state["players"][uid]["hp"] <= 0 and state["players"][uid]["phase_death"] is None:
+                    state["players"][uid]["phase_death"] = state["phase"]
 
-    _state["event_lock"] = False
+    state["event_lock"] = False
+    save_state(state)
 
-async def event_solo_trivia(bot, channel):
+async def event_solo_trivia(bot, channel, state):
     """
     Solo trivia: boss tags a registered player (random) and only that player can answer for the round.
     Repeat until SOLO_TRIVIA_TAG_COUNT players have been tagged (unique).
     If tagged player fails to answer in 10s, they take critical damage.
-    Channel should be locked for others during each solo question (we use _lock_channel if present).
+    Channel is locked for others during each solo question (with the lock helper passed to setup()).
     """
-    _state["event_lock"] = True
-    _state["one_time_done"]["solo"] = True
-    available = [uid for uid in _state["players"].keys() if _state["players"][uid]["hp"] > 0]
+    state["event_lock"] = True
+    state["one_time_done"]["solo"] = True
+    available = [uid for uid in state["players"].keys() if state["players"][uid]["hp"] > 0]
     if len(available) == 0:
         await channel.send("No available players for solo trivia.")
-        _state["event_lock"] = False
+        state["event_lock"] = False
         return
 
     await channel.send(embed=embed_simple("🎯 Solo Trivia", f"Boss will tag {SOLO_TRIVIA_TAG_COUNT} players for solo questions. Only the tagged player may answer."))
@@ -321,16 +337,14 @@ async def event_solo_trivia(bot, channel):
         candidate = random.choice([uid for uid in available if uid not in used_tagged]) if len([u for u in available if u not in used_tagged])>0 else random.choice(available)
         used_tagged.add(candidate)
         tags_done += 1
-        _state["solo_tagged"].append(candidate)
+        state["solo_tagged"].append(candidate)
         user = bot.get_user(candidate)
         await channel.send(f"🔔 {user.mention} has been tagged for a solo question. Only they may answer for 10 seconds.")
 
-        # temporarily lock channel for non-tagged users (deny send_messages)
-        try:
-            await _lock_channel(channel, allow_send=False)
-        except Exception:
-            # permission issues may happen; ignore
-            pass
+        # temporarily lock channel for non-tagged users (deny send_messages);
+        # the lock helper logs failures and returns False instead of raising
+        if not await _lock_channel(channel, allow_send=False):
+            await channel.send("⚠️ I couldn't lock the channel — everyone can still type, but only the tagged player's answer counts.")
 
         # Ask a question
         qobj = pool[(tags_done - 1) % len(pool)]
@@ -349,44 +363,43 @@ async def event_solo_trivia(bot, channel):
             answered_ok = False
 
         # unlock channel afterwards
-        try:
-            await _lock_channel(channel, allow_send=True)
-        except Exception:
-            pass
+        if not await _lock_channel(channel, allow_send=True):
+            await channel.send("⚠️ I couldn't unlock the channel — an admin may need to restore send permissions.")
 
         if answered_ok:
             # reward: reduce boss HP by a significant amount
             dmg = random.randint(800, 1400)
-            _state["boss_hp"] = max(0, _state["boss_hp"] - dmg)
-            await channel.send(embed=embed_simple("✅ Correct!", f"{user.mention} answered correctly and dealt {dmg} damage!\nBoss HP: {_state['boss_hp']}"))
+            state["boss_hp"] = max(0, state["boss_hp"] - dmg)
+            await channel.send(embed=embed_simple("✅ Correct!", f"{user.mention} answered correctly and dealt {dmg} damage!\nBoss HP: {state['boss_hp']}"))
         else:
             # critical damage to that player
             dmg = random.randint(800, 1500)
-            _state["players"][candidate]["hp"] -= dmg
-            if _state["players"][candidate]["hp"] <= 0 and _state["players"][candidate]["phase_death"] is None:
-                _state["players"][candidate]["phase_death"] = _state["phase"]
+            state["players"][candidate]["hp"] -= dmg
+            if state["players"][candidate]["hp"] <= 0 and state["players"][candidate]["phase_death"] is None:
+                state["players"][candidate]["phase_death"] = state["phase"]
             await channel.send(embed=embed_simple("❌ Failed", f"{user.mention} failed to answer and took {dmg} critical damage."))
 
         # update available (filter out dead)
-        available = [uid for uid in _state["players"].keys() if _state["players"][uid]["hp"] > 0]
+        available = [uid for uid in state["players"].keys() if state["players"][uid]["hp"] > 0]
+        save_state(state)
 
-    _state["event_lock"] = False
+    state["event_lock"] = False
 
-async def event_typing_challenge(bot, channel):
+async def event_typing_challenge(bot, channel, state):
     """
     Typing challenge: boss provides words (case-insensitive) for TYPING_ROUNDS rounds.
     Players must type the exact word (case-insensitive) to avoid critical damage.
     Those that fail / AFK take critical damage.
     """
-    _state["event_lock"] = True
-    _state["one_time_done"]["typing"] = True
+    state["event_lock"] = True
+    state["one_time_done"]["typing"] = True
     await channel.send(embed=embed_simple("⌨️ Typing Challenge", f"{TYPING_ROUNDS} rounds — type the word displayed!"))
 
     rounds_words = PLACEHOLDER_TYPING_WORDS[:TYPING_ROUNDS]
     random.shuffle(rounds_words)
 
     for word in rounds_words:
-        if len(get_alive_players()) == 0:
+        if len(get_alive_players(state)) == 0:
             break
         await channel.send(embed=embed_simple("Type this:", word))
         # collect responses for 6 seconds
@@ -416,16 +429,16 @@ async def event_typing_challenge(bot, channel):
             target = normalize_text(word)
             for m in collected:
                 if normalize_text(m.content) == target:
-                    if m.author.id in get_alive_players():
+                    if m.author.id in get_alive_players(state):
                         correct_users.add(m.author.id)
 
             # anyone who did NOT type correct takes critical damage
-            for uid in list(get_alive_players().keys()):
+            for uid in list(get_alive_players(state).keys()):
                 if uid not in correct_users:
                     dmg = random.randint(400, 900)
-                    _state["players"][uid]["hp"] -= dmg
-                    if _state["players"][uid]["hp"] <= 0 and _state["players"][uid]["phase_death"] is None:
-                        _state["players"][uid]["phase_death"] = _state["phase"]
+                    state["players"][uid]["hp"] -= dmg
+                    if state["players"][uid]["hp"] <= 0 and state["players"][uid]["phase_death"] is None:
+                        state["players"][uid]["phase_death"] = state["phase"]
             await channel.send(f"Round complete — {len(correct_users)} players typed the word correctly.")
         except Exception as ex:
             # safety
@@ -433,18 +446,19 @@ async def event_typing_challenge(bot, channel):
 
         await asyncio.sleep(1)
 
-    _state["event_lock"] = False
+    state["event_lock"] = False
+    save_state(state)
 
-async def event_final_phase(bot, channel):
+async def event_final_phase(bot, channel, state):
     """
     Final phase: boss alternates between typing rounds and speedrun trivia (randomly)
     until boss dies (or fight ends). Boss is aggressive and deals stronger retaliations.
     """
-    _state["event_lock"] = True
+    state["event_lock"] = True
     await channel.send(embed=embed_simple("💀 Final Phase", "Boss is enraged — alternating typing & trivia events until death!"))
 
     # mini-loop until boss dies or all players dead
-    while _state["boss_hp"] > 0 and len(get_alive_players()) > 0:
+    while state["boss_hp"] > 0 and len(get_alive_players(state)) > 0:
         choice = random.choice(["typing", "speedrun"])
         if choice == "typing":
             # single quick typing round
@@ -474,21 +488,21 @@ async def event_final_phase(bot, channel):
                 target = normalize_text(word)
                 correct_users = set()
                 for m in collected:
-                    if normalize_text(m.content) == target and m.author.id in get_alive_players():
+                    if normalize_text(m.content) == target and m.author.id in get_alive_players(state):
                         correct_users.add(m.author.id)
 
                 # correct users damage boss slightly
                 dmg = sum(random.randint(200, 400) for _ in correct_users)
                 if dmg > 0:
-                    _state["boss_hp"] = max(0, _state["boss_hp"] - dmg)
-                    await channel.send(f"Final typing: {len(correct_users)} players hit the boss for {dmg} damage. Boss HP: {_state['boss_hp']}")
+                    state["boss_hp"] = max(0, state["boss_hp"] - dmg)
+                    await channel.send(f"Final typing: {len(correct_users)} players hit the boss for {dmg} damage. Boss HP: {state['boss_hp']}")
                 else:
                     # nobody correct -> boss critical to everyone
-                    for uid in list(get_alive_players().keys()):
+                    for uid in list(get_alive_players(state).keys()):
                         dd = random.randint(600, 1200)
-                        _state["players"][uid]["hp"] -= dd
-                        if _state["players"][uid]["hp"] <= 0 and _state["players"][uid]["phase_death"] is None:
-                            _state["players"][uid]["phase_death"] = _state["phase"]
+                        state["players"][uid]["hp"] -= dd
+                        if state["players"][uid]["hp"] <= 0 and state["players"][uid]["phase_death"] is None:
+                            state["players"][uid]["phase_death"] = state["phase"]
                     await channel.send("No correct answers — boss lands a massive attack on everyone!")
 
             except Exception as ex:
@@ -503,26 +517,49 @@ async def event_final_phase(bot, channel):
                 msg = await bot.wait_for("message", timeout=6.0, check=lambda m: (not m.author.bot) and m.channel.id == channel.id and normalize_text(m.content) in answers)
                 # first correct deals heavy damage
                 dmg = random.randint(600, 1200)
-                _state["boss_hp"] = max(0, _state["boss_hp"] - dmg)
-                await channel.send(f"✅ {msg.author.mention} got it and dealt {dmg} damage! Boss HP: {_state['boss_hp']}")
+                state["boss_hp"] = max(0, state["boss_hp"] - dmg)
+                await channel.send(f"✅ {msg.author.mention} got it and dealt {dmg} damage! Boss HP: {state['boss_hp']}")
             except asyncio.TimeoutError:
                 # nobody answered -> boss hits everyone
-                for uid in list(get_alive_players().keys()):
+                for uid in list(get_alive_players(state).keys()):
                     dd = random.randint(700, 1300)
-                    _state["players"][uid]["hp"] -= dd
-                    if _state["players"][uid]["hp"] <= 0 and _state["players"][uid]["phase_death"] is None:
-                        _state["players"][uid]["phase_death"] = _state["phase"]
+                    state["players"][uid]["hp"] -= dd
+                    if state["players"][uid]["hp"] <= 0 and state["players"][uid]["phase_death"] is None:
+                        state["players"][uid]["phase_death"] = state["phase"]
                 await channel.send("No correct answers — boss slams everyone with force!")
 
+        save_state(state)
         # small pause between final events
         await asyncio.sleep(1)
 
-    _state["event_lock"] = False
+    state["event_lock"] = False
     # If boss died here, finish_bossfight in turn_loop will handle awarding. Otherwise, if all players died, end fight
-    if len(get_alive_players()) == 0 and _state["boss_hp"] > 0:
+    if len(get_alive_players(state)) == 0 and state["boss_hp"] > 0:
         await channel.send(embed=embed_simple("Fight Over", "All players have fallen. Boss remains victorious."))
         # proceed to finish to award points accordingly
-        await finish_bossfight(bot, channel)
+        await finish_bossfight(bot, channel, state)
+
+async def resume(bot, guild):
+    """Pick up the guild's fight from its checkpoint after a restart; the bot
+    calls this once the guild's shard is ready."""
+    if _checkpoints is None or active_state(guild):
+        return
+    saved = _checkpoints.get("bossfight").get(str(guild.id))
+    if saved is None:
+        return
+    channel = guild.get_channel(saved["boss_channel_id"])
+    if channel is None:
+        _checkpoints.drop("bossfight", guild.id)
+        print(f"[RESUME] Dropped bossfight in {guild.id}: channel is gone")
+        return
+    await _lock_channel(channel, allow_send=True)      # a solo question may have left it locked
+    state = _states[guild.id] = restore(saved)
+    print(f"[RESUME] Bossfight in {guild.name} ({guild.id}) at phase {state['phase']}, boss HP {state['boss_hp']}")
+    await channel.send(embed=embed_simple("♻️ Bossfight Resumed",
+        f"The fight is back after a restart.\nBoss HP: {state['boss_hp']} — Phase {state['phase']}"))
+    if state["final_mode"]:
+        asyncio.create_task(event_final_phase(bot, channel, state))
+    asyncio.create_task(turn_loop(bot, channel, state))
 
 # ---------------------------
 # Message listener: handle "hit" and "critical hit"
@@ -530,42 +567,43 @@ async def event_final_phase(bot, channel):
 async def on_message_listener(msg: discord.Message):
     if msg.author.bot:
         return
-    if not _state["active"] or msg.channel.id != _state["boss_channel_id"]:
+    state = active_state(msg.guild)
+    if state is None or msg.channel.id != state["boss_channel_id"]:
         return
     content = normalize_text(msg.content)
 
     # only accept hits if not in an event_lock (unless critical allowed in phase>=4)
     if content == "hit":
-        if _state["event_lock"]:
+        if state["event_lock"]:
             return  # hits disabled during events
         uid = msg.author.id
-        if uid not in get_alive_players():
+        if uid not in get_alive_players(state):
             return
         # only one hit per turn
-        if uid in _state["turn_hits"]:
+        if uid in state["turn_hits"]:
             return
-        _state["turn_hits"].add(uid)
+        state["turn_hits"].add(uid)
         await msg.add_reaction("⚔️")
 
     elif content == "critical hit":
         uid = msg.author.id
-        if uid not in get_alive_players():
+        if uid not in get_alive_players(state):
             return
-        if _state["phase"] < 4:
+        if state["phase"] < 4:
             await msg.channel.send(f"{msg.author.mention}, critical hits are only available in Phase 4+.")
             return
         # attempt critical
         if random.random() <= CRIT_HIT_CHANCE:
             dmg = random.randint(*CRIT_HIT_DAMAGE_RANGE)
-            _state["boss_hp"] = max(0, _state["boss_hp"] - dmg)
-            await msg.channel.send(embed=embed_simple("💥 Critical!", f"{msg.author.mention} landed a critical hit for {dmg} damage! Boss HP: {_state['boss_hp']}"))
+            state["boss_hp"] = max(0, state["boss_hp"] - dmg)
+            await msg.channel.send(embed=embed_simple("💥 Critical!", f"{msg.author.mention} landed a critical hit for {dmg} damage! Boss HP: {state['boss_hp']}"))
         else:
             await msg.channel.send(embed=embed_simple("❌ Missed", f"{msg.author.mention}'s critical hit missed!"))
 
 # ---------------------------
 # Finish logic and awarding points
 # ---------------------------
-async def finish_bossfight(bot, channel):
+async def finish_bossfight(bot, channel, state):
     """
     Called when boss HP <= 0 or when fight ends. Awards points based on survival/phase death.
     - Survived to end (alive when boss died): 10k points
@@ -577,7 +615,7 @@ async def finish_bossfight(bot, channel):
     winners_map = {}  # uid -> points to award
     survivors = []
     died_map = {}  # uid -> phase_death (int)
-    for uid, pdata in _state["players"].items():
+    for uid, pdata in state["players"].items():
         if pdata["hp"] > 0:
             survivors.append(uid)
             winners_map[uid] = 10000
@@ -597,7 +635,7 @@ async def finish_bossfight(bot, channel):
 
     # Build embed summary
     embed = discord.Embed(title="🏆 Bossfight Results", color=0x00FF88)
-    embed.add_field(name="Boss HP", value=str(_state["boss_hp"]), inline=False)
+    embed.add_field(name="Boss HP", value=str(state["boss_hp"]), inline=False)
     if survivors:
         embed.add_field(name="Survivors", value=", ".join(user_mention(bot, uid) for uid in survivors), inline=False)
     if died_map:
@@ -616,14 +654,20 @@ async def finish_bossfight(bot, channel):
     await channel.send(embed=embed)
 
     # reset state
-    _state["active"] = False
-    _state["boss_channel_id"] = None
-    _state["event_lock"] = False
+    end_state(state)
 
 # ---------------------------
 # Setup function to be called by b1jou.py
 # ---------------------------
-def setup(bot: commands.Bot):
+def setup(bot: commands.Bot, store, lock_channel, checkpoints=None):
+    """Register the commands; `store` is the bot's ScoreStore, `lock_channel`
+    its `(channel, *, allow_send)` coroutine and `checkpoints` its
+    CheckpointStore (None: fights are not resumed after a restart)."""
+    global _store, _lock_channel, _checkpoints
+    _store = store
+    _lock_channel = lock_channel
+    _checkpoints = checkpoints
+
     @bot.command(name="bossstart")
     async def _bossstart(ctx):
         await start_bossfight(ctx)
@@ -635,12 +679,13 @@ def setup(bot: commands.Bot):
     # optionally let an admin show current state
     @bot.command(name="bossstatus")
     async def _bossstatus(ctx):
-        if not _state["active"]:
+        state = active_state(ctx.guild)
+        if state is None:
             return await ctx.send("No active bossfight.")
         lines = [
-            f"Boss HP: {_state['boss_hp']}",
-            f"Phase: {_state['phase']}",
-            f"Registered: {len(_state['players'])}",
+            f"Boss HP: {state['boss_hp']}",
+            f"Phase: {state['phase']}",
+            f"Registered: {len(state['players'])}",
         ]
         e = embed_simple("Boss Status", "\n".join(lines))
         await ctx.send(embed=e)
@@ -654,7 +699,8 @@ def setup(bot: commands.Bot):
     @bot.command(name="bosscancel")
     @commands.has_permissions(manage_guild=True)
     async def _bosscancel(ctx):
-        if not _state["active"]:
+        state = active_state(ctx.guild)
+        if state is None:
             return await ctx.send("No active bossfight.")
-        _state["active"] = False
+        end_state(state)
         await ctx.send("Bossfight cancelled by an admin.")
\ No newline at end of file
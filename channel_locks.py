@@ -0,0 +1,62 @@
+import asyncio
+from collections import Counter
+
+import discord
+
+# ---------------------------
+# Channel send locks
+# ---------------------------
+# Trivia and bossfight lock a channel by denying @everyone send_messages.
+# Every change is a REST call on the channel's permission rate limit, so
+# ChannelLocks remembers the state it last applied per channel and skips
+# calls that would not change anything. Changes to one channel run one at
+# a time; a call that is overtaken by a newer one while it waits does
+# nothing, so a quick lock → unlock → lock costs at most the calls needed
+# to reach the final state. Failures are logged, counted and returned
+# instead of raised, so a missing permission never kills a game loop.
+
+class ChannelLocks:
+    def __init__(self):
+        self._state: dict[int, bool] = {}           # channel id -> allow_send we last applied
+        self._wanted: dict[int, bool] = {}          # channel id -> newest requested allow_send
+        self._locks: dict[int, asyncio.Lock] = {}
+        self.stats = Counter()                      # "applied", "skipped", "coalesced", "failed"
+
+    def current(self, channel) -> bool | None:
+        """The @everyone send_messages overwrite (None = not set), as far as we know
+        without a REST call."""
+        state = self._state.get(channel.id)
+        if state is None:
+            state = channel.overwrites_for(channel.guild.default_role).send_messages
+        return state
+
+    def forget(self, channel_id: int):
+        """Drop what we remember, e.g. after someone else edited the channel."""
+        self._state.pop(channel_id, None)
+
+    async def set(self, channel, *, allow_send: bool) -> bool:
+        """Bring the channel to `allow_send`; False if Discord refused the change."""
+        cid = channel.id
+        self._wanted[cid] = allow_send
+        lock = self._locks.get(cid)
+        if lock is None:
+            lock = self._locks[cid] = asyncio.Lock()
+        async with lock:
+            if self._wanted[cid] != allow_send:
+                self.stats["coalesced"] += 1    # a newer call will apply its own state
+                return True
+            if self.current(channel) == allow_send:
+                self.stats["skipped"] += 1
+                return True
+            ow = channel.overwrites_for(channel.guild.default_role)
+            ow.send_messages = allow_send
+            try:
+                await channel.set_permissions(channel.guild.default_role, overwrite=ow)
+            except discord.HTTPException as e:
+                self.stats["failed"] += 1
+                self.forget(cid)
+                print(f"[LOCK] Could not {'unlock' if allow_send else 'lock'} #{channel} ({cid}): {e}")
+                return False
+            self._state[cid] = allow_send
+            self.stats["applied"] += 1
+            return True
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import pathlib
+
+from json_files import read_json, write_atomic
+
+# ---------------------------
+# Session checkpoints
+# ---------------------------
+# Running trivia sessions and bossfights save a small snapshot (question
+# cursor, scores so far, boss and player HP, phase, whether the channel is
+# locked) every time they move to a new phase. The snapshots live in one
+# JSON file keyed by kind ("trivia", "bossfight") and session key; after a
+# deploy or crash the bot resumes whatever is left in it. put() and drop()
+# only change memory and schedule a write: writes run in a worker thread,
+# one at a time, and changes made while one is running are folded into a
+# single follow-up write.
+
+KINDS = ("trivia", "bossfight")
+
+
+class CheckpointStore:
+    def __init__(self, path: str):
+        self.path = pathlib.Path(path)
+        self._data: dict[str, dict] = {kind: {} for kind in KINDS}
+        self._writer: asyncio.Task | None = None
+        self._dirty = False
+
+    def load_sync(self):
+        raw = read_json(self.path, "[RESUME]")
+        if not isinstance(raw, dict):
+            return
+        for kind in KINDS:
+            self._data[kind] = dict(raw.get(kind) or {})
+
+    def get(self, kind: str) -> dict[str, dict]:
+        """Snapshots of one kind, session key -> state."""
+        return dict(self._data[kind])
+
+    def put(self, kind: str, key, state: dict):
+        self._data[kind][str(key)] = state
+        self._schedule()
+
+    def drop(self, kind: str, key):
+        if self._data[kind].pop(str(key), None) is not None:
+            self._schedule()
+
+    def _schedule(self):
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._flush())
+        else:
+            self._dirty = True      # the running write is stale; _flush goes round again
+
+    async def _flush(self):
+        while True:
+            self._dirty = False
+            text = json.dumps(self._data, separators=(",", ":"))
+            try:
+                await asyncio.to_thread(write_atomic, self.path, text)
+            except OSError as e:
+                print(f"[RESUME] Could not save checkpoints: {e}")
+            if not self._dirty:
+                return
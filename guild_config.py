@@ -0,0 +1,141 @@
+import json
+import pathlib
+from types import MappingProxyType
+
+from json_files import AtomicWriter, write_atomic
+
+# ---------------------------
+# Per-guild configuration
+# ---------------------------
+# guild_config.json maps guild id -> settings (channel ids, role ids). It is
+# read once at startup into one GuildConfig per guild (replaced, never edited
+# in place), so every check is a dict lookup plus a frozenset membership test. Admin commands
+# change one guild at a time: only that guild's GuildConfig is rebuilt and
+# listeners are told which guild and setting changed, so caches elsewhere can
+# drop just that guild's entries.
+
+# Backups are not a per-guild setting: they hold every guild's data, so their
+# channel is the owner's BACKUP_CHANNEL_ID in b1jou. Older files may still
+# carry it; it is dropped on load.
+RETIRED_SETTINGS = frozenset({"backup_channel"})
+
+# setting -> kind: "channels" (set of channel ids), "channel", "role" or "text"
+SETTINGS = MappingProxyType({
+    "name": "text",                         # label only, makes the file readable
+    "command_channels": "channels",         # b!help, b!stats, b!top, ...
+    "pray_channels": "channels",            # b!pray
+    "trivia_classic_channels": "channels",  # b!starttrivia 1
+    "trivia_speedrun_channels": "channels", # b!starttrivia 2
+    "log_channel": "channel",               # edited / deleted message log
+    "birthday_channel": "channel",          # birthday wishes
+    "welcome_channel": "channel",           # greeting for new members
+    "join_admin_channel": "channel",        # join approval buttons
+    "admin_role": "role",                   # pinged on new arrivals
+    "member_role": "role",                  # granted by the join buttons
+    "bot_role": "role",                     # granted to bots; its messages are not logged
+    "trivia_ping_role": "role",             # b!pingtrivia, pinged before classic rounds
+    "speedrun_role": "role",                # may start speedrun trivia
+})
+
+
+class GuildConfig:
+    __slots__ = ("guild_id",) + tuple(SETTINGS)
+
+    def __init__(self, guild_id: int, raw: dict):
+        self.guild_id = guild_id
+        for key, kind in SETTINGS.items():
+            value = raw.get(key)
+            if kind == "channels":
+                value = frozenset(int(v) for v in value or ())
+            elif kind in ("channel", "role"):
+                value = int(value) if value else None
+            else:
+                value = str(value or "")
+            setattr(self, key, value)
+
+    def trivia_channels(self, mode: int) -> frozenset[int]:
+        return self.trivia_classic_channels if mode == 1 else self.trivia_speedrun_channels
+
+
+def parse_config(text: str) -> dict[int, dict]:
+    raw = json.loads(text)
+    if not isinstance(raw, dict):
+        raise ValueError("expected an object of guild id -> settings")
+    for guild_id, settings in raw.items():
+        for key in RETIRED_SETTINGS & set(settings):
+            print(f"[CONFIG] guild {guild_id}: ignoring retired setting {key}")
+            del settings[key]
+        unknown = set(settings) - set(SETTINGS)
+        if unknown:
+            raise ValueError(f"guild {guild_id}: unknown settings {', '.join(sorted(unknown))}")
+    return {int(guild_id): dict(settings) for guild_id, settings in raw.items()}
+
+
+class GuildConfigStore:
+    def __init__(self, path: str):
+        self.path = pathlib.Path(path)
+        self._raw: dict[int, dict] = {}
+        self._index: dict[int, GuildConfig] = {}
+        self.listeners = []         # callables (guild_id, key) run after a change
+        self._writer = AtomicWriter()
+
+    def load_sync(self):
+        if not self.path.exists():
+            print(f"[CONFIG] {self.path} not found – no guild is configured.")
+            return
+        self._raw = parse_config(self.path.read_text(encoding="utf-8"))
+        self._index = {guild_id: GuildConfig(guild_id, raw) for guild_id, raw in self._raw.items()}
+
+    def dumps(self) -> str:
+        out = {}
+        for guild_id, raw in self._raw.items():
+            out[str(guild_id)] = {
+                key: sorted(raw[key]) if SETTINGS[key] == "channels" else raw[key]
+                for key in SETTINGS if raw.get(key) not in (None, "", [])
+            }
+        return json.dumps(out, indent=4, ensure_ascii=False)
+
+    def save_sync(self):
+        write_atomic(self.path, self.dumps())
+
+    def get(self, guild_id: int) -> GuildConfig:
+        config = self._index.get(guild_id)
+        if config is None:
+            config = GuildConfig(guild_id, {})      # unconfigured: every setting empty
+        return config
+
+    def all(self):
+        return self._index.values()
+
+    def change(self, guild_id: int, key: str, op: str, value=None):
+        """Apply one edit: op "set" (single value), "add"/"remove" (channel sets) or
+        "clear". Rebuilds only this guild's entry; call save_sync() afterwards."""
+        kind = SETTINGS.get(key)
+        if kind is None:
+            raise KeyError(key)
+        raw = self._raw.setdefault(guild_id, {})
+        if op == "clear":
+            raw.pop(key, None)
+        elif kind == "channels":
+            items = set(raw.get(key) or ())
+            if op == "add":
+                items.add(int(value))
+            elif op == "remove":
+                items.discard(int(value))
+            else:
+                raise ValueError(f"{key} is a list of channels; use add or remove")
+            raw[key] = sorted(items)
+        elif op == "set":
+            raw[key] = value if kind == "text" else int(value)
+        else:
+            raise ValueError(f"{key} holds one value; use set or clear")
+
+        self._index[guild_id] = GuildConfig(guild_id, raw)
+        for listener in self.listeners:
+            listener(guild_id, key)
+
+    async def update(self, guild_id: int, key: str, op: str, value=None):
+        """change() and write the file in a worker thread, one write at a time.
+        The JSON is built on the loop, where other changes happen."""
+        self.change(guild_id, key, op, value)
+        await self._writer.write(self.path, self.dumps())
@@ -0,0 +1,45 @@
+import asyncio
+import json
+import pathlib
+
+# ---------------------------
+# JSON state files
+# ---------------------------
+# Shared by the file-backed stores (scores, sampler, question stats, guild
+# config, session checkpoints). Files are replaced atomically: the text goes
+# to a .tmp file next to the target, which is then renamed over it, so a
+# crash mid-write leaves the previous copy. Stores that change on the event
+# loop build the text there and hand only the finished string to a worker
+# thread, so no thread ever walks a dict the loop is editing.
+
+def write_atomic(path, text: str):
+    path = pathlib.Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
+
+
+def read_json(path, tag: str):
+    """The file's parsed contents; None if it is missing, empty or unreadable
+    (the last is logged under `tag`, e.g. "[TRIVIA]")."""
+    path = pathlib.Path(path)
+    try:
+        text = path.read_text(encoding="utf-8")
+        return json.loads(text) if text.strip() else None
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, OSError, UnicodeDecodeError) as e:
+        print(f"{tag} Ignoring unreadable {path}: {e}")
+        return None
+
+
+class AtomicWriter:
+    """Writes prepared text with write_atomic() in a worker thread, one write at
+    a time and in call order, so an older snapshot never lands after a newer one."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+    async def write(self, path, text: str):
+        async with self._lock:
+            await asyncio.to_thread(write_atomic, path, text)
@@ -0,0 +1,56 @@
+import string
+
+# ---------------------------
+# Precompiled flavor-text templates
+# ---------------------------
+# Lines use str.format-style placeholders ("{author}", "{target}", ...).
+# Each line is parsed once when it is loaded: a stray brace or an unknown
+# placeholder raises ValueError right there instead of when a command runs.
+# Rendering fills the placeholder slots and does a single join.
+
+_FORMATTER = string.Formatter()
+
+class LineTemplate:
+    __slots__ = ("source", "fields", "_parts", "_slots")
+
+    def __init__(self, source: str, allowed: frozenset[str]):
+        self.source = source
+        parts, slots = [], []
+        try:
+            parsed = list(_FORMATTER.parse(source))
+        except ValueError as e:
+            raise ValueError(f"bad template {source!r}: {e}") from None
+
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                parts.append(literal)
+            if field is None:
+                continue
+            if field not in allowed:
+                raise ValueError(f"unknown placeholder {{{field}}} in {source!r}; allowed: {', '.join(sorted(allowed))}")
+            if spec or conversion:
+                raise ValueError(f"format specs are not supported in {source!r}")
+            slots.append((len(parts), field))
+            parts.append("")
+
+        self._parts = parts
+        self._slots = tuple(slots)
+        self.fields = frozenset(field for _, field in slots)
+
+    def render(self, values: dict) -> str:
+        parts = self._parts.copy()
+        for index, field in self._slots:
+            parts[index] = values[field]
+        return "".join(parts)
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.fields
+
+    def __repr__(self):
+        return f"LineTemplate({self.source!r})"
+
+
+def compile_lines(lines, allowed) -> tuple[LineTemplate, ...]:
+    """Compile every line, failing on the first malformed one."""
+    allowed = frozenset(allowed)
+    return tuple(LineTemplate(line, allowed) for line in lines)
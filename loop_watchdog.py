@@ -0,0 +1,73 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+# ---------------------------
+# Event-loop blocking detector
+# ---------------------------
+# A heartbeat coroutine stamps the time every `interval` seconds and reports
+# how late each wake-up was. A daemon thread watches the stamp: when it goes
+# stale for longer than `threshold`, some callback is hogging the loop, so the
+# thread grabs the loop thread's current stack and logs it while the
+# offender is still running.
+
+class LoopWatchdog:
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1, on_lag=None, on_block=None):
+        self.threshold = threshold
+        self.interval = interval
+        self.on_lag = on_lag            # called on the loop with each wake-up delay (seconds)
+        self.on_block = on_block        # called from the watchdog thread with (stalled seconds, stack text)
+        self.blocks = 0
+        self.last_stack = ""
+        self._beat = time.monotonic()
+        self._loop_thread_id = None
+        self._reported_beat = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._task = None
+
+    def start(self):
+        """Start the heartbeat task and the watchdog thread; call from the running loop."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = max(0.0, now - expected)
+            if self.on_lag is not None:
+                self.on_lag(lag)
+            if lag >= self.threshold:
+                print(f"[LOOP] event loop was blocked for {lag * 1000:.0f}ms")
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or beat == self._reported_beat:
+                continue
+            # one report per stall: the stack of whatever is running right now
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no frame>"
+            self.blocks += 1
+            self.last_stack = stack
+            print(f"[LOOP] blocked for over {stalled * 1000:.0f}ms, loop thread stack:\n{stack}")
+            if self.on_block is not None:
+                self.on_block(stalled, stack)
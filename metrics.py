@@ -0,0 +1,313 @@
+import asyncio
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# ---------------------------
+# Prometheus-style metrics
+# ---------------------------
+# Metrics are updated from the event loop (and sometimes worker threads) and
+# read by the web server, so every family guards its values with a plain
+# lock. Uncontended, that costs well under a microsecond per update.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Family:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(key, child.snapshot()) for key, child in self._children.items()]
+        for key, snap in items:
+            out.extend(self._render_child(key, snap))
+        return out
+
+
+class _Value:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self, lock):
+        self._lock = lock
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        return self.value
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value(self._lock)
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def get(self):
+        return self._default.value
+
+    def _render_child(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), callback=None):
+        super().__init__(name, help, labelnames)
+        self.callback = callback    # called at scrape time; returns a value or {label tuple: value}
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def render(self) -> list[str]:
+        if self.callback is None:
+            return super().render()
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            value = self.callback()
+        except Exception:
+            return out
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for key, v in items:
+            out.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}")
+        return out
+
+
+class _HistogramValue:
+    __slots__ = ("_lock", "bounds", "counts", "sum", "count")
+
+    def __init__(self, lock, bounds):
+        self._lock = lock
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self):
+        return list(self.counts), self.sum, self.count
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self._lock, self.bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def _render_child(self, key, snap):
+        counts, total, count = snap
+        out, running = [], 0
+        for bound, c in zip((*self.bounds, math.inf), counts):
+            running += c
+            labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+            out.append(f"{self.name}_bucket{labels} {running}")
+        labels = _format_labels(self.labelnames, key)
+        out.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        out.append(f"{self.name}_count{labels} {count}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._families: dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, family):
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                return existing     # re-registration (e.g. module reload) reuses the family
+            self._families[family.name] = family
+            return family
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=(), callback=None):
+        return self._add(Gauge(name, help, labelnames, callback))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            families = list(self._families.values())
+        lines = []
+        for family in families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ---------------------------
+# Quantile sketch
+# ---------------------------
+class LogHistogram:
+    """Log-bucketed histogram with a fixed bucket range.
+
+    Values between `min_value` and `max_value` land in buckets whose width grows
+    by `growth`, so any quantile is accurate to about (growth - 1) / 2 relative
+    error. Counts are kept sparse; the bucket range bounds the size.
+    """
+    __slots__ = ("min_value", "growth", "_log_growth", "size", "counts", "total")
+
+    def __init__(self, min_value: float = 1e-4, max_value: float = 1e3, growth: float = 1.1):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.size = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 1
+        self.counts: dict[int, int] = {}
+        self.total = 0
+
+    def _index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return min(self.size - 1, int(math.log(value / self.min_value) / self._log_growth) + 1)
+
+    def add(self, value: float, count: int = 1):
+        i = self._index(value)
+        self.counts[i] = self.counts.get(i, 0) + count
+        self.total += count
+
+    def merge(self, other: "LogHistogram"):
+        for i, c in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + c
+        self.total += other.total
+
+    def quantile(self, q: float) -> float:
+        if not self.total:
+            return 0.0
+        rank = q * (self.total - 1)
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen > rank:
+                if i == 0:
+                    return 0.0
+                # geometric midpoint of the bucket
+                return self.min_value * self.growth ** (i - 0.5)
+        return self.min_value * self.growth ** (self.size - 1)
+
+    def to_dict(self) -> dict:
+        return {str(i): c for i, c in self.counts.items()}
+
+    def load_dict(self, raw: dict):
+        self.counts = {int(i): int(c) for i, c in raw.items()}
+        self.total = sum(self.counts.values())
+        return self
+
+
+# ---------------------------
+# Instrumented primitives
+# ---------------------------
+class TimedLock:
+    """asyncio.Lock that records how long callers wait for it and hold it."""
+
+    def __init__(self, wait_histogram, hold_histogram):
+        self._lock = asyncio.Lock()
+        self._wait = wait_histogram
+        self._hold = hold_histogram
+        self._acquired_at = 0.0
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def held_for(self) -> float:
+        """Seconds the current holder has had the lock, 0 when free."""
+        return time.perf_counter() - self._acquired_at if self._lock.locked() else 0.0
+
+    async def acquire(self):
+        started = time.perf_counter()
+        await self._lock.acquire()
+        self._acquired_at = time.perf_counter()
+        self._wait.observe(self._acquired_at - started)
+        return True
+
+    def release(self):
+        self._hold.observe(time.perf_counter() - self._acquired_at)
+        self._lock.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
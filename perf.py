@@ -0,0 +1,104 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metrics import LogHistogram
+
+# ---------------------------
+# Per-command latency breakdown
+# ---------------------------
+# A trace is attached to the running command through a ContextVar when the
+# command is invoked. Timed Firestore, store and Discord REST calls add their
+# time to the trace of whichever command they run under; whatever wall time
+# is left over is reported as "cpu" (our own code plus any sleeps and lock
+# waits). Finished traces go into one-minute slots so reports cover a rolling
+# window without keeping individual samples.
+
+SEGMENTS = ("firestore", "store", "discord", "cpu")
+
+_trace: ContextVar[dict | None] = ContextVar("perf_trace", default=None)
+
+
+def add(segment: str, seconds: float):
+    """Charge `seconds` to `segment` of the command running in this context, if any."""
+    trace = _trace.get()
+    if trace is not None:
+        trace[segment] = trace.get(segment, 0.0) + seconds
+
+
+@contextmanager
+def timed(histogram, segment: str):
+    """Observe the block in a metrics histogram and charge it to a command segment."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed)
+        add(segment, elapsed)
+
+
+class _Slot:
+    __slots__ = ("minute", "wall", "segments", "count")
+
+    def __init__(self, minute: int):
+        self.minute = minute
+        self.wall = LogHistogram()
+        self.segments = {name: LogHistogram() for name in SEGMENTS}
+        self.count = 0
+
+
+class PerfRecorder:
+    def __init__(self, window_minutes: int = 60):
+        self.window = window_minutes
+        self._slots: dict[str, list[_Slot | None]] = {}    # command -> ring of minute slots
+
+    def start(self):
+        """Begin a trace for the current context; returns the token for finish()."""
+        return _trace.set({"started": time.perf_counter()})
+
+    def finish(self, command: str, token):
+        trace = _trace.get()
+        _trace.reset(token)
+        if trace is None:
+            return
+        wall = time.perf_counter() - trace.pop("started")
+        trace["cpu"] = max(0.0, wall - sum(trace.values()))
+
+        minute = int(time.time() // 60)
+        ring = self._slots.setdefault(command, [None] * self.window)
+        slot = ring[minute % self.window]
+        if slot is None or slot.minute != minute:
+            slot = ring[minute % self.window] = _Slot(minute)
+        slot.count += 1
+        slot.wall.add(wall)
+        for name in SEGMENTS:
+            slot.segments[name].add(trace.get(name, 0.0))
+
+    def report(self) -> list[dict]:
+        """Merged stats per command over the window, busiest command first."""
+        oldest = int(time.time() // 60) - self.window + 1
+        rows = []
+        for command, ring in self._slots.items():
+            wall = LogHistogram()
+            segments = {name: LogHistogram() for name in SEGMENTS}
+            count = 0
+            for slot in ring:
+                if slot is None or slot.minute < oldest:
+                    continue
+                count += slot.count
+                wall.merge(slot.wall)
+                for name in SEGMENTS:
+                    segments[name].merge(slot.segments[name])
+            if count:
+                rows.append({
+                    "command": command,
+                    "count": count,
+                    "wall": tuple(wall.quantile(q) for q in (0.5, 0.95, 0.99)),
+                    "segments": {name: h.quantile(0.5) for name, h in segments.items()},
+                })
+        rows.sort(key=lambda r: r["count"], reverse=True)
+        return rows
+
+
+PERF = PerfRecorder()
@@ -0,0 +1,148 @@
+import asyncio
+import random
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+
+# ---------------------------
+# Prayer storage
+# ---------------------------
+# Prayer counts, streaks and the per-guild global counter live behind a small
+# async interface. FirestorePrayerStore is the real one: blocking client
+# calls run in worker threads and one prayer is a single batched commit.
+# MemoryPrayerStore keeps everything in dicts and can sleep to imitate
+# network latency, so the prayer commands can be exercised and benchmarked
+# without credentials. Both count reads, writes and round trips in `ops`.
+
+def new_user() -> dict:
+    return {"count": 0, "streak": 0, "last_prayed": None}
+
+
+def update_streak(user_data: dict, today: date, is_spica_pray: bool) -> tuple[bool, bool]:
+    """Count one prayer in `user_data`; returns (continued_streak, reset_streak).
+    Only prayers to Spica move the daily streak."""
+    last_prayed_str = user_data.get("last_prayed")
+    last_prayed_date = datetime.strptime(last_prayed_str, "%Y-%m-%d").date() if last_prayed_str else None
+    continued_streak = reset_streak = False
+
+    if is_spica_pray:
+        if last_prayed_date == today:
+            pass
+        elif last_prayed_date == today - timedelta(days=1):
+            user_data["streak"] = user_data.get("streak", 0) + 1
+            continued_streak = True
+        elif last_prayed_date is None:
+            user_data["streak"] = 1
+        else:
+            user_data["streak"] = 1
+            reset_streak = True
+    else:
+        user_data["streak"] = user_data.get("streak", 0)
+
+    user_data["count"] = user_data.get("count", 0) + 1
+    user_data["last_prayed"] = str(today)
+    return continued_streak, reset_streak
+
+
+class PrayerStore(ABC):
+    def __init__(self):
+        self.ops = Counter()        # "reads", "writes", "rpcs"
+
+    @abstractmethod
+    async def get_user(self, guild_id: str, user_id: str) -> dict:
+        ...
+
+    @abstractmethod
+    async def get_global(self, guild_id: str) -> int:
+        ...
+
+    @abstractmethod
+    async def record_prayer(self, guild_id: str, user_id: str, user_data: dict):
+        """Save the user's counters, their leaderboard row and +1 to the guild total."""
+
+    @abstractmethod
+    async def top(self, guild_id: str, limit: int = 5) -> list[dict]:
+        """Leaderboard rows ({"user_id", "count", "streak"}), most prayers first."""
+
+
+class FirestorePrayerStore(PrayerStore):
+    def __init__(self, get_db, timer=None):
+        super().__init__()
+        self.get_db = get_db        # () -> firestore client, created on first use
+        self.timer = timer or (lambda op: nullcontext())
+
+    async def _call(self, op: str, fn, *, reads: int = 0, writes: int = 0):
+        self.ops.update(rpcs=1, reads=reads, writes=writes)
+        with self.timer(op):
+            return await asyncio.to_thread(fn)
+
+    def _guild(self, guild_id: str):
+        return self.get_db().collection("guilds").document(guild_id)
+
+    async def get_user(self, guild_id, user_id):
+        ref = self._guild(guild_id).collection("users").document(user_id)
+        doc = await self._call("get", ref.get, reads=1)
+        return doc.to_dict() if doc.exists else new_user()
+
+    async def get_global(self, guild_id):
+        doc = await self._call("get", self._guild(guild_id).get, reads=1)
+        return (doc.to_dict() or {}).get("global", 0) if doc.exists else 0
+
+    async def record_prayer(self, guild_id, user_id, user_data):
+        from firebase_admin import firestore
+        guild = self._guild(guild_id)
+        batch = self.get_db().batch()
+        batch.set(guild.collection("users").document(user_id), user_data, merge=True)
+        batch.set(guild.collection("leaderboard").document(user_id), {
+            "user_id": user_id,
+            "count": user_data["count"],
+            "streak": user_data["streak"],
+        }, merge=True)
+        batch.set(guild, {"global": firestore.Increment(1)}, merge=True)
+        await self._call("commit", batch.commit, writes=3)
+
+    async def top(self, guild_id, limit=5):
+        from firebase_admin import firestore
+        query = (self._guild(guild_id).collection("leaderboard")
+                 .order_by("count", direction=firestore.Query.DESCENDING).limit(limit))
+        docs = await self._call("query", lambda: list(query.stream()))
+        self.ops.update(reads=max(1, len(docs)))
+        return [doc.to_dict() for doc in docs]
+
+
+class MemoryPrayerStore(PrayerStore):
+    """In-process stand-in; every round trip sleeps `latency` seconds ± `jitter`."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.users: dict[tuple[str, str], dict] = {}
+        self.totals: Counter = Counter()
+
+    async def _round_trip(self, *, reads: int = 0, writes: int = 0):
+        self.ops.update(rpcs=1, reads=reads, writes=writes)
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    async def get_user(self, guild_id, user_id):
+        await self._round_trip(reads=1)
+        return dict(self.users.get((guild_id, user_id)) or new_user())
+
+    async def get_global(self, guild_id):
+        await self._round_trip(reads=1)
+        return self.totals[guild_id]
+
+    async def record_prayer(self, guild_id, user_id, user_data):
+        await self._round_trip(writes=3)
+        self.users[(guild_id, user_id)] = dict(user_data)
+        self.totals[guild_id] += 1
+
+    async def top(self, guild_id, limit=5):
+        await self._round_trip()
+        rows = [{"user_id": uid, "count": d["count"], "streak": d["streak"]}
+                for (gid, uid), d in self.users.items() if gid == guild_id]
+        rows.sort(key=lambda r: r["count"], reverse=True)
+        self.ops.update(reads=max(1, len(rows[:limit])))
+        return rows[:limit]
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import pathlib
+
+from json_files import AtomicWriter, read_json
+from metrics import LogHistogram
+
+# ---------------------------
+# Per-question answer statistics
+# ---------------------------
+# Every finished round adds one observation to its question: asked, solved
+# (someone got it), how many people answered correctly, and the time of the
+# first correct answer in a log-bucketed sketch. Updates are O(1) and the
+# sketch has a fixed number of buckets, so the file stays small however
+# long the bot runs. Questions are keyed by a hash of their text, so stats
+# follow a question when the sheet is reordered.
+
+MIN_ASKED = 3           # rounds before a question shows up in rankings
+
+
+def question_key(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+class QuestionRecord:
+    __slots__ = ("asked", "solved", "correct", "times")
+
+    def __init__(self):
+        self.asked = 0
+        self.solved = 0
+        self.correct = 0        # correct answerers over all rounds
+        self.times = LogHistogram(min_value=0.1, max_value=600.0, growth=1.1)   # first correct answer (s)
+
+    @property
+    def solve_rate(self) -> float:
+        """Share of rounds solved, smoothed so a question asked once is not 0% or 100%."""
+        return (self.solved + 1) / (self.asked + 2)
+
+    def to_list(self) -> list:
+        return [self.asked, self.solved, self.correct, self.times.to_dict()]
+
+    @classmethod
+    def from_list(cls, raw: list) -> "QuestionRecord":
+        rec = cls()
+        rec.asked, rec.solved, rec.correct = int(raw[0]), int(raw[1]), int(raw[2])
+        rec.times.load_dict(raw[3])
+        return rec
+
+
+class QuestionStats:
+    def __init__(self, path: str):
+        self.path = pathlib.Path(path)
+        self._records: dict[str, QuestionRecord] = {}
+        self._writer = AtomicWriter()
+
+    def load_sync(self):
+        raw = read_json(self.path, "[TRIVIA]")
+        if not raw:
+            return
+        self._records = {key: QuestionRecord.from_list(rec) for key, rec in raw.items()}
+
+    def dumps(self) -> str:
+        return json.dumps({key: rec.to_list() for key, rec in self._records.items()},
+                          separators=(",", ":"))
+
+    async def save(self):
+        # rounds in other channels update records on the loop, so dump here
+        await self._writer.write(self.path, self.dumps())
+
+    def get(self, text: str) -> QuestionRecord | None:
+        return self._records.get(question_key(text))
+
+    def record_round(self, text: str, first_seconds: float | None, correct: int):
+        """One finished round; `first_seconds` is None if nobody got it."""
+        key = question_key(text)
+        rec = self._records.get(key)
+        if rec is None:
+            rec = self._records[key] = QuestionRecord()
+        rec.asked += 1
+        if first_seconds is not None:
+            rec.solved += 1
+            rec.correct += correct
+            rec.times.add(first_seconds)
+
+    def ranked(self, questions, view: str) -> list[tuple[str, QuestionRecord]]:
+        """Questions of the current bank for an admin view: "hard", "easy" or "dead"."""
+        rows = [(q, rec) for q in questions
+                if (rec := self.get(q)) is not None and rec.asked >= MIN_ASKED]
+        if view == "dead":
+            rows = [row for row in rows if row[1].solved == 0]
+            rows.sort(key=lambda row: row[1].asked, reverse=True)
+        elif view == "easy":
+            rows.sort(key=lambda row: (-row[1].solve_rate, row[1].times.quantile(0.5)))
+        else:
+            rows.sort(key=lambda row: (row[1].solve_rate, -row[1].times.quantile(0.5)))
+        return rows
@@ -0,0 +1,46 @@
+from collections import Counter
+
+# ---------------------------
+# Prebuilt command replies
+# ---------------------------
+# Replies that only change when content files, a guild's roles or its
+# config change (b!help, b!triviashop) are built once per guild and kept as
+# ready-to-send ctx.send() keyword arguments. The events that can change them
+# drop the affected entries: an asset reload drops every guild's copy of the
+# views built from that asset, a role or config change drops one guild's.
+# Cached embeds are shared between sends, so callers must not modify them.
+
+class RenderCache:
+    def __init__(self):
+        self._builders = {}     # view name -> (build(guild) -> send kwargs, asset names it reads)
+        self._entries = {}      # (view name, guild id) -> send kwargs
+        self.stats = Counter()  # "hits", "misses"
+
+    def register(self, name: str, build, assets=()):
+        self._builders[name] = (build, frozenset(assets))
+
+    def get(self, name: str, guild) -> dict:
+        """Send kwargs for `name` in `guild` (None for DMs), built on first use."""
+        key = (name, guild.id if guild else None)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            entry = self._entries[key] = self._builders[name][0](guild)
+        else:
+            self.stats["hits"] += 1
+        return entry
+
+    def invalidate_guild(self, guild_id: int):
+        """Drop every view of one guild (roles, icon or config changed)."""
+        for key in [key for key in self._entries if key[1] == guild_id]:
+            del self._entries[key]
+
+    def invalidate_assets(self, names):
+        """Drop every guild's copy of the views built from any of these assets."""
+        names = set(names)
+        stale = {name for name, (_, assets) in self._builders.items() if assets & names}
+        for key in [key for key in self._entries if key[0] in stale]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,121 @@
+import base64
+import hashlib
+import json
+import pathlib
+import random
+
+from json_files import AtomicWriter, read_json
+
+# ---------------------------
+# Weighted no-repeat question sampling
+# ---------------------------
+# Questions are drawn from a Vose alias table, so a weighted draw is two
+# random numbers and one comparison whatever the bank size. Each channel
+# keeps a bitmap of the questions it has been asked since its last full
+# cycle; a draw that lands on an asked question is simply redrawn. Only
+# when almost every question has been asked do we fall back to one linear
+# pass over the remaining ones. Bitmaps are saved to a small JSON file, so a
+# restart continues the cycle instead of reshuffling the bank.
+
+MAX_REDRAWS = 16        # alias redraws before picking from the unasked ones directly
+
+
+class AliasTable:
+    """Vose's alias method: O(n) to build, O(1) per weighted draw."""
+    __slots__ = ("prob", "alias")
+
+    def __init__(self, weights: list[float]):
+        n = len(weights)
+        total = sum(weights)
+        if not n or total <= 0:
+            raise ValueError("alias table needs at least one positive weight")
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:     # leftovers are 1.0 up to rounding
+            self.prob[i] = 1.0
+
+    def draw(self, rng=random) -> int:
+        i = int(rng.random() * len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+def bank_id(questions) -> str:
+    """Identifies a bank by its question texts; bitmaps from another bank are dropped."""
+    h = hashlib.sha1()
+    for q in questions:
+        h.update(q.encode())
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+class QuestionSampler:
+    def __init__(self, path: str):
+        self.path = pathlib.Path(path)
+        self.bank = None                            # bank_id() of the current bank
+        self.weights: list[float] = []
+        self.table: AliasTable | None = None
+        self._asked: dict[str, bytearray] = {}      # channel id -> bitmap of asked questions
+        self._counts: dict[str, int] = {}           # channel id -> bits set
+        self._writer = AtomicWriter()
+
+    # ── persistence ──
+    def load_sync(self):
+        state = read_json(self.path, "[TRIVIA]")
+        if not state:
+            return
+        self.bank = state.get("bank")
+        self._asked = {cid: bytearray(base64.b64decode(bits)) for cid, bits in state.get("asked", {}).items()}
+        self._counts = {cid: sum(bin(b).count("1") for b in bits) for cid, bits in self._asked.items()}
+
+    def dumps(self) -> str:
+        return json.dumps({
+            "bank": self.bank,
+            "asked": {cid: base64.b64encode(bits).decode() for cid, bits in self._asked.items()},
+        })
+
+    async def save(self):
+        # the bitmaps change on the loop (draws for other channels), so dump here
+        await self._writer.write(self.path, self.dumps())
+
+    # ── sampling ──
+    def set_bank(self, ident: str, weights: list[float]):
+        """Swap in a new bank; channel cycles restart only if the questions changed."""
+        if ident != self.bank:
+            self._asked.clear()
+            self._counts.clear()
+        self.bank = ident
+        self.weights = list(weights)
+        self.table = AliasTable(self.weights)
+
+    def asked(self, channel_id) -> int:
+        return self._counts.get(str(channel_id), 0)
+
+    def draw(self, channel_id, rng=random) -> int:
+        """Index of the next question for this channel, marked as asked."""
+        n = len(self.weights)
+        cid = str(channel_id)
+        bits = self._asked.get(cid)
+        if bits is None or self._counts[cid] >= n:
+            bits = self._asked[cid] = bytearray((n + 7) // 8)
+            self._counts[cid] = 0
+
+        for _ in range(MAX_REDRAWS):
+            i = self.table.draw(rng)
+            if not bits[i >> 3] & (1 << (i & 7)):
+                break
+        else:
+            left = [i for i in range(n) if not bits[i >> 3] & (1 << (i & 7))]
+            i = rng.choices(left, weights=[self.weights[j] for j in left])[0]
+
+        bits[i >> 3] |= 1 << (i & 7)
+        self._counts[cid] += 1
+        return i
@@ -0,0 +1,103 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+# ---------------------------
+# Deadline scheduler
+# ---------------------------
+# Game loops wait on absolute wall-clock deadlines ("answers close at
+# 12:05:00") instead of relative sleeps, so rounds keep an exact cadence
+# however long sending or saving took. All pending deadlines sit in one heap
+# and the event loop holds a single timer handle for the earliest one; a
+# deadline can be moved earlier (first correct answer closes the window)
+# and each key's next deadline can be looked up for status displays.
+
+class _Timer:
+    __slots__ = ("key", "phase", "when", "future")
+
+    def __init__(self, key, phase, when, future):
+        self.key = key
+        self.phase = phase
+        self.when = when
+        self.future = future
+
+
+class Scheduler:
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._heap = []                 # (when, seq, timer); entries go stale when a timer moves
+        self._seq = itertools.count()
+        self._timers = {}               # key -> pending _Timer
+        self._handle = None             # loop timer for the earliest deadline
+
+    def sleep_until(self, key, when: float, phase: str = "") -> asyncio.Future:
+        """A future resolved at wall-clock time `when` (or earlier, see advance()).
+        One pending deadline per key; a new one replaces the old."""
+        old = self._timers.pop(key, None)
+        if old is not None and not old.future.done():
+            old.future.cancel()
+        future = asyncio.get_running_loop().create_future()
+        timer = self._timers[key] = _Timer(key, phase, when, future)
+        future.add_done_callback(lambda _: self._drop(timer))
+        self._push(timer)
+        return future
+
+    def advance(self, key, when: float, phase: str | None = None) -> bool:
+        """Move the key's pending deadline to `when` if that is earlier (and, if
+        given, the pending phase is `phase`)."""
+        timer = self._timers.get(key)
+        if timer is None or when >= timer.when or (phase is not None and timer.phase != phase):
+            return False
+        timer.when = when
+        self._push(timer)
+        return True
+
+    def cancel(self, key):
+        """Drop the key's pending deadline, if any (its waiter is cancelled)."""
+        timer = self._timers.pop(key, None)
+        if timer is not None and not timer.future.done():
+            timer.future.cancel()
+
+    def next_fire(self, key) -> tuple[str, float] | None:
+        """(phase, wall-clock time) of the key's pending deadline."""
+        timer = self._timers.get(key)
+        return (timer.phase, timer.when) if timer else None
+
+    def pending(self) -> dict:
+        return {key: (timer.phase, timer.when) for key, timer in self._timers.items()}
+
+    # ── internals ──
+    def _drop(self, timer: _Timer):
+        if self._timers.get(timer.key) is timer:
+            del self._timers[timer.key]
+
+    def _push(self, timer: _Timer):
+        heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+        if self._heap[0][2] is timer:
+            self._arm()
+
+    def _stale(self, entry) -> bool:
+        when, _, timer = entry
+        return timer.future.done() or when != timer.when
+
+    def _arm(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        heap = self._heap
+        while heap and self._stale(heap[0]):
+            heapq.heappop(heap)
+        if heap:
+            delay = max(0.0, heap[0][0] - self.clock())
+            self._handle = asyncio.get_running_loop().call_later(delay, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        now = self.clock()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            if not self._stale(entry):
+                entry[2].future.set_result(None)
+        self._arm()     # also re-arms if the wall clock moved and nothing was due yet
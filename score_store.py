@@ -0,0 +1,404 @@
+import asyncio
+import json
+import os
+import pathlib
+import time
+import uuid
+from contextlib import asynccontextmanager, nullcontext
+
+from json_files import read_json, write_atomic
+
+# ---------------------------
+# Trivia score store
+# ---------------------------
+# The store is split into partitions, one JSON file each, loaded and saved
+# independently so reading one never pays for the others:
+#   users        trivia_data.json   user id -> {"score", "total_score", "best_time",
+#                                   "best_question", "owned_roles", ...}; very old
+#                                   entries are a bare int score
+#   boss_points  boss_points.json   user id -> bossfight points
+#   purchases    purchases.json     user id -> {message id: {"role_id", "cost", "at"}}
+# The users file also holds JOURNAL_KEY: per session journal, the last round
+# already applied, saved in the same write as the scores so a journal replay
+# after a crash never credits a round twice.
+# One ScoreStore is created by b1jou and handed to every module that keeps
+# scores (bossfight gets it through setup()), so there is a single writer
+# and a single lock. File I/O runs in a worker
+# thread so a big store does not stall the event loop while it is read or
+# written. Owned shop roles are also indexed in memory (user id -> role ids)
+# so ownership checks never touch the disk.
+
+PARTITIONS = ("users", "boss_points", "purchases")
+BOSS_POINTS_KEY = "boss_points"     # where older versions kept boss points inside the users file
+JOURNAL_KEY = "_journal"            # users file: journal name -> [session id, last committed round]
+
+def user_entry(data: dict, uid: str) -> dict:
+    """The user's record, upgrading legacy int scores; inserted into `data` if new."""
+    entry = data.get(uid)
+    if not isinstance(entry, dict):
+        entry = {"score": int(entry or 0), "best_time": float("inf"), "best_question": ""}
+        data[uid] = entry
+    return entry
+
+
+def total_points(entry) -> int:
+    """Points a user has ever earned (spent ones included); 0 for records that
+    only hold answer stats."""
+    if isinstance(entry, dict):
+        return entry.get("total_score", entry.get("score", 0))
+    return entry if isinstance(entry, int) else 0
+
+
+def record_answer(entry: dict, points: int, time_ms: int | None, question: str, chars: int = 0):
+    """Credit one round to a user record. `time_ms` is None when the user took part
+    but never answered correctly; `chars` is the length of the correct answer."""
+    stats = entry.setdefault("answer_stats", {"rounds": 0, "count": 0, "mean_ms": 0.0, "m2": 0.0, "wpm": 0.0})
+    stats["rounds"] += 1
+    if time_ms is None:
+        return
+
+    entry["total_score"] = entry.get("total_score", entry.get("score", 0)) + points
+    entry["score"] = entry.get("score", 0) + points
+    if time_ms <= entry.get("best_time", float("inf")):
+        entry["best_time"] = time_ms
+        entry["best_question"] = question
+
+    # running mean / variance of answer time (Welford) and mean WPM, no history kept
+    stats["count"] += 1
+    delta = time_ms - stats["mean_ms"]
+    stats["mean_ms"] += delta / stats["count"]
+    stats["m2"] += delta * (time_ms - stats["mean_ms"])
+    wpm = (chars / 5) / (time_ms / 60000) if time_ms > 0 else 0.0    # 5 characters = 1 word
+    stats["wpm"] += (wpm - stats["wpm"]) / stats["count"]
+
+
+def answer_summary(entry: dict) -> dict | None:
+    """Averages for triviastats from the running aggregates; None if nothing recorded."""
+    stats = entry.get("answer_stats") if isinstance(entry, dict) else None
+    if not stats or not stats["rounds"]:
+        return None
+    count = stats["count"]
+    return {
+        "rounds": stats["rounds"],
+        "correct": count,
+        "accuracy": count / stats["rounds"],
+        "mean_ms": stats["mean_ms"] if count else None,
+        "stdev_ms": (stats["m2"] / (count - 1)) ** 0.5 if count > 1 else 0.0,
+        "wpm": stats["wpm"] if count else None,
+    }
+
+
+class ScoreStore:
+    def __init__(self, path: str, lock, timer=None, boss_points_path: str = None, purchases_path: str = None):
+        self.path = pathlib.Path(path)                  # the users partition
+        self.boss_points_path = pathlib.Path(boss_points_path or self.path.with_name("boss_points.json"))
+        self.purchases_path = pathlib.Path(purchases_path or self.path.with_name("purchases.json"))
+        self.lock = lock
+        self.timer = timer or (lambda op: nullcontext())     # op -> context manager timing it
+        self._inventory: dict[str, frozenset[int]] | None = None
+
+    def file(self, partition: str = "users") -> pathlib.Path:
+        if partition == "users":
+            return self.path
+        if partition == "boss_points":
+            return self.boss_points_path
+        if partition == "purchases":
+            return self.purchases_path
+        raise KeyError(partition)
+
+    def files(self) -> list[pathlib.Path]:
+        """Partition files that exist and are not empty, e.g. for backups."""
+        return [p for p in map(self.file, PARTITIONS) if p.exists() and p.stat().st_size]
+
+    # ── raw file access (caller holds the lock) ──
+    def load_sync(self, partition: str = "users") -> dict:
+        with self.timer("load"):
+            return read_json(self.file(partition), "[TRIVIA]") or {}
+
+    def save_sync(self, data: dict, partition: str = "users"):
+        with self.timer("save"):
+            write_atomic(self.file(partition), json.dumps(data, indent=2))
+
+    def migrate_sync(self) -> tuple[int, int]:
+        """Move boss points and purchase records that older versions kept in the
+        users file into their own partitions; returns (boss rows, purchase users).
+        Safe to repeat if interrupted: the partitions are written before the users file."""
+        users = self.load_sync()
+        legacy_points = users.pop(BOSS_POINTS_KEY, None)
+        legacy_purchases = {uid: entry.pop("purchases") for uid, entry in users.items()
+                            if isinstance(entry, dict) and "purchases" in entry}
+        if legacy_points is None and not legacy_purchases:
+            return 0, 0
+        if isinstance(legacy_points, dict) and legacy_points:
+            points = self.load_sync("boss_points")
+            for uid, value in legacy_points.items():
+                points[uid] = max(int(points.get(uid, 0)), int(value))     # max, not +, so a rerun adds nothing
+            self.save_sync(points, "boss_points")
+        if legacy_purchases:
+            purchases = self.load_sync("purchases")
+            for uid, records in legacy_purchases.items():
+                purchases.setdefault(uid, {}).update(records)
+            self.save_sync(purchases, "purchases")
+        self.save_sync(users)
+        return len(legacy_points or ()), len(legacy_purchases)
+
+    # ── locked async access ──
+    async def read(self, partition: str = "users") -> dict:
+        async with self.lock:
+            return await asyncio.to_thread(self.load_sync, partition)
+
+    async def write(self, data: dict, partition: str = "users"):
+        async with self.lock:
+            await asyncio.to_thread(self.save_sync, data, partition)
+
+    async def migrate(self) -> tuple[int, int]:
+        async with self.lock:
+            return await asyncio.to_thread(self.migrate_sync)
+
+    @asynccontextmanager
+    async def transaction(self, partition: str = "users"):
+        """Load one partition, let the caller mutate it, save once; all under the
+        lock. Nothing is written if the block raises."""
+        async with self.lock:
+            data = await asyncio.to_thread(self.load_sync, partition)
+            yield data
+            await asyncio.to_thread(self.save_sync, data, partition)
+
+    async def get_score(self, uid: str) -> int:
+        entry = (await self.read()).get(uid)
+        if isinstance(entry, dict):
+            return entry.get("score", 0)
+        return int(entry or 0)
+
+    async def add_score(self, uid: str, delta: int):
+        """delta can be negative to deduct"""
+        async with self.transaction() as data:
+            entry = user_entry(data, uid)
+            entry["score"] = max(0, entry.get("score", 0) + delta)
+
+    @staticmethod
+    def _apply_results(data: dict, results: list[dict]):
+        for res in results:
+            if res["time_ms"] is None and not isinstance(data.get(res["uid"]), dict):
+                continue
+            record_answer(user_entry(data, res["uid"]), res["points"], res["time_ms"],
+                          res["question"], res.get("chars", 0))
+
+    async def commit_results(self, results: list[dict], journal: tuple[str, str, int] | None = None):
+        """Apply round results ({"uid", "points", "time_ms", "question", "chars"}) in one write.
+        Rounds without a correct answer only count toward users who already have a
+        record; they never create one. `journal` = (name, session, round) marks the
+        journal rounds these results come from as applied, in the same write."""
+        if not results and journal is None:
+            return
+        async with self.transaction() as data:
+            self._apply_results(data, results)
+            if journal is not None:
+                name, session, last_round = journal
+                data.setdefault(JOURNAL_KEY, {})[name] = [session, last_round]
+
+    # ── bossfight points ──
+    async def award_boss_points(self, awards: dict[str, int]) -> dict[str, tuple[int, int]]:
+        """Add points for many users in one write; returns uid -> (old, new)."""
+        if not awards:
+            return {}
+        changed = {}
+        async with self.transaction("boss_points") as points:
+            for uid, add in awards.items():
+                old = int(points.get(uid, 0))
+                points[uid] = old + int(add)
+                changed[uid] = (old, points[uid])
+        return changed
+
+    async def recover_journal(self, path: str) -> int:
+        """Commit answers left in a session journal by a crash; returns how many.
+        Rounds the users file marks as applied are skipped, so a crash between a
+        commit and the journal's removal does not credit them again."""
+        p = pathlib.Path(path)
+        if not p.exists():
+            return 0
+        rounds = []
+        for line in (await asyncio.to_thread(p.read_text, encoding="utf-8")).splitlines():
+            try:
+                rounds.append(json.loads(line))
+            except json.JSONDecodeError:
+                break   # torn last line from the crash
+        results = []
+        async with self.transaction() as data:
+            marks = data.setdefault(JOURNAL_KEY, {})
+            session, done = marks.get(p.name) or (None, 0)
+            for entry in rounds:
+                if isinstance(entry, list):         # journals from before rounds were numbered
+                    results.extend(entry)
+                elif entry["session"] != session or entry["round"] > done:
+                    results.extend(entry["results"])
+                    session, done = entry["session"], entry["round"]
+            self._apply_results(data, results)
+            if session is not None:
+                marks[p.name] = [session, done]
+        await asyncio.to_thread(p.unlink, missing_ok=True)
+        return len(results)
+
+    # ── owned role inventory ──
+    def _index_inventory(self, data: dict):
+        self._inventory = {
+            uid: frozenset(entry["owned_roles"])
+            for uid, entry in data.items()
+            if isinstance(entry, dict) and entry.get("owned_roles")
+        }
+
+    def _set_owned(self, uid: str, entry: dict):
+        owned = frozenset(entry.get("owned_roles", ()))
+        if self._inventory is not None:
+            if owned:
+                self._inventory[uid] = owned
+            else:
+                self._inventory.pop(uid, None)
+
+    async def load_inventory(self):
+        """Build the in-memory inventory index; done once, later reads are O(1)."""
+        if self._inventory is None:
+            self._index_inventory(await self.read())
+
+    async def owned_roles(self, uid: str) -> frozenset[int]:
+        await self.load_inventory()
+        return self._inventory.get(uid, frozenset())
+
+    async def grant_role(self, uid: str, role_id: int) -> bool:
+        """Record `role_id` as owned without charging; False if it already was."""
+        if role_id in await self.owned_roles(uid):
+            return False
+        async with self.transaction() as data:
+            entry = user_entry(data, uid)
+            owned = entry.setdefault("owned_roles", [])
+            if role_id not in owned:
+                owned.append(role_id)
+        self._set_owned(uid, entry)
+        return True
+
+    # ── role shop ──
+    # A purchase or refund changes two files. The purchases record is written
+    # first, flagged "pending" with the operation; then the users file, which
+    # also notes the operation as the user's "last_purchase"; then the flag is
+    # cleared. If a crash leaves a record pending, the user's last_purchase
+    # tells whether the users write happened, and the record is finished or
+    # rolled back before that user's next purchase or refund.
+    @staticmethod
+    def _settle(entry, records: dict) -> bool:
+        """Finish or roll back the user's interrupted operations; True if `records` changed."""
+        changed = False
+        last = entry.get("last_purchase") if isinstance(entry, dict) else None
+        for key, record in list(records.items()):
+            op = record.get("pending")
+            if op is None:
+                continue
+            done = last == f"{op}:{key}"
+            if (op == "buy") == done:
+                del record["pending"]       # bought, or refund never applied: a normal purchase
+            else:
+                del records[key]            # refunded, or never charged
+            changed = True
+        return changed
+
+    async def _save_purchases(self, purchases: dict):
+        await asyncio.to_thread(self.save_sync, purchases, "purchases")
+
+    async def purchase(self, uid: str, role_id: int, cost: int, key: str) -> tuple[str, int]:
+        """Check the balance, deduct `cost`, add the role to the user's inventory and
+        record the purchase under `key`, all under one lock hold.
+
+        Returns (status, balance) where status is "ok", "insufficient" or "duplicate"
+        (this key was already processed, nothing changed). The record stays unless
+        granting the role fails and refund_purchase() rolls it back.
+        """
+        async with self.lock:
+            data, purchases = await asyncio.gather(asyncio.to_thread(self.load_sync),
+                                                   asyncio.to_thread(self.load_sync, "purchases"))
+            entry = user_entry(data, uid)
+            balance = entry.get("score", 0)
+            records = purchases.setdefault(uid, {})
+            if self._settle(entry, records):
+                await self._save_purchases(purchases)
+            if key in records:
+                return "duplicate", balance
+            if balance < cost:
+                return "insufficient", balance
+
+            records[key] = {"role_id": role_id, "cost": cost, "at": int(time.time()), "pending": "buy"}
+            await self._save_purchases(purchases)
+            entry["score"] = balance - cost
+            owned = entry.setdefault("owned_roles", [])
+            if role_id not in owned:
+                owned.append(role_id)
+            entry["last_purchase"] = f"buy:{key}"
+            await asyncio.to_thread(self.save_sync, data)
+            del records[key]["pending"]
+            await self._save_purchases(purchases)
+            self._set_owned(uid, entry)
+            return "ok", entry["score"]
+
+    async def refund_purchase(self, uid: str, key: str) -> bool:
+        """Undo a purchase recorded under `key`; False if there is nothing to undo."""
+        async with self.lock:
+            data, purchases = await asyncio.gather(asyncio.to_thread(self.load_sync),
+                                                   asyncio.to_thread(self.load_sync, "purchases"))
+            entry = data.get(uid)
+            records = purchases.get(uid, {})
+            if self._settle(entry, records):
+                await self._save_purchases(purchases)
+            record = records.get(key)
+            if record is None or not isinstance(entry, dict):
+                return False
+
+            record["pending"] = "refund"
+            await self._save_purchases(purchases)
+            entry["score"] = entry.get("score", 0) + record["cost"]
+            owned = entry.get("owned_roles", [])
+            if record["role_id"] in owned:
+                owned.remove(record["role_id"])
+            entry["last_purchase"] = f"refund:{key}"
+            await asyncio.to_thread(self.save_sync, data)
+            del records[key]
+            await self._save_purchases(purchases)
+            self._set_owned(uid, entry)
+            return True
+
+
+class SessionLedger:
+    """Answers from one trivia session, kept in memory and committed in batches.
+
+    Every round is appended (and fsynced) to a small journal first, so a crash
+    between commits loses nothing: ScoreStore.recover_journal() replays it.
+    Rounds are numbered within a session id, and each commit records the last
+    one it applied, so replaying is safe even if the crash came mid-commit.
+    """
+
+    def __init__(self, store: ScoreStore, journal_path: str):
+        self.store = store
+        self.path = pathlib.Path(journal_path)
+        self.pending: list[dict] = []
+        self.session = uuid.uuid4().hex[:12]
+        self.round = 0
+
+    def _append(self, line: str):
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def record(self, results: list[dict]):
+        if not results:
+            return
+        self.round += 1
+        self.pending.extend(results)
+        await asyncio.to_thread(self._append, json.dumps(
+            {"session": self.session, "round": self.round, "results": results}))
+
+    async def commit(self) -> bool:
+        """Write everything pending to the store in one go; False if there was nothing."""
+        if not self.pending:
+            return False
+        await self.store.commit_results(self.pending, journal=(self.path.name, self.session, self.round))
+        self.pending = []
+        await asyncio.to_thread(self.path.unlink, missing_ok=True)
+        return True
@@ -0,0 +1,168 @@
+import re
+import unicodedata
+
+# ---------------------------
+# Trivia answer matching
+# ---------------------------
+# Every question gets an AnswerIndex when the bank is parsed, so checking a
+# chat message is a couple of set lookups plus, for questions whose sheet row
+# sets a `tolerance` (matching is exact otherwise), a BK-tree walk over the
+# (few) accepted answers. Answers are also
+# compared with spaces and punctuation squeezed out, so "moonlord" matches
+# "moon lord". Guesses whose length is further from every answer than the
+# allowed number of typos are rejected before any distance is computed.
+
+_SQUEEZE = re.compile(r"[\W_]+")
+_MENTION = re.compile(r"<@!?(\d+)>")
+
+MAX_TOLERANCE = 3
+
+
+def normalize_text(text):
+    return unicodedata.normalize("NFKC", text).replace("’", "'").lower().strip()
+
+
+def squeeze(text: str) -> str:
+    """Normalized text with whitespace and punctuation removed."""
+    return _SQUEEZE.sub("", normalize_text(text))
+
+
+def auto_tolerance(answer: str) -> int:
+    """Typos allowed for `tolerance` = "auto": none for short or numeric
+    answers, one for medium words, two for long ones."""
+    if len(answer) < 6 or any(ch.isdigit() for ch in answer):
+        return 0
+    return 1 if len(answer) < 12 else 2
+
+
+def parse_tolerance(value: str | None) -> int | None:
+    """The sheet's `tolerance` cell: blank means exact (0), "auto" means by answer
+    length (None), else 0..MAX_TOLERANCE."""
+    value = (value or "").strip().lower()
+    if not value:
+        return 0
+    if value == "auto":
+        return None
+    tol = int(value)
+    if not 0 <= tol <= MAX_TOLERANCE:
+        raise ValueError(f"tolerance must be between 0 and {MAX_TOLERANCE}, got {tol}")
+    return tol
+
+
+def distance(a: str, b: str) -> int:
+    """Plain Levenshtein distance."""
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 if it is larger than `limit`.
+
+    Only the diagonal band |i - j| <= limit of the DP table is filled, and the
+    scan stops as soon as a whole row is over the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    prev = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        cur = [over] * (len(b) + 1)
+        if i <= limit:
+            cur[0] = i
+        for j in range(lo, hi + 1):
+            cost = prev[j - 1] + (ca != b[j - 1])
+            cur[j] = min(cost, prev[j] + 1, cur[j - 1] + 1, over)
+        if min(cur[lo - 1:hi + 1]) > limit:
+            return over
+        prev = cur
+    return prev[-1]
+
+
+class _BKNode:
+    __slots__ = ("word", "tolerance", "children")
+
+    def __init__(self, word: str, tolerance: int):
+        self.word = word
+        self.tolerance = tolerance
+        self.children: dict[int, "_BKNode"] = {}
+
+
+class AnswerIndex:
+    __slots__ = ("answers", "exact", "max_tolerance", "min_len", "max_len", "_root")
+
+    def __init__(self, answers, tolerance: int | None = 0):
+        self.answers = tuple(normalize_text(a) for a in answers)
+        self.exact = frozenset(self.answers) | frozenset(filter(None, map(squeeze, self.answers)))
+        self.max_tolerance = 0
+        self._root = None
+        lengths = []
+        for answer in self.answers:
+            key = squeeze(answer)
+            tol = auto_tolerance(key) if tolerance is None else tolerance
+            if key and tol:
+                self._insert(key, tol)
+                self.max_tolerance = max(self.max_tolerance, tol)
+                lengths.append(len(key))
+        self.min_len = min(lengths, default=0) - self.max_tolerance
+        self.max_len = max(lengths, default=0) + self.max_tolerance
+
+    def _insert(self, word: str, tolerance: int):
+        if self._root is None:
+            self._root = _BKNode(word, tolerance)
+            return
+        node = self._root
+        while True:
+            d = distance(word, node.word)
+            if d == 0:
+                node.tolerance = max(node.tolerance, tolerance)
+                return
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = _BKNode(word, tolerance)
+                return
+            node = child
+
+    def matches(self, text: str) -> bool:
+        """True if `text` is an accepted answer, allowing the configured typos."""
+        normalized = normalize_text(text)
+        key = _SQUEEZE.sub("", normalized)
+        if normalized in self.exact or key in self.exact:
+            return True
+        if self._root is None or not key or not self.min_len <= len(key) <= self.max_len:
+            return False
+
+        # Distances are only computed up to `cap`; past it we just know d > cap,
+        # which still rules out every child edge below d - limit.
+        limit = self.max_tolerance
+        cap = 2 * limit
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = bounded_distance(key, node.word, cap)
+            if d <= node.tolerance:
+                return True
+            for edge, child in node.children.items():
+                if edge >= d - limit and (d > cap or edge <= d + limit):
+                    stack.append(child)
+        return False
+
+    def matches_member(self, message) -> bool:
+        """Answers that are a member's name also accept an @mention of that member,
+        or "me" from that member. Uses the message's own mentions, no member scan."""
+        content = message.content.strip()
+        if normalize_text(content) == "me":
+            return normalize_text(message.author.display_name) in self.exact
+        found = _MENTION.fullmatch(content)
+        if found is None:
+            return False
+        member_id = int(found.group(1))
+        for member in message.mentions:
+            if member.id == member_id:
+                return normalize_text(member.display_name) in self.exact
+        return False
@@ -0,0 +1,44 @@
+import time
+from collections import OrderedDict
+
+# ---------------------------
+# Bounded expiring map
+# ---------------------------
+# A dict that forgets entries after `ttl` seconds and never holds more than
+# `maxsize` of them (the oldest go first). Every entry has the same TTL, so
+# insertion order is also expiry order and pruning only ever looks at the
+# front: O(1) amortised per write, flat memory however fast keys arrive.
+
+class TTLMap:
+    def __init__(self, ttl: float, maxsize: int, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self._items: OrderedDict = OrderedDict()    # key -> (expires_at, value)
+
+    def _prune(self, now: float):
+        items = self._items
+        while items and (len(items) > self.maxsize or next(iter(items.values()))[0] <= now):
+            items.popitem(last=False)
+
+    def set(self, key, value):
+        now = self.clock()
+        self._items.pop(key, None)      # re-adding moves the key to the back
+        self._items[key] = (now + self.ttl, value)
+        self._prune(now)
+
+    def get(self, key, default=None):
+        entry = self._items.get(key)
+        if entry is None or entry[0] <= self.clock():
+            return default
+        return entry[1]
+
+    def pop(self, key, default=None):
+        entry = self._items.pop(key, None)
+        if entry is None or entry[0] <= self.clock():
+            return default
+        return entry[1]
+
+    def __len__(self):
+        self._prune(self.clock())
+        return len(self._items)
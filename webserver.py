@@ -0,0 +1,54 @@
+import json
+
+from aiohttp import web
+
+# ---------------------------
+# Health / metrics HTTP server
+# ---------------------------
+# Runs on the bot's own event loop (aiohttp already ships with discord.py),
+# so handlers can read asyncio-side state directly and no extra thread or
+# WSGI stack is needed.
+
+class HealthServer:
+    def __init__(self, host: str, port: int, *, metrics, readiness, content_type: str):
+        self.host = host
+        self.port = port
+        self.metrics = metrics          # () -> str, Prometheus text
+        self.readiness = readiness      # () -> dict of check name -> (ok, detail)
+        self.content_type = content_type
+        self._runner = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self.home)
+        app.router.add_get("/metrics", self.serve_metrics)
+        app.router.add_get("/ready", self.ready)
+        return app
+
+    async def home(self, request):
+        return web.Response(text="Bot is alive!")
+
+    async def serve_metrics(self, request):
+        return web.Response(body=self.metrics().encode(), headers={"Content-Type": self.content_type})
+
+    async def ready(self, request):
+        checks = self.readiness()
+        ok = all(passed for passed, _ in checks.values())
+        body = {
+            "ready": ok,
+            "checks": {name: {"ok": passed, "detail": detail} for name, (passed, detail) in checks.items()},
+        }
+        return web.Response(text=json.dumps(body), status=200 if ok else 503, content_type="application/json")
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"[WEB] health server listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None